@@ -8,20 +8,29 @@ class Benchmark(ABC):
 
 
 import pathlib
+import threading
 
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from elleelleaime.core.benchmarks.bug import Bug
 
 
 class Benchmark(ABC):
     """
     The abstract class for representing a benchmark.
+
+    In lazy mode, initialize only builds an index of bug identifiers and each bug
+    is materialized the first time it is requested.
     """
 
-    def __init__(self, identifier: str, path: pathlib.Path) -> None:
+    def __init__(self, identifier: str, path: pathlib.Path, lazy: bool = False) -> None:
         self.identifier: str = identifier
         self.path: pathlib.Path = path.absolute()
+        self.lazy: bool = lazy
         self.bugs: Dict[str, Bug] = dict()
+        self.bug_loaders: Dict[str, Callable[[], Optional[Bug]]] = dict()
+        # Guards bugs and bug_loaders, while the loading of each bug holds its own lock
+        self.bugs_lock = threading.Lock()
+        self.bug_locks: Dict[str, threading.Lock] = dict()
 
     def get_identifier(self) -> str:
         return self.identifier
@@ -32,16 +41,53 @@ class Benchmark(ABC):
     def get_bin(self, options: str = "") -> Optional[str]:
         return None
 
+    def get_bug_identifiers(self) -> List[str]:
+        """
+        Returns the identifiers of all bugs without materializing lazy bugs.
+        Note that a lazy bug may still be discarded when it is materialized.
+        """
+        with self.bugs_lock:
+            return sorted(set(self.bugs.keys()) | set(self.bug_loaders.keys()))
+
     def get_bugs(self) -> List[Bug]:
+        for identifier in list(self.bug_loaders.keys()):
+            self.get_bug(identifier)
         return sorted(list(self.bugs.values()))
 
     def get_bug(self, identifier) -> Optional[Bug]:
+        if identifier in self.bug_loaders:
+            with self.bugs_lock:
+                bug_lock = self.bug_locks.setdefault(identifier, threading.Lock())
+            # Bugs load concurrently, and the threads requesting the same bug wait for it
+            with bug_lock:
+                # Another thread may have materialized the bug in the meantime
+                loader = self.bug_loaders.get(identifier)
+                if loader is not None:
+                    # The loader is kept if it raises, so that the bug can be requested again
+                    bug = loader()
+                    with self.bugs_lock:
+                        if bug is not None:
+                            self.add_bug(bug)
+                        del self.bug_loaders[identifier]
+                        del self.bug_locks[identifier]
+        if identifier not in self.bugs and self.lazy:
+            return None
         return self.bugs[identifier]
 
     def add_bug(self, bug: Bug) -> None:
         assert bug.get_identifier() not in self.bugs
         self.bugs[bug.get_identifier()] = bug
 
+    def add_lazy_bug(
+        self, identifier: str, loader: Callable[[], Optional[Bug]]
+    ) -> None:
+        """
+        Registers a bug that is only built by calling loader when it is first requested.
+        The loader may return None if the bug turns out not to be valid.
+        """
+        assert identifier not in self.bugs and identifier not in self.bug_loaders
+        self.bug_loaders[identifier] = loader
+
     @abstractmethod
     def initialize(self) -> None:
         pass
@@ -1,14 +1,59 @@
 from pathlib import Path
-from typing import Optional
+from typing import Dict, List, Optional, Tuple
 from io import StringIO
+from concurrent.futures import ThreadPoolExecutor
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.defects4j.defects4jbug import Defects4JBug
+from elleelleaime.core.caching.snapshot import (
+    BenchmarkSnapshot,
+    DEFAULT_SNAPSHOT_DIR,
+    compute_fingerprint,
+)
 
 import subprocess
 import logging
 import tqdm
 import os
-import pandas as pd
+import csv
+import functools
+import threading
+
+
+def split_trigger_causes(failing_test_cases: str, trigger_cause: str) -> Dict[str, str]:
+    """
+    Maps each failing test case of a bug to its trigger cause.
+    """
+    failing_tests = {}
+    for failing_test_case in failing_test_cases.split(";"):
+        cause = trigger_cause.split(f"{failing_test_case} --> ")[1]
+        # The trigger cause list elements are separated by ";" but sometimes this char is also included in the element itself and is not espaced
+        # To avoid this we check if there are more any remaining elements and remove them from the string.
+        if " --> " in cause:
+            while " --> " in cause:
+                cause = cause.split(" --> ")[1]
+            for test in failing_test_case.split(";"):
+                if test in cause:
+                    cause = cause.replace(test, "")
+        failing_tests[failing_test_case] = cause.strip()
+    return failing_tests
+
+
+def parse_trigger_tests(query_output: str) -> Dict[int, Dict[str, str]]:
+    """
+    Parses the output of `defects4j query -q 'tests.trigger,tests.trigger.cause'` in a single pass.
+
+    Returns:
+        Dict[int, Dict[str, str]]: A dictionary mapping each bug id to its failing test cases and their trigger causes
+    """
+    trigger_tests = {}
+    for row in csv.reader(StringIO(query_output)):
+        if not row:
+            continue
+        bid, failing_test_cases, trigger_cause = row
+        trigger_tests[int(bid)] = split_trigger_causes(
+            failing_test_cases, trigger_cause
+        )
+    return trigger_tests
 
 
 class Defects4J(Benchmark):
@@ -16,18 +61,94 @@ class Defects4J(Benchmark):
     The class for representing the Defects4J benchmark.
     """
 
-    def __init__(self, path: Path = Path("benchmarks/defects4j").absolute()) -> None:
-        super().__init__("defects4j", path)
+    # Files that determine the result of initialize
+    FINGERPRINT_PATTERNS = [
+        "framework/projects/*/active-bugs.csv",
+        "framework/projects/*/patches/*.src.patch",
+        "framework/projects/*/trigger_tests/*",
+    ]
+
+    def __init__(
+        self,
+        path: Path = Path("benchmarks/defects4j").absolute(),
+        use_snapshot: bool = True,
+        snapshot_path: Path = Path(DEFAULT_SNAPSHOT_DIR, "defects4j.json.gz"),
+        n_workers: Optional[int] = None,
+        lazy: bool = False,
+    ) -> None:
+        super().__init__("defects4j", path, lazy=lazy)
+        self.n_workers = n_workers or os.cpu_count()
+        self.trigger_tests: Dict[str, Dict[int, Dict[str, str]]] = dict()
+        self.trigger_tests_lock = threading.Lock()
+        self.use_snapshot = use_snapshot
+        self.snapshot_path = snapshot_path.absolute()
 
     def get_bin(self, options: str = "") -> Optional[str]:
         return f'{Path(self.path, "framework/bin/defects4j")}'
 
+    def get_fingerprint(self) -> str:
+        """
+        Returns a fingerprint of the framework checkout, used to invalidate the snapshot.
+        """
+        return compute_fingerprint(self.path, self.FINGERPRINT_PATTERNS)
+
     def initialize(self) -> None:
         """
         Initializes the Defects4J benchmark object by collecting the list of all projects and bugs.
+        The collected bugs are stored in a snapshot which is reused while the framework checkout does not change.
         """
         logging.info("Initializing Defects4J benchmark...")
 
+        snapshot = None
+        records = None
+        if self.use_snapshot:
+            snapshot = BenchmarkSnapshot(self.snapshot_path, self.get_fingerprint())
+            records = snapshot.load()
+
+        # In lazy mode, only index the bug ids and query the framework when a bug is requested
+        if records is None and self.lazy:
+            for pid, bid in self.collect_bids():
+                self.add_lazy_bug(
+                    f"{pid}-{bid}", functools.partial(self.load_bug, pid, bid)
+                )
+            return
+
+        if records is None:
+            records = self.collect_bugs()
+            if snapshot is not None:
+                snapshot.save(records)
+
+        for record in records:
+            self.add_bug(
+                Defects4JBug(
+                    self,
+                    record["pid"],
+                    record["bid"],
+                    record["ground_truth"],
+                    record["failing_tests"],
+                )
+            )
+
+    def collect_bugs(self) -> List[dict]:
+        """
+        Collects the metadata of all bugs by querying the Defects4J framework.
+        """
+        bids = self.collect_bids()
+        pids = sorted({pid for pid, _ in bids})
+
+        # Query the trigger tests of each project in parallel
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            for _ in tqdm.tqdm(
+                executor.map(self.get_trigger_tests, pids), total=len(pids)
+            ):
+                pass
+
+        return [self.get_record(pid, bid) for pid, bid in bids]
+
+    def collect_bids(self) -> List[Tuple[str, int]]:
+        """
+        Returns the sorted (pid, bid) pairs of all bugs in the Defects4J framework.
+        """
         # Get all project ids
         run = subprocess.run(
             f"{self.get_bin()} pids",
@@ -35,54 +156,75 @@ class Defects4J(Benchmark):
             capture_output=True,
             check=True,
         )
-        pids = {pid.decode("utf-8") for pid in run.stdout.split()}
+        pids = sorted({pid.decode("utf-8") for pid in run.stdout.split()})
         logging.info("Found %3d projects" % len(pids))
 
-        # Get all bug ids for all pids
-        bugs = {}
-        for pid in tqdm.tqdm(pids):
-            run = subprocess.run(
-                f"{self.get_bin()} bids -p {pid}",
-                shell=True,
-                capture_output=True,
-                check=True,
-            )
-            bugs[pid] = {int(bid.decode("utf-8")) for bid in run.stdout.split()}
-            logging.info("Found %3d bugs for project %s" % (len(bugs[pid]), pid))
-
-        # Initialize dataset
-        for pid in pids:
-            # Extract failing test and trigger cause
-            run = subprocess.run(
-                f"{self.get_bin()} query -p {pid} -q 'tests.trigger,tests.trigger.cause'",
-                shell=True,
-                capture_output=True,
-                check=True,
-            )
-            data = run.stdout.decode("utf-8")
-            df = pd.read_csv(StringIO(data), sep=",", names=["bid", "tests", "errors"])
-
-            for bid in bugs[pid]:
-                # Extract ground truth diff
-                diff_path = f"benchmarks/defects4j/framework/projects/{pid}/patches/{bid}.src.patch"
-                with open(diff_path, "r", encoding="ISO-8859-1") as diff_file:
-                    diff = diff_file.read()
-
-                # Extract failing test cases and trigger causes
-                failing_test_cases = df[df["bid"] == bid]["tests"].values[0]
-                trigger_cause = df[df["bid"] == bid]["errors"].values[0]
-
-                failing_tests = {}
-                for failing_test_case in failing_test_cases.split(";"):
-                    cause = trigger_cause.split(f"{failing_test_case} --> ")[1]
-                    # The trigger cause list elements are separated by ";" but sometimes this char is also included in the element itself and is not espaced
-                    # To avoid this we check if there are more any remaining elements and remove them from the string.
-                    if " --> " in cause:
-                        while " --> " in cause:
-                            cause = cause.split(" --> ")[1]
-                        for test in failing_test_case.split(";"):
-                            if test in cause:
-                                cause = cause.replace(test, "")
-                    failing_tests[failing_test_case] = cause.strip()
-
-                self.add_bug(Defects4JBug(self, pid, bid, diff, failing_tests))
+        # Get all bug ids for all pids in parallel, keeping a deterministic order
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            project_bids = list(executor.map(self.collect_project_bids, pids))
+
+        return [(pid, bid) for pid, bids in zip(pids, project_bids) for bid in bids]
+
+    def collect_project_bids(self, pid: str) -> List[int]:
+        """
+        Returns the sorted bug ids of the given project.
+        """
+        run = subprocess.run(
+            f"{self.get_bin()} bids -p {pid}",
+            shell=True,
+            capture_output=True,
+            check=True,
+        )
+        bids = sorted({int(bid.decode("utf-8")) for bid in run.stdout.split()})
+        logging.info("Found %3d bugs for project %s" % (len(bids), pid))
+        return bids
+
+    def get_trigger_tests(self, pid: str) -> Dict[int, Dict[str, str]]:
+        """
+        Returns the failing tests and trigger causes of all bugs of the given project.
+        The framework is queried once per project.
+        """
+        with self.trigger_tests_lock:
+            if pid in self.trigger_tests:
+                return self.trigger_tests[pid]
+
+        # Extract failing test and trigger cause
+        run = subprocess.run(
+            f"{self.get_bin()} query -p {pid} -q 'tests.trigger,tests.trigger.cause'",
+            shell=True,
+            capture_output=True,
+            check=True,
+        )
+        trigger_tests = parse_trigger_tests(run.stdout.decode("utf-8"))
+
+        with self.trigger_tests_lock:
+            self.trigger_tests[pid] = trigger_tests
+        return trigger_tests
+
+    def get_record(self, pid: str, bid: int) -> dict:
+        """
+        Returns the metadata of the given bug.
+        """
+        # Extract ground truth diff
+        diff_path = Path(
+            self.path, "framework", "projects", pid, "patches", f"{bid}.src.patch"
+        )
+        with open(diff_path, "r", encoding="ISO-8859-1") as diff_file:
+            diff = diff_file.read()
+
+        return {
+            "pid": pid,
+            "bid": bid,
+            "ground_truth": diff,
+            "failing_tests": self.get_trigger_tests(pid)[bid],
+        }
+
+    def load_bug(self, pid: str, bid: int) -> Defects4JBug:
+        record = self.get_record(pid, bid)
+        return Defects4JBug(
+            self,
+            record["pid"],
+            record["bid"],
+            record["ground_truth"],
+            record["failing_tests"],
+        )
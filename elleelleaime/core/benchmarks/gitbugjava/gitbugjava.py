@@ -2,13 +2,15 @@ from pathlib import Path
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.gitbugjava.gitbugjavabug import GitBugJavaBug
 
-from typing import Optional
+from typing import Dict, Optional, Tuple
+from concurrent.futures import ThreadPoolExecutor
 
 import subprocess
 import logging
 import tqdm
 import re
 import os
+import functools
 
 
 class GitBugJava(Benchmark):
@@ -16,8 +18,14 @@ class GitBugJava(Benchmark):
     The class for representing the GitBug-Java benchmark.
     """
 
-    def __init__(self, path: Path = Path("benchmarks/gitbug-java").absolute()) -> None:
-        super().__init__("gitbugjava", path)
+    def __init__(
+        self,
+        path: Path = Path("benchmarks/gitbug-java").absolute(),
+        n_workers: Optional[int] = None,
+        lazy: bool = False,
+    ) -> None:
+        super().__init__("gitbugjava", path, lazy=lazy)
+        self.n_workers = n_workers or os.cpu_count()
         self.bin = f"cd {self.path} && poetry run {path.joinpath('gitbug-java')}"
 
     def get_bin(self, options: str = "") -> Optional[str]:
@@ -49,45 +57,67 @@ class GitBugJava(Benchmark):
 
         # Get all bug ids
         run = self.run_command("bids")
-        bids = {bid.decode("utf-8") for bid in run.stdout.split()}
+        bids = sorted({bid.decode("utf-8") for bid in run.stdout.split()})
         logging.info("Found %3d bugs" % len(bids))
 
-        for bid in tqdm.tqdm(bids, "Loading GitBug-Java"):
-            # Run info command
-            run = self.run_command(
-                f"info {bid}",
-                check=True,
+        # In lazy mode, only run the info command when a bug is requested
+        if self.lazy:
+            for bid in bids:
+                self.add_lazy_bug(bid, functools.partial(self.load_bug, bid))
+            return
+
+        # Run the info commands in parallel, adding the bugs in a deterministic order
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            for bid, (diff, failing_tests) in tqdm.tqdm(
+                zip(bids, executor.map(self.get_bug_info, bids)),
+                "Loading GitBug-Java",
+                total=len(bids),
+            ):
+                self.add_bug(GitBugJavaBug(self, bid, diff, failing_tests))
+
+    def load_bug(self, bid: str) -> GitBugJavaBug:
+        diff, failing_tests = self.get_bug_info(bid)
+        return GitBugJavaBug(self, bid, diff, failing_tests)
+
+    def get_bug_info(self, bid: str) -> Tuple[str, Dict[str, str]]:
+        """
+        Returns the ground truth diff and the failing tests of the given bug.
+        """
+        # Run info command
+        run = self.run_command(
+            f"info {bid}",
+            check=True,
+        )
+        stdout = run.stdout.decode("utf-8")
+
+        # Get diff (after "### Bug Patch", between triple ticks)
+        diff = stdout.split("### Bug Patch")[1].split("```diff")[1].split("```")[0]
+
+        # Get failing tests
+        # The info command prints out the failing tests in the following format
+        # - failing test
+        #   - type of failure
+        #   - failure message
+        failing_tests = {}
+        stdout = stdout.split("### Failing Tests")[1]
+        for test in re.split(r"(^-)", stdout):
+            # Split the three lines
+            info = test.strip().split("\n")
+
+            # Extract failing test class and method
+            failing_test_case = info[0].replace("-", "", 1).strip()
+            failing_test_case = (
+                failing_test_case.replace(":", "::")
+                .replace("#", "::")
+                .replace("()", "")
             )
-            stdout = run.stdout.decode("utf-8")
-
-            # Get diff (after "### Bug Patch", between triple ticks)
-            diff = stdout.split("### Bug Patch")[1].split("```diff")[1].split("```")[0]
-
-            # Get failing tests
-            # The info command prints out the failing tests in the following format
-            # - failing test
-            #   - type of failure
-            #   - failure message
-            failing_tests = {}
-            stdout = stdout.split("### Failing Tests")[1]
-            for test in re.split(r"(^-)", stdout):
-                # Split the three lines
-                info = test.strip().split("\n")
-
-                # Extract failing test class and method
-                failing_test_case = info[0].replace("-", "", 1).strip()
-                failing_test_case = (
-                    failing_test_case.replace(":", "::")
-                    .replace("#", "::")
-                    .replace("()", "")
-                )
-                # Remove value between '$' and '::' if it exists (happens for jitterted tests)
-                failing_test_case = re.sub(r"\$.*?::", "::", failing_test_case)
-
-                # Extract cause
-                cause = info[2].replace("-", "", 1).strip()
-                if cause == "None":
-                    cause = info[1].replace("-", "", 1).strip()
-                failing_tests[failing_test_case] = cause
-
-            self.add_bug(GitBugJavaBug(self, bid, diff, failing_tests))
+            # Remove value between '$' and '::' if it exists (happens for jitterted tests)
+            failing_test_case = re.sub(r"\$.*?::", "::", failing_test_case)
+
+            # Extract cause
+            cause = info[2].replace("-", "", 1).strip()
+            if cause == "None":
+                cause = info[1].replace("-", "", 1).strip()
+            failing_tests[failing_test_case] = cause
+
+        return diff, failing_tests
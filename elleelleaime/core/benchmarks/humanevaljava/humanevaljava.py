@@ -2,9 +2,10 @@ from pathlib import Path
 from unidiff import PatchSet
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.humanevaljava.humanevaljavabug import HumanEvalJavaBug
+from elleelleaime.core.utils.diff import unified_diff
 
-import subprocess
 import logging
+import functools
 
 
 class HumanEvalJava(Benchmark):
@@ -13,9 +14,11 @@ class HumanEvalJava(Benchmark):
     """
 
     def __init__(
-        self, path: Path = Path("benchmarks/human-eval-java").absolute()
+        self,
+        path: Path = Path("benchmarks/human-eval-java").absolute(),
+        lazy: bool = False,
     ) -> None:
-        super().__init__("humanevaljava", path)
+        super().__init__("humanevaljava", path, lazy=lazy)
 
     def initialize(self) -> None:
         """
@@ -30,51 +33,48 @@ class HumanEvalJava(Benchmark):
         with open(locfile_path, "r") as locfile:
             # Each line is a sample
             for line in locfile.readlines():
-                # Assert that the bug exists
                 bid = line.split()[0]
-                assert Path(
-                    self.get_path(),
-                    "src",
-                    "main",
-                    "java",
-                    "humaneval",
-                    "correct",
-                    f"{bid}.java",
-                ).exists()
-                assert Path(
-                    self.get_path(),
-                    "src",
-                    "main",
-                    "java",
-                    "humaneval",
-                    "buggy",
-                    f"{bid}.java",
-                ).exists()
+                if self.lazy:
+                    self.add_lazy_bug(bid, functools.partial(self.load_bug, bid))
+                else:
+                    self.add_bug(self.load_bug(bid))
 
-                # Compute the diff
-                # Note: we compute an inverted diff to be consistent with Defects4J
-                # Replace the package name temporarily to generate a clean diff
-                subprocess.run(
-                    f"sed -i 's/package humaneval\\.correct/package humaneval\\.buggy/g' {self.get_path()}/src/main/java/humaneval/correct/{bid}.java",
-                    shell=True,
-                    capture_output=True,
-                    check=True,
-                )
+    def load_bug(self, bid: str) -> HumanEvalJavaBug:
+        buggy_path = Path(
+            self.get_path(), "src", "main", "java", "humaneval", "buggy", f"{bid}.java"
+        )
+        correct_path = Path(
+            self.get_path(),
+            "src",
+            "main",
+            "java",
+            "humaneval",
+            "correct",
+            f"{bid}.java",
+        )
+        # Assert that the bug exists
+        assert correct_path.exists()
+        assert buggy_path.exists()
 
-                run = subprocess.run(
-                    f"cd {self.get_path()} && diff --unified src/main/java/humaneval/correct/{bid}.java src/main/java/humaneval/buggy/{bid}.java",
-                    shell=True,
-                    capture_output=True,
-                )
-                diff = PatchSet(run.stdout.decode("utf-8"))
-                # Change the source file path to point to the buggy version
-                diff[0].source_file = f"src/main/java/humaneval/buggy/{bid}.java"
+        # Replace the package name in memory to generate a clean diff
+        with open(correct_path, "r") as f:
+            fixed_code = f.read().replace(
+                "package humaneval.correct", "package humaneval.buggy"
+            )
+        with open(buggy_path, "r") as f:
+            buggy_code = f.read()
 
-                run = subprocess.run(
-                    f"sed -i 's/package humaneval\\.buggy/package humaneval\\.correct/g' {self.get_path()}/src/main/java/humaneval/correct/{bid}.java",
-                    shell=True,
-                    capture_output=True,
-                    check=True,
-                )
+        # Compute the diff
+        # Note: we compute an inverted diff to be consistent with Defects4J
+        diff = PatchSet(
+            unified_diff(
+                fixed_code,
+                buggy_code,
+                f"src/main/java/humaneval/correct/{bid}.java",
+                f"src/main/java/humaneval/buggy/{bid}.java",
+            )
+        )
+        # Change the source file path to point to the buggy version
+        diff[0].source_file = f"src/main/java/humaneval/buggy/{bid}.java"
 
-                self.add_bug(HumanEvalJavaBug(self, bid, str(diff)))
+        return HumanEvalJavaBug(self, bid, str(diff))
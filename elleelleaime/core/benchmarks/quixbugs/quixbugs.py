@@ -2,9 +2,10 @@ from pathlib import Path
 from unidiff import PatchSet
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.quixbugs.quixbugsbug import QuixBugsBug
+from elleelleaime.core.utils.diff import unified_diff
 
-import subprocess
 import logging
+import functools
 
 
 class QuixBugs(Benchmark):
@@ -12,8 +13,10 @@ class QuixBugs(Benchmark):
     The class for representing the QuixBugs benchmark.
     """
 
-    def __init__(self, path: Path = Path("benchmarks/quixbugs").absolute()) -> None:
-        super().__init__("quixbugs", path)
+    def __init__(
+        self, path: Path = Path("benchmarks/quixbugs").absolute(), lazy: bool = False
+    ) -> None:
+        super().__init__("quixbugs", path, lazy=lazy)
 
     def initialize(self) -> None:
         """
@@ -29,21 +32,29 @@ class QuixBugs(Benchmark):
         ]
 
         for algo in algos:
-            buggy_file = Path(self.path, "java_programs", f"{algo}.java")
-            fixed_file = Path(self.path, "correct_java_programs", f"{algo}.java")
-            # Assert that the bug exists
-            assert buggy_file.exists()
-            assert fixed_file.exists()
-
-            # Compute the diff
-            # Note: we compute an inverted diff to be consistent with Defects4J
-            run = subprocess.run(
-                f"cd {self.get_path()} && diff --unified {fixed_file.relative_to(self.path)} {buggy_file.relative_to(self.path)}",
-                shell=True,
-                capture_output=True,
+            if self.lazy:
+                self.add_lazy_bug(algo, functools.partial(self.load_bug, algo))
+            else:
+                self.add_bug(self.load_bug(algo))
+
+    def load_bug(self, algo: str) -> QuixBugsBug:
+        buggy_file = Path(self.path, "java_programs", f"{algo}.java")
+        fixed_file = Path(self.path, "correct_java_programs", f"{algo}.java")
+        # Assert that the bug exists
+        assert buggy_file.exists()
+        assert fixed_file.exists()
+
+        # Compute the diff
+        # Note: we compute an inverted diff to be consistent with Defects4J
+        diff = PatchSet(
+            unified_diff(
+                fixed_file.read_text(),
+                buggy_file.read_text(),
+                f"{fixed_file.relative_to(self.path)}",
+                f"{buggy_file.relative_to(self.path)}",
             )
-            diff = PatchSet(run.stdout.decode("utf-8"))
-            # Change the source file path to point to the buggy version
-            diff[0].source_file = f"{buggy_file.relative_to(self.path)}"
+        )
+        # Change the source file path to point to the buggy version
+        diff[0].source_file = f"{buggy_file.relative_to(self.path)}"
 
-            self.add_bug(QuixBugsBug(self, algo, str(diff)))
+        return QuixBugsBug(self, algo, str(diff))
@@ -104,7 +104,24 @@ FLOAT_EPS = {
 }
 
 
+NUMBER_PATTERN = re.compile(r"-?\d+(?:\.\d+)?$")
+
+
+def match_tokens(expected_token, actual_token, float_eps):
+    # Equal tokens always match, numbers are only parsed for differing tokens
+    if expected_token == actual_token:
+        return True
+    if NUMBER_PATTERN.match(expected_token) and NUMBER_PATTERN.match(actual_token):
+        return abs(Decimal(actual_token) - Decimal(expected_token)) <= float_eps
+    return False
+
+
 def match(expected_output, actual_output, problem_id):
+    """
+    Compares the outputs line by line and token by token, stopping at the first mismatch.
+    Tokens that are both numbers match if they differ by at most the float epsilon of the problem.
+    Equivalent to comparing the outputs parsed by OutputParser.
+    """
     if actual_output is None:
         return False
 
@@ -113,25 +130,24 @@ def match(expected_output, actual_output, problem_id):
     if expected_output == actual_output:
         return True
 
-    expected_parsed = OutputParser(expected_output).parse()
-    actual_parsed = OutputParser(actual_output).parse()
-
-    if len(expected_parsed) != len(actual_parsed):
+    expected_lines = expected_output.splitlines()
+    actual_lines = actual_output.splitlines()
+    if len(expected_lines) != len(actual_lines):
         return False
 
     float_eps = FLOAT_EPS.get(problem_id, DEFAULT_FLOAT_EPS)
 
-    for expected_line, actual_line in zip(expected_parsed, actual_parsed):
-        if len(expected_line) != len(actual_line):
+    for expected_line, actual_line in zip(expected_lines, actual_lines):
+        if expected_line == actual_line:
+            continue
+
+        expected_tokens = expected_line.split()
+        actual_tokens = actual_line.split()
+        if len(expected_tokens) != len(actual_tokens):
             return False
 
-        for expected_element, actual_element in zip(expected_line, actual_line):
-            if isinstance(expected_element, Decimal) and isinstance(
-                actual_element, Decimal
-            ):
-                if abs(actual_element - expected_element) > float_eps:
-                    return False
-            elif actual_element != expected_element:
+        for expected_token, actual_token in zip(expected_tokens, actual_tokens):
+            if not match_tokens(expected_token, actual_token, float_eps):
                 return False
 
     return True
@@ -3,14 +3,33 @@ from unidiff import PatchSet
 from elleelleaime.core.benchmarks.benchmark import Benchmark
 from elleelleaime.core.benchmarks.runbugrun.runbugrunbug import RunBugRunBug
 from elleelleaime.core.benchmarks.runbugrun.output_matcher import match as match_output
+from elleelleaime.core.utils.diff import unified_diff
 
 import os
 import json
+import hashlib
 import subprocess
 import logging
 from tqdm import tqdm
 import pandas as pd
 import concurrent.futures
+import functools
+from typing import Dict, Optional, Tuple
+
+
+def write_if_changed(path: Path, content: str) -> bool:
+    """
+    Writes content to path only if the file is missing or its content hash differs.
+    Returns True if the file was written.
+    """
+    data = content.encode("utf-8")
+    if (
+        path.is_file()
+        and hashlib.sha256(path.read_bytes()).digest() == hashlib.sha256(data).digest()
+    ):
+        return False
+    path.write_bytes(data)
+    return True
 
 
 class RunBugRun(Benchmark):
@@ -18,8 +37,15 @@ class RunBugRun(Benchmark):
     The class for representing the RunBugRun benchmark.
     """
 
-    def __init__(self, path: Path = Path("benchmarks/run_bug_run").absolute()) -> None:
-        super().__init__("runbugrun", path)
+    def __init__(
+        self,
+        path: Path = Path("benchmarks/run_bug_run").absolute(),
+        lazy: bool = False,
+        test_workers: int = 1,
+    ) -> None:
+        super().__init__("runbugrun", path, lazy=lazy)
+        # Number of test cases of a bug run in parallel by RunBugRunBug.test
+        self.test_workers = test_workers
 
     def initialize(self) -> None:
         """
@@ -32,6 +58,11 @@ class RunBugRun(Benchmark):
 
         python_df = pd.read_json(open(python_path), lines=True).set_index("problem_id")
         test_df = pd.read_json(open(test_path), lines=True).set_index("id")
+        # Group the tests by problem once instead of filtering the whole frame per bug
+        self.tests_by_problem = dict(
+            iter(test_df.groupby("problem_id")[["input", "output"]])
+        )
+        self.no_tests = test_df.iloc[0:0][["input", "output"]]
 
         subprocess.run(
             f"mkdir -p {self.path}/buggy",
@@ -70,49 +101,73 @@ class RunBugRun(Benchmark):
             fixed_code,
             errors,
         ) in pbar:
-            buggy_file = Path(self.path, "buggy", f"{prob_id}_{buggy_submission_id}.py")
-            fixed_file = Path(
-                self.path, "fixed", f"{prob_id}_{buggy_submission_id}.py"
-            )  # using buggy id for both to maintain file correspondence
-
-            pbar.set_postfix({"file": buggy_file})
-            pbar.update()
-
-            with open(buggy_file, "w") as f:
-                f.write(buggy_code)
-                f.write("\n")
-
-            with open(fixed_file, "w") as f:
-                f.write(fixed_code)
-                f.write("\n")
-
-            run = subprocess.run(
-                f"""cd {self.get_path()} && 
-                diff --unified {fixed_file.relative_to(self.path)} {buggy_file.relative_to(self.path)}""",
-                shell=True,
-                capture_output=True,
+            loader = functools.partial(
+                self.load_bug,
+                prob_id,
+                buggy_submission_id,
+                buggy_code,
+                fixed_code,
+                errors,
             )
+            if self.lazy:
+                self.add_lazy_bug(f"{prob_id}_{buggy_submission_id}", loader)
+                continue
+
+            bug = loader()
+            if bug is not None:
+                self.add_bug(bug)
+
+    def load_bug(
+        self, prob_id, buggy_submission_id, buggy_code, fixed_code, errors
+    ) -> Optional[RunBugRunBug]:
+        """
+        Writes the buggy and fixed files of a submission and builds the corresponding bug.
+        Returns None if the buggy submission does not fail any test.
+        """
+        buggy_file = Path(self.path, "buggy", f"{prob_id}_{buggy_submission_id}.py")
+        fixed_file = Path(
+            self.path, "fixed", f"{prob_id}_{buggy_submission_id}.py"
+        )  # using buggy id for both to maintain file correspondence
 
-            diff = PatchSet(run.stdout.decode("utf-8"))
-            # Change the source file path to point to the buggy version
-            diff[0].source_file = f"{buggy_file.relative_to(self.path)}"
+        # Files materialized by a previous run are left untouched
+        write_if_changed(buggy_file, f"{buggy_code}\n")
+        write_if_changed(fixed_file, f"{fixed_code}\n")
 
-            test_rows = test_df[test_df.problem_id == prob_id][["input", "output"]]
-            failing_tests = self.get_failing_tests(
-                buggy_file, errors, test_rows, prob_id
+        # Note: we compute an inverted diff to be consistent with Defects4J
+        diff = PatchSet(
+            unified_diff(
+                f"{fixed_code}\n",
+                f"{buggy_code}\n",
+                f"{fixed_file.relative_to(self.path)}",
+                f"{buggy_file.relative_to(self.path)}",
             )
-            if failing_tests:
-                self.add_bug(
-                    RunBugRunBug(
-                        self,
-                        f"{prob_id}_{buggy_submission_id}",
-                        str(diff),
-                        failing_tests,
-                    )
-                )
+        )
+        # Change the source file path to point to the buggy version
+        diff[0].source_file = f"{buggy_file.relative_to(self.path)}"
 
-    def get_failing_tests(self, buggy_file, errors, test_rows, prob_id):
+        test_rows = self.tests_by_problem.get(prob_id, self.no_tests)
+        failing_tests, test_cases = self.get_failing_tests(
+            buggy_file, errors, test_rows, prob_id
+        )
+        if not failing_tests:
+            return None
+
+        return RunBugRunBug(
+            self,
+            f"{prob_id}_{buggy_submission_id}",
+            str(diff),
+            failing_tests,
+            test_cases=test_cases,
+        )
+
+    def get_failing_tests(
+        self, buggy_file, errors, test_rows, prob_id
+    ) -> Tuple[Dict[str, str], Dict[str, Tuple[str, str]]]:
+        """
+        Returns the failure cause and the (input, expected output) pair of each failing test.
+        """
         failing_tests = {}
+        test_cases = {}
         test_results = []
 
         results_path = Path(self.get_path(), buggy_file.with_suffix(".jsonl"))
@@ -132,6 +187,7 @@ class RunBugRun(Benchmark):
                     result = errors[0]["exception"] + "\n" + errors[0]["output"]
                     cause = f"""Function with input:\n{test_input}\nexpected to output:\n{test_output}\nfailed with error:\n{result.strip()}"""
                     failing_tests[f"""test_{test_id}"""] = cause
+                    test_cases[f"""test_{test_id}"""] = (test_input, test_output)
                 elif (
                     not already_cached
                 ):  # if there isn't a runtime exception, need to execute to get the cause of test failure
@@ -155,9 +211,11 @@ class RunBugRun(Benchmark):
                     if returncode:
                         cause = f"""Function with input:\n{test_input}\nexpected to output:\n{test_output}\nfailed with error:\n{result.strip()}"""
                         failing_tests[f"""test_{test_id}"""] = cause
+                        test_cases[f"""test_{test_id}"""] = (test_input, test_output)
                     elif not match_output(test_output, result, prob_id):
                         cause = f"""Function with input:\n{test_input}\nexpected to output:\n{test_output}\nbut got:\n{result}"""
                         failing_tests[f"""test_{test_id}"""] = cause
+                        test_cases[f"""test_{test_id}"""] = (test_input, test_output)
                     else:
                         pass
                     test_results.append(
@@ -190,5 +248,9 @@ class RunBugRun(Benchmark):
                         failing_tests[f"""test_{test_id}"""] = cause
                     else:
                         continue
+                    test_cases[f"""test_{test_id}"""] = (
+                        str(test_input),
+                        str(test_output),
+                    )
 
-        return failing_tests
+        return failing_tests, test_cases
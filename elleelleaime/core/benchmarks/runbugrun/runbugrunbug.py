@@ -2,6 +2,8 @@ import subprocess
 import shutil
 import os
 from pathlib import Path
+from typing import Dict, Optional, Tuple
+import concurrent.futures
 import re
 
 from elleelleaime.core.benchmarks.benchmark import Benchmark
@@ -9,6 +11,7 @@ from elleelleaime.core.benchmarks.bug import RichBug
 from elleelleaime.core.benchmarks.test_result import TestResult
 from elleelleaime.core.benchmarks.compile_result import CompileResult
 from elleelleaime.core.benchmarks.runbugrun.output_matcher import match as match_output
+from elleelleaime.core.benchmarks.runbugrun.runner import get_worker_pool
 
 
 class RunBugRunBug(RichBug):
@@ -16,6 +19,38 @@ class RunBugRunBug(RichBug):
     The class for representing RunBugRun bugs
     """
 
+    def __init__(
+        self,
+        benchmark: Benchmark,
+        identifier: str,
+        ground_truth: str,
+        failing_tests: Dict[str, str],
+        test_cases: Optional[Dict[str, Tuple[str, str]]] = None,
+        ground_truth_inverted: bool = False,
+    ) -> None:
+        super().__init__(
+            benchmark, identifier, ground_truth, failing_tests, ground_truth_inverted
+        )
+        # Maps each failing test to its (input, expected output) pair
+        if test_cases is None:
+            test_cases = {
+                test_case: RunBugRunBug.parse_test_case(cause)
+                for test_case, cause in failing_tests.items()
+            }
+        self.test_cases = test_cases
+
+    @staticmethod
+    def parse_test_case(cause: str) -> Tuple[str, str]:
+        """
+        Recovers the input and expected output of a test case from its failure cause.
+        """
+        match = re.search(
+            "Function with input:\n(.*)\nexpected to output:\n(.*)\n(?:failed|but got)",
+            cause,
+            re.DOTALL,
+        )
+        return match.group(1), match.group(2)
+
     def checkout(self, path: str, fixed: bool = False) -> bool:
         # Remove the directory if it exists
         shutil.rmtree(path, ignore_errors=True)
@@ -56,54 +91,40 @@ class RunBugRunBug(RichBug):
         file_path = Path(path, "buggy", f"{self.get_identifier()}.py")
         assert file_path.exists()
 
-        for test_case, cause in self.failing_tests.items():
-            match = re.search(
-                "Function with input:\n(.*)\nexpected to output:\n(.*)\n(?:failed|but got)",
-                cause,
-                re.DOTALL,
-            )
-            test_input, test_output = match.group(1), match.group(2)
+        problem_id = self.get_identifier().split("_")[0]
+
+        def run_test_case(test_case: Tuple[str, str]) -> bool:
+            test_input, test_output = test_case
             error_code, result = RunBugRunBug.execute_test_case(file_path, test_input)
+            return not error_code and match_output(
+                test_output.strip(), result.strip(), problem_id
+            )
 
-            if error_code and (
-                "Syntax error: EOF in backquote substitution" in result
-                or "Argument list too long:" in result
-            ):  # these are shell related, skip
-                continue
+        test_workers = self.benchmark.test_workers
+        if test_workers <= 1:
+            for test_case in self.test_cases.values():
+                if not run_test_case(test_case):
+                    return TestResult(False)
+            return TestResult(True)
 
-            if error_code:
-                return TestResult(False)
-            elif not match_output(
-                test_output.strip(), result.strip(), self.get_identifier().split("_")[0]
-            ):
-                return TestResult(False)
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=test_workers)
+        try:
+            futures = [
+                executor.submit(run_test_case, test_case)
+                for test_case in self.test_cases.values()
+            ]
+            for future in concurrent.futures.as_completed(futures):
+                if not future.result():
+                    return TestResult(False)
+        finally:
+            # Stop at the first failure, the remaining test cases are cancelled
+            executor.shutdown(wait=False, cancel_futures=True)
 
         return TestResult(True)
 
     @staticmethod
     def execute_test_case(code_path, test_input):
-        if test_input.strip():
-            cmd = f"""echo "{test_input}" | python {code_path}"""
-        else:
-            cmd = f"""python {code_path}"""
-        try:
-            run = subprocess.run(
-                cmd,
-                shell=True,
-                capture_output=True,
-                check=False,
-                timeout=1,  # about 90 solutions time out, increase when regenerating buggy_test_results (2 solutions still hang waiting on empty input)
-            )
-        except OSError:
-            return 255, "OSError: [Errno 7] Argument list too long: '/bin/sh'"
-        except subprocess.TimeoutExpired:
-            return 1, f"Command '{cmd}' timed out after 1 seconds"
-
-        return run.returncode, (
-            run.stderr.decode("utf-8").strip()
-            if run.returncode
-            else run.stdout.decode("utf-8").strip()
-        )
+        return get_worker_pool().execute(code_path, test_input)
 
     def get_src_test_dir(self, path: str) -> str:
         return path
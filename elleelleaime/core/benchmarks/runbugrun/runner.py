@@ -0,0 +1,168 @@
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import os
+import sys
+import json
+import queue
+import atexit
+import logging
+import threading
+import subprocess
+
+WORKER_PATH = Path(__file__).with_name("worker.py")
+
+DEFAULT_TIMEOUT = 1
+DEFAULT_MEMORY_LIMIT = 2 * 1024**3
+DEFAULT_FILE_SIZE_LIMIT = 64 * 1024**2
+DEFAULT_MAX_OUTPUT = 64 * 1024**2
+
+
+class PythonWorker:
+    """
+    A persistent worker process running worker.py.
+    """
+
+    def __init__(self, memory_limit: int, file_size_limit: int, max_output: int):
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                str(WORKER_PATH),
+                str(memory_limit),
+                str(file_size_limit),
+                str(max_output),
+            ],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+        )
+
+    def request(self, request: dict) -> Optional[dict]:
+        """
+        Sends a request to the worker and waits for its response.
+        Returns None if the worker died.
+        """
+        try:
+            self.process.stdin.write(json.dumps(request).encode("utf-8") + b"\n")
+            self.process.stdin.flush()
+            line = self.process.stdout.readline()
+        except (BrokenPipeError, OSError):
+            return None
+        if not line:
+            return None
+        return json.loads(line)
+
+    def close(self) -> None:
+        try:
+            self.process.stdin.close()
+        except OSError:
+            pass
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+
+class PythonWorkerPool:
+    """
+    Pool of persistent Python workers that run RunBugRun submissions against test inputs.
+
+    Each worker forks a fresh child per test case from an already initialized interpreter,
+    so running a test list does not pay for one interpreter startup per case. Inputs are fed
+    through a pipe (no shell involved) and resource limits are applied to each child.
+    """
+
+    def __init__(
+        self,
+        n_workers: Optional[int] = None,
+        timeout: float = DEFAULT_TIMEOUT,
+        memory_limit: int = DEFAULT_MEMORY_LIMIT,
+        file_size_limit: int = DEFAULT_FILE_SIZE_LIMIT,
+        max_output: int = DEFAULT_MAX_OUTPUT,
+    ):
+        self.n_workers = n_workers if n_workers is not None else (os.cpu_count() or 1)
+        self.timeout = timeout
+        self.memory_limit = memory_limit
+        self.file_size_limit = file_size_limit
+        self.max_output = max_output
+        self.idle: queue.LifoQueue = queue.LifoQueue()
+        self.workers: List[PythonWorker] = []
+        self.lock = threading.Lock()
+
+    def acquire(self) -> PythonWorker:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.workers) < self.n_workers:
+                return self.spawn()
+        return self.idle.get()
+
+    def spawn(self) -> PythonWorker:
+        worker = PythonWorker(self.memory_limit, self.file_size_limit, self.max_output)
+        self.workers.append(worker)
+        return worker
+
+    def replace(self, worker: PythonWorker) -> None:
+        """
+        Replaces a dead worker so that threads waiting for an idle worker are not starved.
+        """
+        worker.close()
+        with self.lock:
+            self.workers.remove(worker)
+            self.idle.put(self.spawn())
+
+    def execute(self, code_path, test_input: str) -> Tuple[int, str]:
+        """
+        Runs the Python file with the test input as stdin.
+
+        Returns:
+            Tuple[int, str]: The return code and the stripped stdout (stderr if the return code is not zero)
+        """
+        request = {
+            "path": str(Path(code_path).absolute()),
+            # Mirrors `echo "{input}" | python {code_path}`
+            "input": f"{test_input}\n" if test_input.strip() else "",
+            "timeout": self.timeout,
+        }
+
+        worker = self.acquire()
+        response = worker.request(request)
+        if response is None:
+            logging.warning(f"Python worker died while running {code_path}")
+            self.replace(worker)
+            return 255, f"Python worker died while running {code_path}"
+        self.idle.put(worker)
+
+        if response["timed_out"]:
+            return 1, f"Command '{code_path}' timed out after {self.timeout} seconds"
+
+        return response["returncode"], (
+            response["stderr"].strip()
+            if response["returncode"]
+            else response["stdout"].strip()
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            workers, self.workers = self.workers, []
+        for worker in workers:
+            worker.close()
+
+
+_pool: Optional[PythonWorkerPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_worker_pool() -> PythonWorkerPool:
+    """
+    Returns the worker pool shared by all RunBugRun bugs of this process.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = PythonWorkerPool()
+            atexit.register(_pool.close)
+        return _pool
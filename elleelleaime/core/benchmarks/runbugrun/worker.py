@@ -0,0 +1,219 @@
+"""
+Standalone worker that runs RunBugRun submissions on behalf of PythonWorkerPool.
+
+The worker is started once with `python worker.py <memory_limit> <file_size_limit> <max_output>`
+and then reads one JSON request per line from stdin:
+
+    {"path": "/abs/path/submission.py", "input": "...", "timeout": 1.0}
+
+For each request it forks a fresh child that runs the submission as `__main__`, with the
+input fed through a pipe and resource limits applied, and answers with one JSON line:
+
+    {"returncode": 0, "stdout": "...", "stderr": "...", "timed_out": false}
+
+Forking from this already initialized interpreter avoids paying for a Python startup per
+test case. This file must only depend on the standard library since it is run by path.
+"""
+
+import io
+import os
+import sys
+import json
+import math
+import time
+import runpy
+import signal
+import resource
+import selectors
+import traceback
+
+CHUNK_SIZE = 65536
+# Bound of the descriptors closed in the child when /proc/self/fd cannot be listed
+MAX_INHERITED_FD = 4096
+
+
+def exit_code(e: SystemExit) -> int:
+    # Mirror how the interpreter turns SystemExit into a process exit code
+    if e.code is None:
+        return 0
+    if isinstance(e.code, int):
+        return e.code
+    print(e.code, file=sys.stderr)
+    return 1
+
+
+def close_inherited_fds() -> None:
+    """
+    Closes the file descriptors above the standard streams, i.e. the protocol streams and
+    every other pipe end inherited from the worker.
+    """
+    try:
+        fds = [int(fd) for fd in os.listdir("/proc/self/fd")]
+    except OSError:
+        # The limit may be huge or unlimited, so only a bounded range is closed
+        limit = resource.getrlimit(resource.RLIMIT_NOFILE)[0]
+        if limit == resource.RLIM_INFINITY or limit > MAX_INHERITED_FD:
+            limit = MAX_INHERITED_FD
+        os.closerange(3, limit)
+        return
+    for fd in fds:
+        if fd > 2:
+            try:
+                os.close(fd)
+            except OSError:
+                # e.g. the descriptor of the listed directory, already closed
+                pass
+
+
+def run_submission(
+    path: str, timeout: float, memory_limit: int, file_size_limit: int
+) -> None:
+    """
+    Runs the submission in the current (forked) process and never returns.
+    Standard streams must already point to the pipes of the parent.
+    """
+    code = 0
+    try:
+        resource.setrlimit(resource.RLIMIT_AS, (memory_limit, memory_limit))
+        cpu_limit = math.ceil(timeout) + 1
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (file_size_limit, file_size_limit))
+
+        sys.stdin = open(0, "r", encoding="utf-8", closefd=False)
+        sys.stdout = open(1, "w", encoding="utf-8", closefd=False)
+        sys.stderr = open(2, "w", encoding="utf-8", closefd=False)
+        sys.argv = [path]
+        sys.path[0] = os.path.dirname(path)
+
+        try:
+            runpy.run_path(path, run_name="__main__")
+        except SystemExit as e:
+            code = exit_code(e)
+        except BaseException as e:
+            # Hide the frames of the worker and runpy, as `python path` would
+            tb = e.__traceback__
+            while tb is not None and tb.tb_frame.f_code.co_filename != path:
+                tb = tb.tb_next
+            traceback.print_exception(type(e), e, tb)
+            code = 1
+
+        try:
+            sys.stdout.flush()
+            sys.stderr.flush()
+        except BaseException:
+            code = code or 120
+    finally:
+        os._exit(code)
+
+
+def execute(
+    request: dict, memory_limit: int, file_size_limit: int, max_output: int
+) -> dict:
+    path = request["path"]
+    data = request["input"].encode("utf-8")
+    timeout = request["timeout"]
+
+    stdin_r, stdin_w = os.pipe()
+    stdout_r, stdout_w = os.pipe()
+    stderr_r, stderr_w = os.pipe()
+
+    pid = os.fork()
+    if pid == 0:
+        try:
+            os.setpgid(0, 0)
+            os.dup2(stdin_r, 0)
+            os.dup2(stdout_w, 1)
+            os.dup2(stderr_w, 2)
+            close_inherited_fds()
+        except BaseException:
+            os._exit(255)
+        run_submission(path, timeout, memory_limit, file_size_limit)
+
+    os.close(stdin_r)
+    os.close(stdout_w)
+    os.close(stderr_w)
+
+    outputs = {stdout_r: bytearray(), stderr_r: bytearray()}
+    selector = selectors.DefaultSelector()
+    selector.register(stdout_r, selectors.EVENT_READ)
+    selector.register(stderr_r, selectors.EVENT_READ)
+    if data:
+        os.set_blocking(stdin_w, False)
+        selector.register(stdin_w, selectors.EVENT_WRITE)
+    else:
+        os.close(stdin_w)
+
+    deadline = time.monotonic() + timeout
+    offset = 0
+    timed_out = False
+    output_exceeded = False
+    while selector.get_map() and not output_exceeded:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            timed_out = True
+            break
+        for key, _ in selector.select(remaining):
+            if key.fd == stdin_w:
+                try:
+                    offset += os.write(stdin_w, data[offset : offset + CHUNK_SIZE])
+                except BrokenPipeError:
+                    offset = len(data)
+                if offset >= len(data):
+                    selector.unregister(stdin_w)
+                    os.close(stdin_w)
+                continue
+
+            chunk = os.read(key.fd, CHUNK_SIZE)
+            if not chunk:
+                selector.unregister(key.fd)
+                os.close(key.fd)
+                continue
+            outputs[key.fd] += chunk
+            if len(outputs[key.fd]) > max_output:
+                output_exceeded = True
+
+    # Wait for the child, which may still be running after closing its streams
+    while True:
+        finished, status = os.waitpid(pid, os.WNOHANG)
+        if finished:
+            break
+        if timed_out or output_exceeded or time.monotonic() >= deadline:
+            timed_out = timed_out or not output_exceeded
+            try:
+                os.killpg(pid, signal.SIGKILL)
+            except ProcessLookupError:
+                pass
+            _, status = os.waitpid(pid, 0)
+            break
+        time.sleep(0.001)
+
+    for key in list(selector.get_map().values()):
+        os.close(key.fd)
+    selector.close()
+
+    stderr = outputs[stderr_r].decode("utf-8", errors="replace")
+    if output_exceeded:
+        stderr += f"\nOutput limit of {max_output} bytes exceeded"
+
+    return {
+        "returncode": os.waitstatus_to_exitcode(status),
+        "stdout": outputs[stdout_r].decode("utf-8", errors="replace"),
+        "stderr": stderr,
+        "timed_out": timed_out,
+    }
+
+
+def main() -> None:
+    memory_limit, file_size_limit, max_output = (int(arg) for arg in sys.argv[1:4])
+
+    protocol_in = io.open(os.dup(0), "rb")
+    protocol_out = io.open(os.dup(1), "wb")
+
+    for line in protocol_in:
+        response = execute(json.loads(line), memory_limit, file_size_limit, max_output)
+        protocol_out.write(json.dumps(response).encode("utf-8") + b"\n")
+        protocol_out.flush()
+
+
+if __name__ == "__main__":
+    main()
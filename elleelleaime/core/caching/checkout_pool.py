@@ -0,0 +1,199 @@
+import os
+import atexit
+import shutil
+import getpass
+import logging
+import tempfile
+import threading
+import subprocess
+
+from pathlib import Path
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from elleelleaime.core.benchmarks.bug import Bug
+
+DEFAULT_CHECKOUT_POOL_DIR = Path(
+    tempfile.gettempdir(), f"elleelleaime-{getpass.getuser()}", "checkout-pool"
+)
+DEFAULT_CHECKOUT_POOL_MAX_BYTES = 20 * 1024**3
+
+
+def get_directory_size(path: Path) -> int:
+    """
+    Returns the total size in bytes of the files under path, without following symlinks.
+    """
+    size = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            size += os.lstat(os.path.join(root, name)).st_size
+    return size
+
+
+def supports_reflinks(path: Path) -> bool:
+    """
+    Returns whether files under path can be reflinked, e.g. on Btrfs or XFS but not on ext4.
+    """
+    source = Path(path, ".reflink-probe")
+    try:
+        source.write_text("probe")
+        run = subprocess.run(
+            ["cp", "--reflink=always", str(source), f"{source}.copy"],
+            capture_output=True,
+        )
+        return run.returncode == 0
+    finally:
+        source.unlink(missing_ok=True)
+        Path(f"{source}.copy").unlink(missing_ok=True)
+
+
+class CheckoutPool:
+    """
+    Pool of pristine checkouts from which working copies are cloned.
+
+    Each bug is checked out once into a template, and every later checkout of the same
+    bug is a copy of that template (a reflink where the filesystem supports it, and a deep
+    copy otherwise). Templates are evicted in least recently used order once their total
+    size exceeds the disk budget.
+
+    The lock of a template is only held while it is created or evicted. Copies run
+    concurrently, and a template being copied is not evicted.
+    """
+
+    def __init__(
+        self,
+        root: Path = DEFAULT_CHECKOUT_POOL_DIR,
+        max_bytes: int = DEFAULT_CHECKOUT_POOL_MAX_BYTES,
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.path: Optional[Path] = None
+        # Template sizes, from least to most recently used
+        self.templates: OrderedDict[str, int] = OrderedDict()
+        self.template_locks: Dict[str, threading.Lock] = {}
+        # Number of copies in progress of each template
+        self.copies: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def get_template_key(self, bug: Bug, fixed: bool) -> str:
+        return f"{bug.benchmark.get_identifier()}-{bug.get_identifier()}-{'fixed' if fixed else 'buggy'}"
+
+    def get_template_lock(self, key: str) -> threading.Lock:
+        with self.lock:
+            return self.template_locks.setdefault(key, threading.Lock())
+
+    def get_pool_path(self) -> Path:
+        with self.lock:
+            if self.path is None:
+                # Each pool has its own directory so that processes sharing root do not interfere
+                self.root.mkdir(parents=True, exist_ok=True)
+                self.path = Path(tempfile.mkdtemp(prefix="pool-", dir=self.root))
+                if not supports_reflinks(self.path):
+                    logging.warning(
+                        f"Reflinks are not supported under {self.root}, checkouts are deep copies of their templates"
+                    )
+            return self.path
+
+    def create_template(self, bug: Bug, key: str, fixed: bool) -> Path:
+        template_path = Path(self.get_pool_path(), key)
+        tmp_path = Path(self.get_pool_path(), f"{key}.tmp")
+        try:
+            bug.checkout(str(tmp_path), fixed=fixed)
+            os.replace(tmp_path, template_path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        size = get_directory_size(template_path)
+        with self.lock:
+            self.templates[key] = size
+        logging.info(f"Created checkout template for {key} ({size} bytes)")
+        return template_path
+
+    def checkout(self, bug: Bug, path: str, fixed: bool = False) -> bool:
+        """
+        Checks out the bug into path by cloning its template, creating the template if needed.
+        """
+        key = self.get_template_key(bug, fixed)
+        with self.get_template_lock(key):
+            with self.lock:
+                exists = key in self.templates
+            if exists:
+                template_path = Path(self.get_pool_path(), key)
+            else:
+                template_path = self.create_template(bug, key, fixed)
+            with self.lock:
+                self.templates.move_to_end(key)
+                self.copies[key] = self.copies.get(key, 0) + 1
+
+        try:
+            shutil.rmtree(path, ignore_errors=True)
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+            # Note: hardlinks are not an option since candidates and builds modify files in place
+            run = subprocess.run(
+                f"cp -a --reflink=auto {template_path} {path}",
+                shell=True,
+                capture_output=True,
+                check=True,
+            )
+        finally:
+            with self.lock:
+                self.copies[key] -= 1
+                if self.copies[key] == 0:
+                    del self.copies[key]
+
+        self.evict()
+        return run.returncode == 0
+
+    def evict(self) -> None:
+        """
+        Removes the least recently used templates until the pool fits in its disk budget.
+        Templates being created or copied are skipped.
+        """
+        with self.lock:
+            total = sum(self.templates.values())
+            keys = list(self.templates)
+
+        for key in keys:
+            if total <= self.max_bytes:
+                break
+            lock = self.get_template_lock(key)
+            if not lock.acquire(blocking=False):
+                continue
+            try:
+                with self.lock:
+                    if key in self.copies:
+                        continue
+                    size = self.templates.pop(key, None)
+                if size is None:
+                    continue
+                shutil.rmtree(Path(self.get_pool_path(), key), ignore_errors=True)
+                total -= size
+                logging.info(f"Evicted checkout template for {key}")
+            finally:
+                lock.release()
+
+    def close(self) -> None:
+        with self.lock:
+            path, self.path = self.path, None
+            self.templates.clear()
+        if path is not None:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+_pools: Dict[str, CheckoutPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_checkout_pool(
+    root: Path = DEFAULT_CHECKOUT_POOL_DIR,
+    max_bytes: int = DEFAULT_CHECKOUT_POOL_MAX_BYTES,
+) -> CheckoutPool:
+    """
+    Returns the checkout pool of this process for the given root, creating it if needed.
+    """
+    key = str(Path(root).absolute())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = CheckoutPool(root, max_bytes)
+            atexit.register(_pools[key].close)
+        return _pools[key]
@@ -0,0 +1,175 @@
+import os
+import json
+import hashlib
+import logging
+import threading
+
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from elleelleaime.core.benchmarks.bug import Bug
+
+DEFAULT_EXTRACTION_CACHE_DIR = Path(".cache", "extraction")
+
+
+class ExtractionError(Exception):
+    """
+    Raised by extractions that failed, e.g. because of a checkout or extractor failure,
+    and may succeed on a later run. These are not cached.
+    """
+
+
+class ExtractionCache:
+    """
+    Content-addressed cache of the code extracted from bugs, e.g. the buggy and fixed functions.
+
+    Each bug has one JSON record per key, where the key hashes the ground truth of the bug
+    and the content of the tools used for the extraction. The record holds one field per
+    extraction, so that strategies needing different extractions of the same bug share it.
+    Records are also kept in memory, and only there if cache_path is None.
+    """
+
+    # Bump whenever the layout of the stored records changes
+    VERSION = 1
+
+    def __init__(self, cache_path: Optional[Path] = DEFAULT_EXTRACTION_CACHE_DIR):
+        self.cache_path = Path(cache_path) if cache_path is not None else None
+        self.tool_hashes: Dict[str, Tuple[int, int, str]] = {}
+        self.records: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+        self.lock = threading.Lock()
+
+    def get_tool_hash(self, tool: Path) -> str:
+        """
+        Returns the hash of the content of a tool, recomputed only if the file changed.
+        """
+        try:
+            tool_stat = os.stat(tool)
+        except OSError:
+            return "missing"
+        key = str(Path(tool).absolute())
+        with self.lock:
+            cached = self.tool_hashes.get(key)
+        if cached is not None and cached[:2] == (
+            tool_stat.st_size,
+            tool_stat.st_mtime_ns,
+        ):
+            return cached[2]
+
+        tool_hash = hashlib.sha256(Path(tool).read_bytes()).hexdigest()
+        with self.lock:
+            self.tool_hashes[key] = (
+                tool_stat.st_size,
+                tool_stat.st_mtime_ns,
+                tool_hash,
+            )
+        return tool_hash
+
+    def get_key(self, bug: Bug, tools: List[Path]) -> str:
+        sha = hashlib.sha256()
+        sha.update(str(self.VERSION).encode())
+        sha.update(bug.get_ground_truth().encode())
+        for tool in tools:
+            sha.update(Path(tool).name.encode())
+            sha.update(self.get_tool_hash(tool).encode())
+        return sha.hexdigest()
+
+    def get_record_id(self, bug: Bug, tools: List[Path]) -> Tuple[str, str, str]:
+        return (
+            bug.benchmark.get_identifier(),
+            bug.get_identifier(),
+            self.get_key(bug, tools),
+        )
+
+    def get_record_path(self, record_id: Tuple[str, str, str]) -> Optional[Path]:
+        if self.cache_path is None:
+            return None
+        benchmark, bid, key = record_id
+        return Path(self.cache_path, benchmark, bid, f"{key}.json")
+
+    def load(self, bug: Bug, tools: List[Path]) -> Dict[str, Any]:
+        """
+        Returns the cached extractions of the bug, or an empty record if there are none.
+        """
+        record_id = self.get_record_id(bug, tools)
+        with self.lock:
+            if record_id not in self.records:
+                self.records[record_id] = self.read_record(record_id)
+            return dict(self.records[record_id])
+
+    def read_record(self, record_id: Tuple[str, str, str]) -> Dict[str, Any]:
+        record_path = self.get_record_path(record_id)
+        if record_path is None or not record_path.exists():
+            return {}
+
+        try:
+            with open(record_path, "r") as f:
+                return json.load(f)
+        except (OSError, json.JSONDecodeError) as e:
+            logging.warning(f"Ignoring unreadable extraction record {record_path}: {e}")
+            return {}
+
+    def update(self, bug: Bug, tools: List[Path], extractions: Dict[str, Any]) -> None:
+        """
+        Adds the extractions to the record of the bug.
+        """
+        record_id = self.get_record_id(bug, tools)
+        record_path = self.get_record_path(record_id)
+
+        with self.lock:
+            record = {
+                **self.read_record(record_id),
+                **self.records.get(record_id, {}),
+                **extractions,
+            }
+            # Round-trip through JSON so that cached and fresh records look the same
+            self.records[record_id] = json.loads(json.dumps(record))
+            if record_path is None:
+                return
+
+            record_path.parent.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so that concurrent readers never see a partial record
+            tmp_path = record_path.with_name(
+                f"{record_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+            )
+            with open(tmp_path, "w") as f:
+                json.dump(record, f)
+            os.replace(tmp_path, record_path)
+
+    def get_or_extract(
+        self,
+        bug: Bug,
+        tools: List[Path],
+        fields: List[str],
+        extract: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Returns the given extractions of the bug, calling extract() if any of them is not cached.
+        Every extraction returned by extract() is cached, including negative results such as
+        None for a bug that is not single-function, or {} for a bug without failing test cases.
+        Failures raise an ExtractionError, or any other exception, and are not cached.
+        """
+        record = self.load(bug, tools)
+        if all(field in record for field in fields):
+            return record
+
+        # Round-trip through JSON so that cached and fresh extractions look the same
+        extractions = json.loads(json.dumps(extract()))
+        self.update(bug, tools, extractions)
+        return {**self.load(bug, tools), **extractions}
+
+
+_caches: Dict[str, ExtractionCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_extraction_cache(
+    cache_path: Path = DEFAULT_EXTRACTION_CACHE_DIR,
+) -> ExtractionCache:
+    """
+    Returns the extraction cache of this process for the given path, creating it if needed.
+    """
+    key = str(Path(cache_path).absolute())
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = ExtractionCache(cache_path)
+        return _caches[key]
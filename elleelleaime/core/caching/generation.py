@@ -0,0 +1,128 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+import threading
+
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+DEFAULT_GENERATION_CACHE_DIR = Path(".cache", "generation")
+
+
+def is_complete_generation(generation: Any) -> bool:
+    """
+    Returns whether a generation holds no failed request, and can be cached.
+    """
+    if generation is None:
+        return False
+    if isinstance(generation, list):
+        return not any(
+            g is None or (isinstance(g, dict) and "error" in g) for g in generation
+        )
+    return not (isinstance(generation, dict) and "error" in generation)
+
+
+class GenerationCache:
+    """
+    Content-addressed cache of the generations of the models.
+
+    Each generation is keyed by the hash of the settings of the strategy (its name, the model,
+    the temperature, the number of samples, ...), of the prompt, and of the identifier of the
+    prompt, e.g. the one of its sample, so that identical prompts are generated independently.
+    Prompts without an identifier are numbered among the identical prompts of their chunk.
+    Entries are gzipped JSON files.
+    """
+
+    # Bump whenever the layout of the stored entries changes
+    VERSION = 1
+
+    def __init__(self, cache_path: Path = DEFAULT_GENERATION_CACHE_DIR):
+        self.cache_path = Path(cache_path)
+
+    def get_key(self, settings: Dict[str, Any], prompt: str, index: Any = 0) -> str:
+        return hashlib.sha256(
+            json.dumps(
+                [self.VERSION, settings, prompt, index], sort_keys=True, default=str
+            ).encode()
+        ).hexdigest()
+
+    def get_keys(
+        self,
+        settings: Dict[str, Any],
+        prompts: List[str],
+        prompt_ids: Optional[List[Any]] = None,
+    ) -> List[str]:
+        """
+        Returns the keys of the prompts of a chunk, given their identifiers if any.
+        Otherwise, the occurrences of identical prompts are numbered, which only identifies
+        them as long as the chunk is the same.
+        """
+        if prompt_ids is not None:
+            return [
+                self.get_key(settings, prompt, prompt_id)
+                for prompt, prompt_id in zip(prompts, prompt_ids)
+            ]
+
+        occurrences: Dict[str, int] = {}
+        keys = []
+        for prompt in prompts:
+            index = occurrences.get(prompt, 0)
+            occurrences[prompt] = index + 1
+            keys.append(self.get_key(settings, prompt, index))
+        return keys
+
+    def get_entry_path(self, key: str) -> Path:
+        return Path(self.cache_path, key[:2], f"{key}.json.gz")
+
+    def load(self, key: str) -> Optional[Any]:
+        """
+        Returns the cached generation, or None if there is none.
+        """
+        entry_path = self.get_entry_path(key)
+        if not entry_path.exists():
+            return None
+
+        try:
+            with gzip.open(entry_path, "rt") as f:
+                return json.load(f)
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            logging.warning(f"Ignoring unreadable generation entry {entry_path}: {e}")
+            return None
+
+    def save(self, key: str, generation: Any) -> bool:
+        """
+        Caches the generation if it is complete. Returns whether it was cached.
+        """
+        if not is_complete_generation(generation):
+            return False
+
+        entry_path = self.get_entry_path(key)
+        entry_path.parent.mkdir(parents=True, exist_ok=True)
+        # Write to a temporary file first so that concurrent readers never see a partial entry
+        tmp_path = entry_path.with_name(
+            f"{entry_path.name}.{os.getpid()}.{threading.get_ident()}.tmp"
+        )
+        with open(tmp_path, "wb") as f:
+            with gzip.GzipFile(fileobj=f, mode="wb", mtime=0) as gzf:
+                gzf.write(json.dumps(generation).encode("utf-8"))
+        os.replace(tmp_path, entry_path)
+        return True
+
+
+_caches: Dict[str, GenerationCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_generation_cache(
+    cache_path: Path = DEFAULT_GENERATION_CACHE_DIR,
+) -> GenerationCache:
+    """
+    Returns the generation cache of this process for the given path, creating it if needed.
+    """
+    key = str(Path(cache_path).absolute())
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = GenerationCache(cache_path)
+        return _caches[key]
@@ -0,0 +1,81 @@
+import os
+import gzip
+import json
+import hashlib
+import logging
+
+from pathlib import Path
+from typing import List, Optional
+
+DEFAULT_SNAPSHOT_DIR = Path(".cache", "snapshots")
+
+
+def compute_fingerprint(root: Path, patterns: List[str]) -> str:
+    """
+    Computes a fingerprint of the files under root matching the given glob patterns.
+    The fingerprint changes whenever a file is added, removed or modified.
+    """
+    sha = hashlib.sha256()
+    sha.update(str(BenchmarkSnapshot.VERSION).encode())
+    for pattern in patterns:
+        for path in sorted(root.glob(pattern)):
+            if not path.is_file():
+                continue
+            sha.update(path.relative_to(root).as_posix().encode())
+            sha.update(path.read_bytes())
+    return sha.hexdigest()
+
+
+class BenchmarkSnapshot:
+    """
+    Versioned on-disk snapshot of the bug metadata of an initialized benchmark.
+
+    The snapshot stores one record per bug and is only considered valid if it
+    was written with the same version and fingerprint.
+    """
+
+    # Bump whenever the layout of the stored records changes
+    VERSION = 1
+
+    def __init__(self, snapshot_path: Path, fingerprint: str):
+        self.snapshot_path = Path(snapshot_path)
+        self.fingerprint = fingerprint
+
+    def load(self) -> Optional[List[dict]]:
+        if not self.snapshot_path.exists():
+            return None
+
+        try:
+            with gzip.open(self.snapshot_path, "rt", encoding="utf-8") as f:
+                snapshot = json.load(f)
+        except (OSError, EOFError, json.JSONDecodeError) as e:
+            logging.warning(f"Ignoring unreadable snapshot {self.snapshot_path}: {e}")
+            return None
+
+        if (
+            snapshot.get("version") != self.VERSION
+            or snapshot.get("fingerprint") != self.fingerprint
+        ):
+            logging.info(f"Snapshot {self.snapshot_path} is outdated, rebuilding it")
+            return None
+
+        logging.info(f"Loading bugs from snapshot {self.snapshot_path}")
+        return snapshot["bugs"]
+
+    def save(self, records: List[dict]) -> None:
+        self.snapshot_path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Write to a temporary file first so that concurrent readers never see a partial snapshot
+        tmp_path = self.snapshot_path.with_name(
+            f"{self.snapshot_path.name}.{os.getpid()}.tmp"
+        )
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "version": self.VERSION,
+                    "fingerprint": self.fingerprint,
+                    "bugs": records,
+                },
+                f,
+            )
+        os.replace(tmp_path, self.snapshot_path)
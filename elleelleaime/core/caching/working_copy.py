@@ -0,0 +1,163 @@
+import os
+import stat
+import atexit
+import shutil
+import getpass
+import logging
+import tempfile
+import threading
+
+from uuid import uuid4
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+from elleelleaime.core.benchmarks.bug import Bug
+
+DEFAULT_WORKING_COPY_DIR = Path(
+    tempfile.gettempdir(), f"elleelleaime-{getpass.getuser()}", "working-copies"
+)
+
+
+def scan_tree(path: Path) -> Dict[str, Optional[Tuple[int, int]]]:
+    """
+    Maps every entry under path to its (size, mtime_ns), or None for directories.
+    """
+    entries: Dict[str, Optional[Tuple[int, int]]] = {}
+    for root, dirs, files in os.walk(path):
+        for name in dirs + files:
+            entry_path = os.path.join(root, name)
+            entry_stat = os.lstat(entry_path)
+            entries[os.path.relpath(entry_path, path)] = (
+                None
+                if stat.S_ISDIR(entry_stat.st_mode)
+                else (entry_stat.st_size, entry_stat.st_mtime_ns)
+            )
+    return entries
+
+
+class WorkingCopy:
+    """
+    A checkout that is reused across candidates of the same bug.
+
+    The manifest of the pristine tree is recorded when the working copy is created.
+    Between candidates, the patched file is restored and the tree is compared
+    against the manifest to make sure nothing leaks into the next candidate.
+    """
+
+    def __init__(self, key: Tuple[str, str], path: Path):
+        self.key = key
+        self.path = path
+        self.manifest = scan_tree(path)
+        self.backup: Optional[Tuple[str, bytes, os.stat_result]] = None
+
+    def save(self, file_path: str) -> None:
+        """
+        Saves the content and timestamps of the file that is about to be patched.
+        """
+        with open(file_path, "rb") as f:
+            self.backup = (file_path, f.read(), os.stat(file_path))
+
+    def restore(self) -> bool:
+        """
+        Restores the patched file and removes the files created since the checkout.
+        Returns False if any other file of the checkout was modified or removed.
+        """
+        if self.backup is not None:
+            file_path, content, file_stat = self.backup
+            with open(file_path, "wb") as f:
+                f.write(content)
+            os.utime(file_path, ns=(file_stat.st_atime_ns, file_stat.st_mtime_ns))
+            self.backup = None
+
+        current = scan_tree(self.path)
+        # Build outputs and other new entries are removed, parents before children
+        for entry in sorted(current.keys() - self.manifest.keys()):
+            entry_path = Path(self.path, entry)
+            if current[entry] is None:
+                shutil.rmtree(entry_path, ignore_errors=True)
+            else:
+                entry_path.unlink(missing_ok=True)
+
+        return all(
+            current.get(entry, False) == expected
+            for entry, expected in self.manifest.items()
+        )
+
+    def remove(self) -> None:
+        shutil.rmtree(self.path, ignore_errors=True)
+
+
+class WorkingCopyPool:
+    """
+    Keeps the working copy of the bug each thread evaluated last.
+    A thread moving to another bug discards its previous working copy.
+    """
+
+    def __init__(self, root: Path = DEFAULT_WORKING_COPY_DIR):
+        self.root = Path(root)
+        self.working_copies: Dict[int, WorkingCopy] = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, bug: Bug, checkout: Callable[[str], object]) -> WorkingCopy:
+        """
+        Returns the working copy of the bug for the current thread,
+        checking it out with checkout(path) if needed.
+        """
+        key = (bug.benchmark.get_identifier(), bug.get_identifier())
+        thread = threading.get_ident()
+        with self.lock:
+            working_copy = self.working_copies.pop(thread, None)
+        if working_copy is not None:
+            if working_copy.key == key:
+                with self.lock:
+                    self.working_copies[thread] = working_copy
+                return working_copy
+            working_copy.remove()
+
+        path = Path(self.root, bug.get_identifier(), str(uuid4()))
+        checkout(str(path))
+        working_copy = WorkingCopy(key, path)
+        with self.lock:
+            self.working_copies[thread] = working_copy
+        return working_copy
+
+    def release(self, working_copy: WorkingCopy) -> None:
+        """
+        Restores the working copy after a candidate, discarding it if it cannot be reused.
+        """
+        try:
+            pristine = working_copy.restore()
+        except OSError as e:
+            logging.warning(f"Failed to restore {working_copy.path}: {e}")
+            pristine = False
+        if pristine:
+            return
+
+        logging.info(f"Discarding modified working copy {working_copy.path}")
+        with self.lock:
+            if self.working_copies.get(threading.get_ident()) is working_copy:
+                del self.working_copies[threading.get_ident()]
+        working_copy.remove()
+
+    def close(self) -> None:
+        with self.lock:
+            working_copies = list(self.working_copies.values())
+            self.working_copies.clear()
+        for working_copy in working_copies:
+            working_copy.remove()
+
+
+_pools: Dict[str, WorkingCopyPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_working_copy_pool(root: Path = DEFAULT_WORKING_COPY_DIR) -> WorkingCopyPool:
+    """
+    Returns the working copy pool of this process for the given root, creating it if needed.
+    """
+    key = str(Path(root).absolute())
+    with _pools_lock:
+        if key not in _pools:
+            _pools[key] = WorkingCopyPool(root)
+            atexit.register(_pools[key].close)
+        return _pools[key]
@@ -0,0 +1,74 @@
+from typing import List
+import io
+import difflib
+
+
+def _format_range(start: int, stop: int) -> str:
+    """
+    Formats a hunk range in the same way as `diff --unified`.
+    """
+    beginning = start + 1
+    length = stop - start
+    if length == 1:
+        return f"{beginning}"
+    if not length:
+        beginning -= 1
+    return f"{beginning},{length}"
+
+
+def _format_line(prefix: str, line: str) -> str:
+    # Mirror the marker emitted by diff for a last line without a trailing newline
+    if not line.endswith("\n"):
+        return f"{prefix}{line}\n\\ No newline at end of file\n"
+    return f"{prefix}{line}"
+
+
+def unified_diff(
+    source: str,
+    target: str,
+    source_file: str,
+    target_file: str,
+    context_len: int = 3,
+) -> str:
+    """
+    Computes the unified diff between two files in process.
+    The output follows the format of `diff --unified` (without timestamps) and can be parsed by unidiff.PatchSet.
+    Returns an empty string if both files are equal.
+
+    Args:
+        source (str): The content of the source file
+        target (str): The content of the target file
+        source_file (str): The path of the source file written in the diff header
+        target_file (str): The path of the target file written in the diff header
+        context_len (int): The number of context lines around each change
+
+    Returns:
+        str: The unified diff between source and target
+    """
+    # Split on "\n" only like diff does, while splitlines also splits on "\r", "\x0c", "\u2028", ...
+    source_lines = io.StringIO(source).readlines()
+    target_lines = io.StringIO(target).readlines()
+
+    # Disable the junk heuristic, which produces poor alignments on large files with many repeated lines
+    matcher = difflib.SequenceMatcher(None, source_lines, target_lines, autojunk=False)
+
+    diff: List[str] = []
+    for group in matcher.get_grouped_opcodes(context_len):
+        if not diff:
+            diff.append(f"--- {source_file}\n")
+            diff.append(f"+++ {target_file}\n")
+
+        first, last = group[0], group[-1]
+        diff.append(
+            f"@@ -{_format_range(first[1], last[2])} +{_format_range(first[3], last[4])} @@\n"
+        )
+        for tag, i1, i2, j1, j2 in group:
+            if tag == "equal":
+                diff.extend(_format_line(" ", line) for line in source_lines[i1:i2])
+                continue
+            if tag in {"replace", "delete"}:
+                diff.extend(_format_line("-", line) for line in source_lines[i1:i2])
+            if tag in {"replace", "insert"}:
+                diff.extend(_format_line("+", line) for line in target_lines[j1:j2])
+
+    return "".join(diff)
@@ -0,0 +1,141 @@
+import java.io.BufferedOutputStream;
+import java.io.BufferedReader;
+import java.io.ByteArrayInputStream;
+import java.io.ByteArrayOutputStream;
+import java.io.File;
+import java.io.FileDescriptor;
+import java.io.FileInputStream;
+import java.io.FileOutputStream;
+import java.io.InputStreamReader;
+import java.io.OutputStream;
+import java.io.PrintStream;
+import java.lang.reflect.InvocationTargetException;
+import java.lang.reflect.Method;
+import java.net.URL;
+import java.net.URLClassLoader;
+import java.nio.charset.StandardCharsets;
+import java.security.Permission;
+import java.util.jar.Attributes;
+import java.util.jar.JarFile;
+
+/**
+ * Runs the main class of a jar once per request inside a single long-lived JVM.
+ *
+ * <p>Usage (source-file mode): {@code java JarRunner.java <jar>}
+ *
+ * <p>Each request is a line on stdin holding the tab-separated arguments of main. Each response
+ * is a line {@code <exit code> <number of bytes>} on stdout, followed by that many bytes of what
+ * main printed to System.out, encoded with the default charset as {@code java -jar} would.
+ */
+public class JarRunner {
+
+    /** Thrown instead of exiting the JVM when the jar calls System.exit. */
+    static class ExitException extends SecurityException {
+        final int status;
+
+        ExitException(int status) {
+            super("System.exit(" + status + ")");
+            this.status = status;
+        }
+    }
+
+    /** Captures the output of a request, shared by every reference to System.out. */
+    static class CapturingOutputStream extends OutputStream {
+        private ByteArrayOutputStream buffer = new ByteArrayOutputStream();
+
+        synchronized void reset() {
+            buffer = new ByteArrayOutputStream();
+        }
+
+        synchronized byte[] toByteArray() {
+            return buffer.toByteArray();
+        }
+
+        @Override
+        public synchronized void write(int b) {
+            buffer.write(b);
+        }
+
+        @Override
+        public synchronized void write(byte[] b, int off, int len) {
+            buffer.write(b, off, len);
+        }
+    }
+
+    static ExitException findExit(Throwable throwable) {
+        while (throwable != null) {
+            if (throwable instanceof ExitException) {
+                return (ExitException) throwable;
+            }
+            throwable = throwable.getCause();
+        }
+        return null;
+    }
+
+    public static void main(String[] args) throws Exception {
+        File jar = new File(args[0]);
+        String mainClassName;
+        try (JarFile jarFile = new JarFile(jar)) {
+            mainClassName = jarFile.getManifest().getMainAttributes().getValue(Attributes.Name.MAIN_CLASS);
+        }
+
+        // Keep the real streams for the protocol, the jar only sees the captured ones
+        BufferedReader requests =
+                new BufferedReader(
+                        new InputStreamReader(new FileInputStream(FileDescriptor.in), StandardCharsets.UTF_8));
+        OutputStream responses = new BufferedOutputStream(new FileOutputStream(FileDescriptor.out));
+        CapturingOutputStream captured = new CapturingOutputStream();
+        PrintStream capturedOut = new PrintStream(captured, true);
+        System.setOut(capturedOut);
+        System.setIn(new ByteArrayInputStream(new byte[0]));
+
+        URLClassLoader loader =
+                new URLClassLoader(new URL[] {jar.toURI().toURL()}, ClassLoader.getSystemClassLoader());
+        Thread.currentThread().setContextClassLoader(loader);
+        Method mainMethod = Class.forName(mainClassName, true, loader).getMethod("main", String[].class);
+
+        System.setSecurityManager(
+                new SecurityManager() {
+                    @Override
+                    public void checkPermission(Permission permission) {}
+
+                    @Override
+                    public void checkPermission(Permission permission, Object context) {}
+
+                    @Override
+                    public void checkExit(int status) {
+                        throw new ExitException(status);
+                    }
+                });
+
+        String line;
+        while ((line = requests.readLine()) != null) {
+            String[] mainArgs = line.isEmpty() ? new String[0] : line.split("\t", -1);
+            int status = 0;
+            captured.reset();
+            try {
+                mainMethod.invoke(null, (Object) mainArgs);
+            } catch (InvocationTargetException e) {
+                ExitException exit = findExit(e.getCause());
+                if (exit != null) {
+                    status = exit.status;
+                } else {
+                    // Same as an uncaught exception in main
+                    e.getCause().printStackTrace();
+                    status = 1;
+                }
+            } catch (ExitException e) {
+                status = e.status;
+            }
+            capturedOut.flush();
+
+            byte[] output = captured.toByteArray();
+            responses.write((status + " " + output.length + "\n").getBytes(StandardCharsets.US_ASCII));
+            responses.write(output);
+            responses.flush();
+        }
+
+        // Runtime.halt does not go through checkExit, and ignores threads left behind by the jar
+        Runtime.getRuntime().halt(0);
+    }
+}
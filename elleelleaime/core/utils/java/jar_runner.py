@@ -0,0 +1,312 @@
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+import os
+import time
+import queue
+import atexit
+import logging
+import tempfile
+import threading
+import selectors
+import subprocess
+
+JAR_RUNNER_SOURCE = Path(__file__).with_name("JarRunner.java").absolute()
+# The jars live at the root of the repository, wherever the scripts are run from
+JARS_PATH = Path(__file__).parent.parent.parent.parent.parent.absolute()
+DEFAULT_TIMEOUT = 300
+DEFAULT_POOL_SIZE = min(4, os.cpu_count() or 1)
+
+
+def get_docker_command(jar: str) -> List[str]:
+    """
+    Returns the command that starts a JarRunner for the jar in the same container setup as `docker run ... java -jar`.
+    """
+    tmp_dir = tempfile.gettempdir()
+    return [
+        "docker",
+        "run",
+        "--rm",
+        "--interactive",
+        "--volume",
+        f"{JARS_PATH}:/elleelleaime",
+        "--volume",
+        f"{tmp_dir}:{tmp_dir}",
+        "--volume",
+        f"{JAR_RUNNER_SOURCE.parent}:{JAR_RUNNER_SOURCE.parent}",
+        "--workdir",
+        "/elleelleaime",
+        "openjdk:11",
+        "java",
+        str(JAR_RUNNER_SOURCE),
+        jar,
+    ]
+
+
+class JarRunner:
+    """
+    Client of a JarRunner.java process, which runs the main class of a jar in a long-lived JVM.
+
+    The process is started lazily on the first request. Requests are serialized, and a batch
+    is pipelined: all requests are sent before the responses are read. The static state of
+    the jar is not reset between runs, so the process is recycled after a failed run. If the
+    process cannot be started, the runner is marked as unavailable and every request returns
+    None so that callers can fall back to running the jar on their own.
+    """
+
+    def __init__(self, command: List[str], timeout: float = DEFAULT_TIMEOUT):
+        self.command = command
+        self.timeout = timeout
+        self.process: Optional[subprocess.Popen] = None
+        self.buffer = bytearray()
+        self.available = True
+        self.responded = False
+        self.lock = threading.Lock()
+
+    def run(self, args: List[str]) -> Optional[Tuple[int, str]]:
+        """
+        Runs the main class of the jar with the given arguments.
+
+        Returns:
+            Optional[Tuple[int, str]]: The exit code and the stdout, or None if the runner is unavailable
+        """
+        results = self.run_batch([args])
+        return None if results is None else results[0]
+
+    def run_batch(self, batch: List[List[str]]) -> Optional[List[Tuple[int, str]]]:
+        """
+        Runs the main class of the jar once per list of arguments.
+
+        Returns:
+            Optional[List[Tuple[int, str]]]: The exit code and the stdout of each run, or None if the runner is unavailable
+        """
+        if not batch:
+            return []
+        # Arguments are tab-separated and requests newline-separated
+        if any("\t" in arg or "\n" in arg for args in batch for arg in args):
+            return None
+
+        with self.lock:
+            if not self.available:
+                return None
+            try:
+                if self.process is None:
+                    self.start()
+                results = self.exchange(batch)
+                self.rerun_after_failures(batch, results)
+            except (OSError, EOFError, ValueError, TimeoutError) as e:
+                logging.warning(
+                    f"JarRunner {' '.join(self.command)} failed: {type(e).__name__} {e}"
+                )
+                self.stop(kill=True)
+                # A runner that never answered is not going to work, e.g. docker is missing
+                if not self.responded:
+                    self.available = False
+                return None
+            self.responded = True
+            return results
+
+    def rerun_after_failures(
+        self, batch: List[List[str]], results: List[Tuple[int, str]]
+    ) -> None:
+        """
+        Stops the process after each failed run, i.e. with a non-zero exit code, and runs
+        the rest of the batch again in a new process. A failed run may leave the static
+        state of the jar inconsistent, which the later runs in the same JVM would see.
+        """
+        k = 0
+        while k < len(results):
+            status = results[k][0]
+            k += 1
+            if status != 0:
+                # The rest of the batch was already sent, and is discarded
+                self.stop(kill=True)
+                if k < len(batch):
+                    self.start()
+                    results[k:] = self.exchange(batch[k:])
+
+    def start(self) -> None:
+        self.process = subprocess.Popen(
+            self.command,
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            bufsize=0,
+        )
+        self.buffer = bytearray()
+
+    def stop(self, kill: bool = False) -> None:
+        if self.process is None:
+            return
+        process, self.process = self.process, None
+        try:
+            if kill:
+                process.kill()
+            else:
+                # The runner exits once it reads the end of its input
+                process.stdin.close()
+            process.wait(timeout=5)
+        except (OSError, subprocess.TimeoutExpired):
+            process.kill()
+            process.wait()
+        finally:
+            for stream in (process.stdin, process.stdout):
+                try:
+                    stream.close()
+                except OSError:
+                    pass
+
+    def close(self) -> None:
+        with self.lock:
+            self.stop()
+
+    def exchange(self, batch: List[List[str]]) -> List[Tuple[int, str]]:
+        assert self.process is not None
+        payload = "".join("\t".join(args) + "\n" for args in batch).encode("utf-8")
+        stdin = self.process.stdin
+
+        # Write from another thread, the process may block on its output before reading the whole batch
+        def write():
+            try:
+                stdin.write(payload)
+                stdin.flush()
+            except (OSError, ValueError):
+                pass
+
+        writer = threading.Thread(target=write, daemon=True)
+        writer.start()
+
+        results = []
+        for _ in batch:
+            deadline = time.monotonic() + self.timeout
+            header = self.read_line(deadline).decode("ascii").split()
+            if len(header) != 2:
+                raise ValueError(f"Invalid response header {header}")
+            status, length = int(header[0]), int(header[1])
+            output = self.read_exact(length, deadline)
+            results.append((status, output.decode("utf-8", errors="replace")))
+
+        writer.join()
+        return results
+
+    def read_more(self, deadline: float) -> None:
+        assert self.process is not None
+        fd = self.process.stdout.fileno()
+        with selectors.DefaultSelector() as selector:
+            selector.register(fd, selectors.EVENT_READ)
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not selector.select(remaining):
+                raise TimeoutError(f"No response after {self.timeout} seconds")
+        chunk = os.read(fd, 65536)
+        if not chunk:
+            raise EOFError
+        self.buffer += chunk
+
+    def read_line(self, deadline: float) -> bytes:
+        while (index := self.buffer.find(b"\n")) < 0:
+            self.read_more(deadline)
+        line = bytes(self.buffer[:index])
+        del self.buffer[: index + 1]
+        return line
+
+    def read_exact(self, length: int, deadline: float) -> bytes:
+        while len(self.buffer) < length:
+            self.read_more(deadline)
+        data = bytes(self.buffer[:length])
+        del self.buffer[:length]
+        return data
+
+
+class JarRunnerPool:
+    """
+    Pool of runners of the same jar, so that concurrent callers do not wait for one another.
+
+    Runners are started on demand, up to size of them, and each serves one caller at a time.
+    The pool becomes unavailable as soon as one of its runners is.
+    """
+
+    def __init__(
+        self,
+        command: List[str],
+        size: int = DEFAULT_POOL_SIZE,
+        timeout: float = DEFAULT_TIMEOUT,
+    ):
+        self.command = command
+        self.size = size
+        self.timeout = timeout
+        self.runners: List[JarRunner] = []
+        self.idle: queue.LifoQueue = queue.LifoQueue()
+        self.available = True
+        self.lock = threading.Lock()
+
+    def acquire(self) -> JarRunner:
+        try:
+            return self.idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self.lock:
+            if len(self.runners) < self.size:
+                runner = JarRunner(self.command, self.timeout)
+                self.runners.append(runner)
+                return runner
+        return self.idle.get()
+
+    def run(self, args: List[str]) -> Optional[Tuple[int, str]]:
+        results = self.run_batch([args])
+        return None if results is None else results[0]
+
+    def run_batch(self, batch: List[List[str]]) -> Optional[List[Tuple[int, str]]]:
+        if not self.available:
+            return None
+        runner = self.acquire()
+        try:
+            results = runner.run_batch(batch)
+            if not runner.available:
+                self.available = False
+            return results
+        finally:
+            self.idle.put(runner)
+
+    def close(self) -> None:
+        with self.lock:
+            runners = list(self.runners)
+        for runner in runners:
+            runner.close()
+
+
+# The persistent JVMs are opt-in, jars are otherwise run in one container per call
+_enabled = False
+_runners: Dict[str, JarRunnerPool] = {}
+_runners_lock = threading.Lock()
+
+
+def set_jar_runner_enabled(enabled: bool) -> None:
+    global _enabled
+    _enabled = enabled
+
+
+def is_jar_runner_enabled() -> bool:
+    return _enabled
+
+
+def get_jar_runner(jar: str) -> JarRunnerPool:
+    """
+    Returns the pool of runners of this process for the jar, which are started on demand.
+    """
+    with _runners_lock:
+        if jar not in _runners:
+            _runners[jar] = JarRunnerPool(get_docker_command(jar))
+            atexit.register(_runners[jar].close)
+        return _runners[jar]
+
+
+def run_jar_batch(jar: str, batch: List[List[str]]) -> Optional[List[Tuple[int, str]]]:
+    """
+    Runs the main class of the jar once per list of arguments in persistent JVMs.
+
+    Returns:
+        Optional[List[Tuple[int, str]]]: The exit code and the stdout of each run, or None if the persistent JVMs are disabled or unavailable
+    """
+    if not is_jar_runner_enabled():
+        return None
+    return get_jar_runner(jar).run_batch(batch)
@@ -1,4 +1,5 @@
-from typing import Optional, Tuple, List
+from typing import Dict, Iterator, Optional, Tuple, List
+from contextlib import ExitStack, contextmanager
 from unidiff import PatchSet
 from uuid import uuid4
 from pathlib import Path
@@ -8,6 +9,8 @@ import subprocess
 import re
 
 from elleelleaime.core.benchmarks.bug import Bug, RichBug
+from elleelleaime.core.caching.extraction import ExtractionError
+from elleelleaime.core.utils.java.jar_runner import JARS_PATH, run_jar_batch
 
 
 def compute_diff(
@@ -140,34 +143,86 @@ def get_modified_target_lines(diff: PatchSet) -> List[int]:
     return added_lines if len(added_lines) > 0 else context_lines
 
 
-def extract_single_function(bug: Bug) -> Optional[Tuple[str, str]]:
-    """
-    Extracts the buggy and fixed code of single-function bugs.
-    Returns None is bug is not single-function
+EXTRACTOR_JAR = "extractor.jar"
+# Files the extracted code depends on, used to invalidate cached extractions
+EXTRACTION_TOOLS = [Path(JARS_PATH, EXTRACTOR_JAR), Path(__file__)]
 
-    Args:
-        bug (Bug): THe bug to extract the code from
+
+def get_lines_args(lines: List[int]) -> List[str]:
+    return [arg for line in lines for arg in ("--lines", str(line))]
+
+
+def run_extractor(requests: List[Tuple[Path, List[str]]]) -> List[Optional[str]]:
+    """
+    Runs the code extractor once per request of the form (file_path, arguments).
+    The requests run in one container each, or in a batch in persistent JVMs if they are enabled.
+    Requests for which the persistent JVMs fail or print nothing are run in a container.
 
     Returns:
-        Optional[Tuple[str, str]]: None if the bug is not single-function, otherwise a tuple of the form (buggy_code, fixed_code)
+        List[Optional[str]]: The extracted code of each request, or None if the extractor failed
     """
-    buggy_path = Path(
-        tempfile.gettempdir(),
-        f"elleelleaime-{getpass.getuser()}",
-        bug.get_identifier(),
-        str(uuid4()),
+    results = run_jar_batch(
+        EXTRACTOR_JAR,
+        [["-i", str(file_path.absolute()), *args] for file_path, args in requests],
     )
-    fixed_path = Path(
+    outputs: List[Optional[str]] = [
+        output if status == 0 and output.strip() else None
+        for status, output in (results or [(1, "")] * len(requests))
+    ]
+
+    for k, (file_path, args) in enumerate(requests):
+        if outputs[k] is not None:
+            continue
+        run = subprocess.run(
+            f'docker run --rm --volume "{JARS_PATH}:/elleelleaime" --volume "{file_path.parent.absolute()}:{file_path.parent.absolute()}" --workdir "/elleelleaime"'
+            + f" openjdk:11 java -jar {EXTRACTOR_JAR} -i {file_path.absolute()} {' '.join(args)}",
+            shell=True,
+            capture_output=True,
+        )
+        outputs[k] = run.stdout.decode("utf-8") if run.returncode == 0 else None
+    return outputs
+
+
+@contextmanager
+def checkout_bug(bug: Bug, fixed: bool = False) -> Iterator[Path]:
+    """
+    Checks out the bug into a new temporary directory, which is removed on exit.
+    """
+    path = Path(
         tempfile.gettempdir(),
         f"elleelleaime-{getpass.getuser()}",
         bug.get_identifier(),
         str(uuid4()),
     )
-
     try:
+        bug.checkout(str(path), fixed=fixed)
+        yield path
+    finally:
+        shutil.rmtree(path, ignore_errors=True)
+
+
+def extract_single_function(
+    bug: Bug, buggy_path: Optional[Path] = None
+) -> Optional[Tuple[str, str]]:
+    """
+    Extracts the buggy and fixed code of single-function bugs.
+    Returns None is bug is not single-function
+
+    Args:
+        bug (Bug): THe bug to extract the code from
+        buggy_path (Optional[Path]): A checkout of the buggy version to reuse, checked out otherwise
+
+    Returns:
+        Optional[Tuple[str, str]]: None if the bug is not single-function, otherwise a tuple of the form (buggy_code, fixed_code)
+
+    Raises:
+        ExtractionError: If the extractor failed on both versions of the bug
+    """
+    with ExitStack() as checkouts:
         # Checkout the buggy and fixed versions of the bug
-        bug.checkout(str(buggy_path), fixed=False)
-        bug.checkout(str(fixed_path), fixed=True)
+        if buggy_path is None:
+            buggy_path = checkouts.enter_context(checkout_bug(bug, fixed=False))
+        fixed_path = checkouts.enter_context(checkout_bug(bug, fixed=True))
 
         # Note: this diff is inverted, i.e. the target file is the buggy file
         diff = PatchSet(bug.get_ground_truth())
@@ -183,31 +238,18 @@ def extract_single_function(bug: Bug) -> Optional[Tuple[str, str]]:
             fixed_file_path = Path(fixed_path, get_target_filename(diff))
             modified_fixed_lines = get_modified_target_lines(diff)
 
-        # Run code extractor for the buggy function
-        lines_args = " ".join([f"--lines {line}" for line in modified_buggy_lines])
-        run = subprocess.run(
-            f'docker run --rm --volume ".:/elleelleaime" --volume "{buggy_file_path.parent.absolute()}:{buggy_file_path.parent.absolute()}" --workdir "/elleelleaime"'
-            + f" openjdk:11 java -jar extractor.jar -i {buggy_file_path.absolute()} {lines_args}",
-            shell=True,
-            capture_output=True,
-        )
-        if run.returncode != 0:
-            buggy_code = ""
-        else:
-            buggy_code = run.stdout.decode("utf-8")
-
-        # Run code extractor for the fixed function
-        lines_args = " ".join([f"--lines {line}" for line in modified_fixed_lines])
-        run = subprocess.run(
-            f'docker run --rm --volume ".:/elleelleaime" --volume "{fixed_file_path.parent.absolute()}:{fixed_file_path.parent.absolute()}" --workdir "/elleelleaime"'
-            + f" openjdk:11 java -jar extractor.jar -i {fixed_file_path.absolute()} {lines_args}",
-            shell=True,
-            capture_output=True,
+        # Run code extractor for the buggy and fixed functions
+        buggy_code, fixed_code = run_extractor(
+            [
+                (buggy_file_path, get_lines_args(modified_buggy_lines)),
+                (fixed_file_path, get_lines_args(modified_fixed_lines)),
+            ]
         )
-        if run.returncode != 0:
-            fixed_code = ""
-        else:
-            fixed_code = run.stdout.decode("utf-8")
+        # One of the functions may be missing, e.g. when it is removed by the fix
+        if buggy_code is None and fixed_code is None:
+            raise ExtractionError(f"The extractor failed on {bug.get_identifier()}")
+        buggy_code = buggy_code or ""
+        fixed_code = fixed_code or ""
 
         # HACK: sometimes we are not able to properly retrieve the code at the function-level
         # This happens in cases suchas Closure-46 where a whole function is removed
@@ -234,27 +276,38 @@ def extract_single_function(bug: Bug) -> Optional[Tuple[str, str]]:
 
         return buggy_code, fixed_code
 
-    finally:
-        # Remove the checked-out bugs
-        shutil.rmtree(buggy_path, ignore_errors=True)
-        shutil.rmtree(fixed_path, ignore_errors=True)
-
 
-def find_test_class(path: Path, bug, class_name: str) -> Optional[Path]:
+def index_test_classes(path: Path, bug: Bug) -> Dict[str, List[Path]]:
+    """
+    Indexes the Java files under the test directory of a checkout by file name.
+    """
     # Get the base test directory
     base_test_dir = Path(path, bug.get_src_test_dir(str(path)))
 
+    test_classes: Dict[str, List[Path]] = {}
+    for java_file in base_test_dir.rglob("*.java"):
+        test_classes.setdefault(java_file.name, []).append(java_file)
+    return test_classes
+
+
+def find_test_class(
+    path: Path,
+    bug,
+    class_name: str,
+    test_classes: Optional[Dict[str, List[Path]]] = None,
+) -> Optional[Path]:
+    if test_classes is None:
+        test_classes = index_test_classes(path, bug)
+
     # Convert class name to the relative path format
     class_relative_path = f"{class_name.replace('.', '/')}.java"
 
-    # Iterate through all the subdirectories under the base test directory
-    candidates = []
-    for java_file in base_test_dir.rglob("*.java"):
-        # Check if the file ends with the class relative path
-        if java_file.as_posix().endswith(class_relative_path):
-            candidates.append(
-                java_file
-            )  # Return the full path to the matched Java file
+    # Look up the files with the same name, and check if they end with the class relative path
+    candidates = [
+        java_file
+        for java_file in test_classes.get(Path(class_relative_path).name, [])
+        if java_file.as_posix().endswith(class_relative_path)
+    ]
 
     if len(candidates) == 0:
         logging.error(f"No test class found for {class_name}")
@@ -266,49 +319,48 @@ def find_test_class(path: Path, bug, class_name: str) -> Optional[Path]:
         return None
 
 
-def extract_failing_test_cases(bug: RichBug) -> dict[str, str]:
+def extract_failing_test_cases(
+    bug: RichBug, buggy_path: Optional[Path] = None
+) -> dict[str, str]:
     """
     Extracts the code of the failing test cases of a bug.
 
     Args:
         bug (Bug): The bug to extract the failing test cases from
+        buggy_path (Optional[Path]): A checkout of the buggy version to reuse, checked out otherwise
 
     Returns:
         dict[str, str]: A dictionary mapping failing test cases to their code
-    """
-    failing_test_cases = {}
-    failing_tests = bug.get_failing_tests()
 
-    for failing_test in failing_tests:
-        class_name, method_name = failing_test.split("::")
-
-        path = Path(
-            tempfile.gettempdir(),
-            f"elleelleaime-{getpass.getuser()}",
-            bug.get_identifier(),
-            str(uuid4()),
-        )
-        try:
-            bug.checkout(str(path), fixed=False)
-            test_class_path = find_test_class(path, bug, class_name)
+    Raises:
+        ExtractionError: If the extractor failed on any of the failing test cases
+    """
+    failing_tests = list(bug.get_failing_tests())
+    if len(failing_tests) == 0:
+        return {}
+
+    with ExitStack() as checkouts:
+        # All failing tests are extracted from the same checkout
+        if buggy_path is None:
+            buggy_path = checkouts.enter_context(checkout_bug(bug, fixed=False))
+        test_classes = index_test_classes(buggy_path, bug)
+
+        requests = []
+        for failing_test in failing_tests:
+            class_name, method_name = failing_test.split("::")
+            test_class_path = find_test_class(buggy_path, bug, class_name, test_classes)
             if test_class_path is None:
                 return {}
+            requests.append((test_class_path, ["--method", method_name]))
 
-            # Run code extractor for the failing test case
-            run = subprocess.run(
-                f'docker run --rm --volume ".:/elleelleaime" --volume "{test_class_path.parent.absolute()}:{test_class_path.parent.absolute()}" --workdir "/elleelleaime"'
-                + f" openjdk:11 java -jar extractor.jar -i {test_class_path.absolute()} --method {method_name}",
-                shell=True,
-                capture_output=True,
-            )
-            if run.returncode == 0:
-                failing_test_cases[failing_test] = run.stdout.decode("utf-8")
-            else:
-                return {}
-        finally:
-            shutil.rmtree(path, ignore_errors=True)
+        # Run code extractor for the failing test cases
+        test_codes = run_extractor(requests)
 
-    return failing_test_cases
+    if any(test_code is None for test_code in test_codes):
+        raise ExtractionError(
+            f"The extractor failed on the failing tests of {bug.get_identifier()}"
+        )
+    return dict(zip(failing_tests, test_codes))
 
 
 def remove_java_comments(source: str) -> Optional[str]:
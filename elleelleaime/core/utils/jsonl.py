@@ -1,6 +1,7 @@
 from typing import Iterable, Dict
 import gzip
 import json
+import logging
 import os
 
 """
@@ -9,21 +10,29 @@ https://github.com/openai/human-eval/blob/312c5e5532f0e0470bf47f77a6243e02a61da5
 """
 
 
-def stream_jsonl(filename: str) -> Iterable[Dict]:
+def stream_jsonl(filename: str, ignore_invalid: bool = False) -> Iterable[Dict]:
     """
     Parses each jsonl line and yields it as a dictionary
+    If ignore_invalid, lines that cannot be parsed (e.g. left incomplete by a crash) are skipped
     """
     if filename.endswith(".gz"):
         with open(filename, "rb") as gzfp:
             with gzip.open(gzfp, "rt") as fp:
-                for line in fp:
-                    if any(not x.isspace() for x in line):
-                        yield json.loads(line)
+                yield from parse_jsonl(fp, ignore_invalid)
     else:
         with open(filename, "r") as fp:
-            for line in fp:
-                if any(not x.isspace() for x in line):
-                    yield json.loads(line)
+            yield from parse_jsonl(fp, ignore_invalid)
+
+
+def parse_jsonl(lines: Iterable[str], ignore_invalid: bool = False) -> Iterable[Dict]:
+    for line in lines:
+        if any(not x.isspace() for x in line):
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                if not ignore_invalid:
+                    raise
+                logging.warning(f"Skipping invalid jsonl line: {line[:100]}")
 
 
 def write_jsonl(filename: str, data: Iterable[Dict], append: bool = False):
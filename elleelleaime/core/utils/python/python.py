@@ -10,6 +10,9 @@ import ast
 
 from elleelleaime.core.benchmarks.bug import Bug, RichBug
 
+# Files the extracted code depends on, used to invalidate cached extractions
+EXTRACTION_TOOLS = [Path(__file__)]
+
 
 def extract_functions(source_code):
     # Parse the source code into an AST
@@ -0,0 +1,96 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+import threading
+
+
+class CandidateScheduler:
+    """
+    Schedules the evaluation of candidates of many bugs across a fixed number of workers.
+
+    Units of work are queued per bug. A worker keeps taking units of the bug it worked on
+    last, so that its checkout of that bug can be reused. When that bug has nothing left,
+    the worker moves to a bug nobody is working on, or otherwise joins the bug with the
+    most pending units, so that the slow bugs at the tail are spread across all workers.
+    """
+
+    def __init__(self, n_workers: int):
+        self.n_workers = n_workers
+        self.queues: Dict[str, Deque[Any]] = {}
+        self.current: Dict[int, Optional[str]] = {}
+        self.lock = threading.Lock()
+        self.stopped = False
+
+    def add(self, key: str, unit: Any) -> None:
+        """
+        Queues a unit of work for the bug identified by key.
+        """
+        with self.lock:
+            self.queues.setdefault(key, deque()).append(unit)
+
+    def pending(self) -> int:
+        with self.lock:
+            return sum(len(queue) for queue in self.queues.values())
+
+    def next(self, worker: int) -> Optional[Any]:
+        """
+        Returns the next unit of work for the worker, or None if there is nothing left.
+        """
+        with self.lock:
+            if self.stopped:
+                return None
+
+            key = self.current.get(worker)
+            if key is None or not self.queues.get(key):
+                active = {}
+                for other, other_key in self.current.items():
+                    if other != worker and other_key is not None:
+                        active[other_key] = active.get(other_key, 0) + 1
+                candidates = [k for k, queue in self.queues.items() if queue]
+                if not candidates:
+                    self.current[worker] = None
+                    return None
+                key = max(
+                    candidates,
+                    key=lambda k: (active.get(k, 0) == 0, len(self.queues[k])),
+                )
+
+            self.current[worker] = key
+            unit = self.queues[key].popleft()
+            if not self.queues[key]:
+                del self.queues[key]
+            return unit
+
+    def stop(self) -> None:
+        with self.lock:
+            self.stopped = True
+
+    def run(self, evaluate: Callable[[Any], None]) -> None:
+        """
+        Runs evaluate on every queued unit with n_workers threads.
+        If a unit raises, the remaining units are dropped and the exception is re-raised.
+        """
+
+        def work(worker: int) -> None:
+            try:
+                while (unit := self.next(worker)) is not None:
+                    evaluate(unit)
+            except BaseException:
+                self.stop()
+                raise
+            finally:
+                with self.lock:
+                    self.current[worker] = None
+
+        with ThreadPoolExecutor(max_workers=self.n_workers) as executor:
+            futures = [
+                executor.submit(work, worker) for worker in range(self.n_workers)
+            ]
+            errors: List[BaseException] = []
+            for future in futures:
+                if (error := future.exception()) is not None:
+                    errors.append(error)
+
+        if errors:
+            raise errors[0]
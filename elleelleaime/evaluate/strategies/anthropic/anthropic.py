@@ -1,7 +1,6 @@
 from elleelleaime.evaluate.strategies.text.instruct import InstructEvaluationStrategy
-from elleelleaime.core.benchmarks.bug import Bug
 
-from typing import Optional, List
+from typing import Any, List
 
 
 class AnthropicEvaluationStrategy(InstructEvaluationStrategy):
@@ -9,35 +8,32 @@ class AnthropicEvaluationStrategy(InstructEvaluationStrategy):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def __evaluate_generation(self, bug: Bug, sample: dict, generation) -> List[dict]:
+    def __extract_candidates(self, generation) -> List[Any]:
         """
-        Evaluate the generation for the given bug.
+        Extracts the candidates from the generation.
 
-        :param bug: The bug to generate the prompt for.
-        :param generation: The generation to evaluate
+        :param generation: The generation to extract the candidates from
         """
-        evaluation = []
+        candidates = []
 
         for content in generation["content"]:
             message = content["text"]
-            candidate_patch = self.extract_patch_from_message(message)
-            evaluation.append(self.evaluate_generation(bug, sample, candidate_patch))
+            candidates.append(self.extract_patch_from_message(message))
 
-        return evaluation
+        return candidates
 
-    def _evaluate_impl(self, bug: Bug, sample: dict) -> Optional[List[dict]]:
+    def extract_candidates(self, sample: dict) -> List[Any]:
         """
-        Returns the evaluation for the given bug and sample.
+        Returns the candidates of the sample, in the order of their evaluations.
 
-        :param bug: The bug to generate the prompt for.
-        :param sample: The sample to evaluate.
+        :param sample: The sample to extract the candidates from.
         """
-        evaluation = []
+        candidates = []
 
         if sample["generation"] is None:
-            return evaluation
+            return candidates
 
         for generation in sample["generation"]:
-            evaluation.extend(self.__evaluate_generation(bug, sample, generation))
+            candidates.extend(self.__extract_candidates(generation))
 
-        return evaluation
+        return candidates
@@ -1,7 +1,7 @@
 from elleelleaime.evaluate.strategies.text.instruct import InstructEvaluationStrategy
-from elleelleaime.core.benchmarks.bug import Bug
+from elleelleaime.evaluate.strategies.strategy import INVALID_CANDIDATE
 
-from typing import Optional, List
+from typing import Any, List
 
 
 class GoogleEvaluationStrategy(InstructEvaluationStrategy):
@@ -9,17 +9,16 @@ class GoogleEvaluationStrategy(InstructEvaluationStrategy):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
-    def _evaluate_impl(self, bug: Bug, sample: dict) -> Optional[List[dict]]:
+    def extract_candidates(self, sample: dict) -> List[Any]:
         """
-        Returns the evaluation for the given bug and sample.
+        Returns the candidates of the sample, in the order of their evaluations.
 
-        :param bug: The bug to generate the prompt for.
-        :param sample: The sample to evaluate.
+        :param sample: The sample to extract the candidates from.
         """
-        evaluation = []
+        candidates = []
 
         if sample["generation"] is None:
-            return evaluation
+            return candidates
 
         for generation in sample["generation"]:
             for candidate in generation["candidates"]:
@@ -29,12 +28,9 @@ class GoogleEvaluationStrategy(InstructEvaluationStrategy):
                     or not candidate["content"]["parts"]
                     or "text" not in candidate["content"]["parts"][0]
                 ):
-                    evaluation.append(None)
+                    candidates.append(INVALID_CANDIDATE)
                     continue
                 candidate_patch = candidate["content"]["parts"][0]["text"]
-                candidate_patch = self.extract_patch_from_message(candidate_patch)
-                evaluation.append(
-                    self.evaluate_generation(bug, sample, candidate_patch)
-                )
+                candidates.append(self.extract_patch_from_message(candidate_patch))
 
-        return evaluation
+        return candidates
@@ -2,9 +2,15 @@ import tempfile
 import subprocess
 
 from abc import ABC, abstractmethod
-from typing import Any, List, Optional, final
+from typing import Any, List, Optional, Tuple, final
 
 from elleelleaime.core.benchmarks.bug import Bug
+from elleelleaime.core.utils.java.jar_runner import JARS_PATH, run_jar_batch
+
+# Marks a candidate that could not be extracted from the generation, evaluated as None
+INVALID_CANDIDATE = object()
+
+AST_MATCHER_JAR = "gumtree-spoon-ast-diff.jar"
 
 
 class PatchEvaluationStrategy(ABC):
@@ -18,6 +24,42 @@ class PatchEvaluationStrategy(ABC):
         """
         pass
 
+    @abstractmethod
+    def extract_candidates(self, sample: dict) -> List[Any]:
+        """
+        Returns the candidates of the sample, in the order of their evaluations.
+        """
+        pass
+
+    @abstractmethod
+    def evaluate_candidate(self, bug: Bug, sample: dict, candidate: Any) -> Any:
+        """
+        Returns the evaluation of a single candidate of the sample.
+        """
+        pass
+
+    def group_candidates(self, bug: Bug, candidates: List[Any]) -> List[int]:
+        """
+        Returns, for each candidate, the index of the candidate whose evaluation it shares.
+        By default, every candidate is evaluated on its own.
+        """
+        return list(range(len(candidates)))
+
+    def share_evaluation(self, evaluation: Any, candidate: Any) -> Any:
+        """
+        Returns the evaluation of a candidate for an equivalent candidate.
+        """
+        return evaluation
+
+    def complete_evaluations(
+        self, bug: Bug, sample: dict, evaluations: List[Any]
+    ) -> List[Any]:
+        """
+        Completes the evaluations of the candidates of the sample, once all of them are evaluated.
+        By default, the evaluations are complete.
+        """
+        return evaluations
+
     @final
     def __handle_none(self) -> Any:
         """
@@ -25,30 +67,55 @@ class PatchEvaluationStrategy(ABC):
         """
         return None
 
-    def ast_match(self, fixed_code: str, candidate_code: str) -> bool:
-        # Write the fixed code to a temporary file
-        fixed_code_file = tempfile.NamedTemporaryFile(
-            mode="w", suffix=".java", delete=True
-        )
-        fixed_code_file.write(fixed_code)
-        fixed_code_file.flush()
-
-        # Write the candidate code to a temporary file
-        candidate_code_file = tempfile.NamedTemporaryFile(
-            mode="w", suffix=".java", delete=True
-        )
-        candidate_code_file.write(candidate_code)
-        candidate_code_file.flush()
-
-        # Run the AST matcher on the two files
-        run = subprocess.run(
-            f'docker run --rm --volume ".:/elleelleaime" --volume "{tempfile.gettempdir()}:{tempfile.gettempdir()}" --workdir "/elleelleaime" openjdk:11 java -jar gumtree-spoon-ast-diff.jar {fixed_code_file.name} {candidate_code_file.name}',
-            shell=True,
-            capture_output=True,
-        )
-
-        # Return True if "no AST change" in the output
-        return "no AST change" in run.stdout.decode("utf-8")
+    def ast_match_batch(self, pairs: List[Tuple[str, str]]) -> List[bool]:
+        """
+        Returns, for each pair of (fixed_code, candidate_code), whether the two have the same AST.
+
+        The AST matcher runs in one container per pair, or in persistent JVMs if they are
+        enabled. Pairs for which the persistent JVMs fail are run in a container.
+        """
+        files = []
+        for fixed_code, candidate_code in pairs:
+            # Write the fixed and candidate code to temporary files
+            pair_files = []
+            for code in (fixed_code, candidate_code):
+                code_file = tempfile.NamedTemporaryFile(
+                    mode="w", suffix=".java", delete=True
+                )
+                code_file.write(code)
+                code_file.flush()
+                pair_files.append(code_file)
+            files.append(pair_files)
+
+        try:
+            # Run the AST matcher on the two files
+            results = run_jar_batch(
+                AST_MATCHER_JAR,
+                [
+                    [fixed_file.name, candidate_file.name]
+                    for fixed_file, candidate_file in files
+                ],
+            )
+            outputs: List[Optional[str]] = [
+                output if status == 0 and output.strip() else None
+                for status, output in (results or [(1, "")] * len(files))
+            ]
+            for k, (fixed_file, candidate_file) in enumerate(files):
+                if outputs[k] is not None:
+                    continue
+                run = subprocess.run(
+                    f'docker run --rm --volume "{JARS_PATH}:/elleelleaime" --volume "{tempfile.gettempdir()}:{tempfile.gettempdir()}" --workdir "/elleelleaime" openjdk:11 java -jar {AST_MATCHER_JAR} {fixed_file.name} {candidate_file.name}',
+                    shell=True,
+                    capture_output=True,
+                )
+                outputs[k] = run.stdout.decode("utf-8")
+        finally:
+            for pair_files in files:
+                for code_file in pair_files:
+                    code_file.close()
+
+        # A pair matches if "no AST change" is in the output
+        return ["no AST change" in output for output in outputs]
 
     @final
     def evaluate(self, bug: Bug, sample: dict) -> Optional[List[dict]]:
@@ -1,7 +1,7 @@
 from .replace import ReplaceEvaluationStrategy
 from elleelleaime.core.benchmarks.bug import Bug
 
-from typing import Optional, List
+from typing import Any, Optional, List
 import re
 
 
@@ -37,20 +37,18 @@ class InstructEvaluationStrategy(ReplaceEvaluationStrategy):
         else:
             return code_blocks[0][1] if code_blocks else None
 
-    def _evaluate_impl(self, bug: Bug, sample: dict) -> Optional[List[dict]]:
+    def extract_candidates(self, sample: dict) -> List[Any]:
         """
-        Returns the evaluation for the given bug and sample.
+        Returns the candidates of the sample, in the order of their evaluations.
 
-        :param bug: The bug to generate the prompt for.
-        :param sample: The sample to evaluate.
+        :param sample: The sample to extract the candidates from.
         """
-        evaluation = []
+        candidates = []
 
         if sample["generation"] is None:
-            return evaluation
+            return candidates
 
         for generation in sample["generation"]:
-            candidate_patch = self.extract_patch_from_message(generation)
-            evaluation.append(self.evaluate_generation(bug, sample, candidate_patch))
+            candidates.append(self.extract_patch_from_message(generation))
 
-        return evaluation
+        return candidates
@@ -1,14 +1,26 @@
-from typing import Optional, List
+from typing import Any, Dict, Optional, List, Tuple
 from unidiff import PatchSet
 from pathlib import Path
 from uuid import uuid4
 
-import os, tempfile, shutil, logging, getpass
+import os, tempfile, shutil, logging, getpass, threading
 
-from elleelleaime.evaluate.strategies.strategy import PatchEvaluationStrategy
+from elleelleaime.evaluate.strategies.strategy import (
+    PatchEvaluationStrategy,
+    INVALID_CANDIDATE,
+)
 from elleelleaime.core.benchmarks.bug import Bug
 from elleelleaime.core.utils.java.java import remove_empty_lines, remove_java_comments
 from elleelleaime.core.caching.cache import Cache
+from elleelleaime.core.caching.checkout_pool import (
+    get_checkout_pool,
+    DEFAULT_CHECKOUT_POOL_DIR,
+    DEFAULT_CHECKOUT_POOL_MAX_BYTES,
+)
+from elleelleaime.core.caching.working_copy import (
+    get_working_copy_pool,
+    DEFAULT_WORKING_COPY_DIR,
+)
 
 
 class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
@@ -21,6 +33,30 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
         )
         if self.use_cache:
             self.cache = Cache(self.cache_path)
+        # Clone working copies from one pristine checkout per bug instead of checking out each candidate
+        self.use_checkout_pool = kwargs.get("use_checkout_pool", False)
+        if self.use_checkout_pool:
+            self.checkout_pool = get_checkout_pool(
+                kwargs.get("checkout_pool_path", DEFAULT_CHECKOUT_POOL_DIR),
+                kwargs.get("checkout_pool_max_bytes", DEFAULT_CHECKOUT_POOL_MAX_BYTES),
+            )
+        # Reuse one working copy per bug and thread, restoring the patched file between candidates
+        self.reuse_working_copy = kwargs.get("reuse_working_copy", False)
+        if self.reuse_working_copy:
+            self.working_copy_pool = get_working_copy_pool(
+                kwargs.get("working_copy_path", DEFAULT_WORKING_COPY_DIR)
+            )
+        # Evaluate candidates that only differ in comments and whitespace once
+        self.deduplicate_candidates = kwargs.get("deduplicate_candidates", True)
+        # Plausible candidates waiting for their AST match, by id of their evaluation
+        self.pending_ast_matches: Dict[int, Tuple[dict, str, str]] = {}
+        self.pending_lock = threading.Lock()
+
+    def checkout(self, bug: Bug, path: str) -> None:
+        if self.use_checkout_pool:
+            self.checkout_pool.checkout(bug, path, fixed=False)
+        else:
+            bug.checkout(path, fixed=False)
 
     def evaluate_generation(
         self, bug: Bug, sample: dict, generation: Optional[str]
@@ -90,12 +126,19 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
                 self.cache.save_to_cache_from_bug(bug, generation, result)
             return result
 
+        working_copy = None
         try:
             # Note: this diff is inverted, i.e. the target file is the buggy file
             diff = PatchSet(bug.get_ground_truth())
 
             # Checkout the buggy code
-            bug.checkout(buggy_path, fixed=False)
+            if self.reuse_working_copy:
+                working_copy = self.working_copy_pool.acquire(
+                    bug, lambda path: self.checkout(bug, path)
+                )
+                buggy_path = str(working_copy.path)
+            else:
+                self.checkout(bug, buggy_path)
 
             # Locate and load the buggy file
             if bug.is_ground_truth_inverted():
@@ -133,6 +176,8 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
 
             # Compute plausible match
             # Write the generated code to the file
+            if working_copy is not None:
+                working_copy.save(buggy_file_path)
             with open(
                 buggy_file_path,
                 "w",
@@ -151,14 +196,131 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
                 # If the tests pass, check if the ASTs match
                 # Note: we do not for AST matching before because the ast matcher returns false positives in some cases
                 if result["test"]:
-                    result["ast_match"] = self.ast_match(fixed_code, candidate_code)
+                    # Matched with the other plausible candidates of the sample in complete_evaluations
+                    with self.pending_lock:
+                        self.pending_ast_matches[id(result)] = (
+                            result,
+                            fixed_code,
+                            candidate_code,
+                        )
+                    return result
 
             # Save the evaluation to the cache
             if self.use_cache:
                 self.cache.save_to_cache_from_bug(bug, generation, result)
             return result
         finally:
-            shutil.rmtree(buggy_path)
+            if working_copy is not None:
+                self.working_copy_pool.release(working_copy)
+            elif not self.reuse_working_copy:
+                shutil.rmtree(buggy_path)
+
+    def extract_candidates(self, sample: dict) -> List[Any]:
+        """
+        Returns the candidates of the sample, in the order of their evaluations.
+
+        :param sample: The sample to extract the candidates from.
+        """
+        return list(sample["generation"])
+
+    def evaluate_candidate(
+        self, bug: Bug, sample: dict, candidate: Any
+    ) -> Optional[dict]:
+        """
+        Returns the evaluation of a single candidate of the sample.
+
+        :param bug: The bug to generate the prompt for.
+        :param sample: The sample to evaluate.
+        :param candidate: The candidate, as returned by extract_candidates.
+        """
+        if candidate is INVALID_CANDIDATE:
+            return None
+        return self.evaluate_generation(bug, sample, candidate)
+
+    def get_candidate_key(self, candidate: Any, java: bool) -> Optional[str]:
+        """
+        Returns the normalized form of the candidate, shared by candidates with the same evaluation.
+        Returns None if the candidate must be evaluated on its own.
+
+        :param candidate: The candidate, as returned by extract_candidates.
+        :param java: Whether the candidate is Java code, where comments and indentation are insignificant.
+        """
+        if not isinstance(candidate, str):
+            return None
+        if not java:
+            return candidate
+
+        candidate_no_comments = remove_java_comments(candidate)
+        if candidate_no_comments is None:
+            return candidate
+        return "\n".join(
+            line.strip()
+            for line in remove_empty_lines(candidate_no_comments).splitlines()
+        )
+
+    def group_candidates(self, bug: Bug, candidates: List[Any]) -> List[int]:
+        """
+        Returns, for each candidate, the index of the first candidate with the same normalized form.
+
+        :param bug: The bug the candidates were generated for.
+        :param candidates: The candidates, as returned by extract_candidates.
+        """
+        if not self.deduplicate_candidates:
+            return super().group_candidates(bug, candidates)
+
+        patched_files = PatchSet(bug.get_ground_truth())
+        java = len(patched_files) > 0 and all(
+            patched_file.path.endswith(".java") for patched_file in patched_files
+        )
+
+        groups = []
+        first_index = {}
+        for i, candidate in enumerate(candidates):
+            key = self.get_candidate_key(candidate, java)
+            groups.append(i if key is None else first_index.setdefault(key, i))
+        return groups
+
+    def share_evaluation(
+        self, evaluation: Optional[dict], candidate: Any
+    ) -> Optional[dict]:
+        """
+        Returns a copy of the evaluation that reports the generation of the equivalent candidate.
+
+        :param evaluation: The evaluation of the first candidate of the group.
+        :param candidate: The equivalent candidate.
+        """
+        if evaluation is None:
+            return None
+        return {**evaluation, "generation": candidate}
+
+    def complete_evaluations(
+        self, bug: Bug, sample: dict, evaluations: List[Optional[dict]]
+    ) -> List[Optional[dict]]:
+        """
+        Matches the ASTs of the plausible candidates of the sample in one batch, and caches their evaluations.
+
+        :param bug: The bug the candidates were generated for.
+        :param sample: The sample to evaluate.
+        :param evaluations: The evaluations of the candidates, as returned by evaluate_candidate.
+        """
+        with self.pending_lock:
+            pending = [
+                self.pending_ast_matches.pop(id(evaluation))
+                for evaluation in evaluations
+                if evaluation is not None and id(evaluation) in self.pending_ast_matches
+            ]
+        if not pending:
+            return evaluations
+
+        ast_matches = self.ast_match_batch(
+            [(fixed_code, candidate_code) for _, fixed_code, candidate_code in pending]
+        )
+        for (result, _, _), ast_match in zip(pending, ast_matches):
+            result["ast_match"] = ast_match
+            # Save the evaluation to the cache
+            if self.use_cache:
+                self.cache.save_to_cache_from_bug(bug, result["generation"], result)
+        return evaluations
 
     def _evaluate_impl(self, bug: Bug, sample: dict) -> Optional[List[dict]]:
         """
@@ -167,9 +329,20 @@ class ReplaceEvaluationStrategy(PatchEvaluationStrategy):
         :param bug: The bug to generate the prompt for.
         :param sample: The sample to evaluate.
         """
-        evaluation = []
-
-        for generation in sample["generation"]:
-            evaluation.append(self.evaluate_generation(bug, sample, generation))
+        candidates = self.extract_candidates(sample)
+        groups = self.group_candidates(bug, candidates)
+        num_deduplicated = len(candidates) - len(set(groups))
+        if num_deduplicated > 0:
+            logging.info(
+                f"Evaluating {len(set(groups))} out of {len(candidates)} candidates of {bug.get_identifier()} ({num_deduplicated} deduplicated)"
+            )
 
+        evaluation = [
+            self.evaluate_candidate(bug, sample, candidate) if groups[i] == i else None
+            for i, candidate in enumerate(candidates)
+        ]
+        evaluation = self.complete_evaluations(bug, sample, evaluation)
+        for i, candidate in enumerate(candidates):
+            if groups[i] != i:
+                evaluation[i] = self.share_evaluation(evaluation[groups[i]], candidate)
         return evaluation
@@ -0,0 +1,83 @@
+from elleelleaime.core.utils.jsonl import stream_jsonl, write_jsonl
+
+from typing import Any, Dict, List, Optional
+
+import os
+import json
+import hashlib
+import threading
+
+# The workers of a run record their batches in the same journal
+_journal_lock = threading.Lock()
+
+
+def get_request_keys(
+    requests: List[List[dict]], prompt_ids: Optional[List[Any]] = None
+) -> List[List[str]]:
+    """
+    Returns the keys of the batch requests of each prompt of a chunk, given the identifiers
+    of the prompts if any. Otherwise, the occurrences of identical requests are numbered.
+    """
+    if prompt_ids is None:
+        occurrences: Dict[str, int] = {}
+        prompt_ids = []
+        for bodies in requests:
+            body = json.dumps(bodies, sort_keys=True)
+            prompt_ids.append(occurrences.get(body, 0))
+            occurrences[body] = prompt_ids[-1] + 1
+
+    return [
+        [
+            hashlib.sha256(
+                json.dumps([prompt_id, k, body], sort_keys=True, default=str).encode()
+            ).hexdigest()
+            for k, body in enumerate(bodies)
+        ]
+        for prompt_id, bodies in zip(prompt_ids, requests)
+    ]
+
+
+class BatchJournal:
+    """
+    Journal of the batches submitted to the batch API of a provider, recording the id of each
+    batch and the keys of its requests by custom_id. A run interrupted while waiting for its
+    batches reattaches to them, instead of submitting (and paying for) them again.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def record(self, batch_id: str, requests: Dict[str, str]) -> None:
+        """
+        Records a submitted batch, given the keys of its requests by custom_id.
+        """
+        with _journal_lock:
+            write_jsonl(
+                self.path,
+                [{"batch_id": batch_id, "requests": requests}],
+                append=True,
+            )
+
+    def find(self, keys: List[str]) -> Dict[str, Dict[str, str]]:
+        """
+        Returns the recorded batches holding any of the given requests, as the keys of these
+        requests by custom_id, by batch id. A request submitted again is only found in its
+        latest batch.
+        """
+        if not os.path.exists(self.path):
+            return {}
+
+        keys_set = set(keys)
+        latest: Dict[str, tuple] = {}
+        for entry in stream_jsonl(self.path, ignore_invalid=True):
+            batch_id, requests = entry.get("batch_id"), entry.get("requests")
+            if not isinstance(batch_id, str) or not isinstance(requests, dict):
+                continue
+            for custom_id, key in requests.items():
+                if key in keys_set:
+                    latest[key] = (batch_id, custom_id)
+
+        batches: Dict[str, Dict[str, str]] = {}
+        for key, (batch_id, custom_id) in latest.items():
+            batches.setdefault(batch_id, {})[custom_id] = key
+        return batches
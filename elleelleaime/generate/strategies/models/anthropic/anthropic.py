@@ -1,20 +1,34 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.generate.strategies.rate_limit import estimate_tokens
 
-from typing import Any, List
+from typing import Any, Dict, List, Optional
 
 import os
+import time
+import asyncio
 import anthropic
 import backoff
+import logging
 
 
-class AnthropicModels(PatchGenerationStrategy):
+class AnthropicModels(AsyncPatchGenerationStrategy):
+    PROVIDER = "anthropic"
+
     def __init__(self, model_name: str, max_tokens: int, **kwargs) -> None:
+        super().__init__(**kwargs)
         self.model_name = model_name
         self.max_tokens = max_tokens
         self.temperature = kwargs.get("temperature", 0.0)
         self.n_samples = kwargs.get("n_samples", 1)
+        self.base_url = kwargs.get("base_url", None)
+
+    async def _aopen(self) -> None:
+        self.client = anthropic.AsyncAnthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"), base_url=self.base_url
+        )
 
-        self.client = anthropic.Anthropic(api_key=os.getenv("ANTHROPIC_API_KEY"))
+    async def _aclose(self) -> None:
+        await self.client.close()
 
     @backoff.on_exception(
         backoff.expo,
@@ -22,25 +36,68 @@ class AnthropicModels(PatchGenerationStrategy):
         max_tries=5,
         raise_on_giveup=False,
     )
-    def _completions_with_backoff(self, **kwargs):
-        return self.client.messages.create(**kwargs)
-
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-
-        for prompt in chunk:
-            result_sample = []
-            for _ in range(self.n_samples):
-                completion = self._completions_with_backoff(
-                    model=self.model_name,
-                    max_tokens=self.max_tokens,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=self.temperature,
-                )
-                if completion:
-                    result_sample.append(completion.to_dict())
-                else:
-                    result_sample.append(completion)
-            result.append(result_sample)
+    async def _completions_with_backoff(self, **kwargs):
+        async with self.request_slot(estimate_tokens(kwargs["messages"])) as limiter:
+            response = await self.client.messages.with_raw_response.create(**kwargs)
+        limiter.update_from_headers(response.headers)
+        return response.parse()
+
+    def _get_request(self, prompt: str) -> dict:
+        return {
+            "model": self.model_name,
+            "max_tokens": self.max_tokens,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+        }
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        completions = await asyncio.gather(
+            *(
+                self._completions_with_backoff(**self._get_request(prompt))
+                for _ in range(self.n_samples)
+            )
+        )
+        return [
+            completion.to_dict() if completion else completion
+            for completion in completions
+        ]
 
-        return result
+    def _open_batch_client(self) -> anthropic.Anthropic:
+        return anthropic.Anthropic(
+            api_key=os.getenv("ANTHROPIC_API_KEY"), base_url=self.base_url
+        )
+
+    def _get_batch_requests(self, prompt: str) -> List[dict]:
+        return [self._get_request(prompt) for _ in range(self.n_samples)]
+
+    def _submit_batch(
+        self, client: anthropic.Anthropic, requests: Dict[str, dict]
+    ) -> str:
+        return client.messages.batches.create(
+            requests=[
+                {"custom_id": custom_id, "params": params}
+                for custom_id, params in requests.items()
+            ]
+        ).id
+
+    def _wait_for_batch(
+        self, client: anthropic.Anthropic, batch_id: str
+    ) -> Dict[str, Optional[dict]]:
+        batch = client.messages.batches.retrieve(batch_id)
+        while batch.processing_status != "ended":
+            logging.info(
+                f"Batch {batch.id} is {batch.processing_status}: {batch.request_counts}"
+            )
+            time.sleep(self.batch_poll_interval)
+            batch = client.messages.batches.retrieve(batch_id)
+
+        # Results are not in the order of the requests, and failed requests are None
+        completions: Dict[str, Optional[dict]] = {}
+        for result in client.messages.batches.results(batch_id):
+            if result.result.type == "succeeded":
+                completions[result.custom_id] = result.result.message.to_dict()
+            else:
+                logging.error(
+                    f"Request {result.custom_id} of batch {batch_id} {result.result.type}: {result.result.to_dict()}"
+                )
+        return completions
@@ -1,22 +1,26 @@
 import google.api_core
 import google.api_core.exceptions
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.generate.strategies.rate_limit import estimate_tokens
 
-from typing import Any, List
+from typing import Any
 
 import os
-import tqdm
+import asyncio
 import google.generativeai as genai
+import google.ai.generativelanguage as glm
 import google
 import backoff
 
 import google.api
 
 
-class GoogleModels(PatchGenerationStrategy):
+class GoogleModels(AsyncPatchGenerationStrategy):
+    PROVIDER = "google"
+
     def __init__(self, model_name: str, **kwargs) -> None:
+        super().__init__(**kwargs)
         self.model_name = model_name
-        self.model = genai.GenerativeModel(self.model_name)
         self.temperature = kwargs.get("temperature", 0.0)
         self.n_samples = kwargs.get("n_samples", 1)
 
@@ -27,20 +31,30 @@ class GoogleModels(PatchGenerationStrategy):
             temperature=self.temperature,
         )
 
-    @backoff.on_exception(backoff.expo, google.api_core.exceptions.ResourceExhausted)
-    def __generate_with_backoff(self, prompt: str) -> dict:
-        completion = self.model.generate_content(
-            prompt, generation_config=self.__get_config()
+    async def _aopen(self) -> None:
+        # The default async client of genai is shared by the whole process, while grpc.aio
+        # channels are bound to the event loop creating them, so each generation gets its own
+        self.client = glm.GenerativeServiceAsyncClient(
+            client_options={"api_key": os.getenv("GOOGLE_API_KEY")}
         )
-        return completion.to_dict()
+        self.model = genai.GenerativeModel(self.model_name)
+        self.model._async_client = self.client
 
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
+    async def _aclose(self) -> None:
+        await self.client.transport.close()
 
-        for prompt in tqdm.tqdm(chunk, "Generating patches for prompt..."):
-            p_results = []
-            for _ in range(self.n_samples):
-                p_results.append(self.__generate_with_backoff(prompt))
-            result.append(p_results)
+    @backoff.on_exception(backoff.expo, google.api_core.exceptions.ResourceExhausted)
+    async def __generate_with_backoff(self, prompt: str) -> dict:
+        # The client does not expose the headers, so only the configured budgets apply
+        async with self.request_slot(estimate_tokens(prompt)):
+            completion = await self.model.generate_content_async(
+                prompt, generation_config=self.__get_config()
+            )
+        return completion.to_dict()
 
-        return result
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        return list(
+            await asyncio.gather(
+                *(self.__generate_with_backoff(prompt) for _ in range(self.n_samples))
+            )
+        )
@@ -1,26 +1,42 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
-from typing import Any, List
+from elleelleaime.generate.strategies.strategy import (
+    OPERATIONAL_KWARGS,
+    AsyncPatchGenerationStrategy,
+)
+from elleelleaime.generate.strategies.rate_limit import estimate_tokens
+from typing import Any, Tuple
 
 import backoff, litellm, logging
 
 logging.getLogger("LiteLLM").setLevel(logging.WARNING)
 
 
-class LiteLLMChatCompletionModels(PatchGenerationStrategy):
+class LiteLLMChatCompletionModels(AsyncPatchGenerationStrategy):
+    PROVIDER = "litellm"
+
     def __init__(self, **kwargs) -> None:
-        self.kwargs = kwargs
+        super().__init__(**kwargs)
+        # Options of the strategy itself are not passed to litellm
+        self.kwargs = {
+            key: value for key, value in kwargs.items() if key not in OPERATIONAL_KWARGS
+        }
+
+    def get_rate_limit_key(self) -> Tuple[str, str]:
+        return self.PROVIDER, str(self.kwargs.get("model"))
 
     @backoff.on_exception(backoff.expo, Exception)
-    def _completions_with_backoff(self, **kwargs):
-        return litellm.completion(
-            **kwargs, caching=False, cache={"no-cache": True, "no-store": True}
+    async def _completions_with_backoff(self, **kwargs):
+        async with self.request_slot(estimate_tokens(kwargs["messages"])) as limiter:
+            completion = await litellm.acompletion(
+                **kwargs, caching=False, cache={"no-cache": True, "no-store": True}
+            )
+        # LiteLLM forwards the headers of the provider, with the OpenAI rate-limit names
+        limiter.update_from_headers(
+            getattr(completion, "_hidden_params", {}).get("additional_headers")
         )
+        return completion
 
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-        for prompt in chunk:
-            completion = self._completions_with_backoff(
-                messages=[{"role": "user", "content": prompt}], **self.kwargs
-            )
-            result.append(completion.to_dict())
-        return result
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        completion = await self._completions_with_backoff(
+            messages=[{"role": "user", "content": prompt}], **self.kwargs
+        )
+        return completion.to_dict()
@@ -1,18 +1,23 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.generate.strategies.rate_limit import estimate_tokens
 
-from typing import Any, List
+from typing import Any
 
 import os
 import mistralai
 import backoff
 
 
-class MistralModels(PatchGenerationStrategy):
+class MistralModels(AsyncPatchGenerationStrategy):
+    PROVIDER = "mistral"
+
     def __init__(self, model_name: str, **kwargs) -> None:
+        super().__init__(**kwargs)
         self.model_name = model_name
         self.temperature = kwargs.get("temperature", 0.0)
         self.n_samples = kwargs.get("n_samples", 1)
 
+    async def _aopen(self) -> None:
         self.client = mistralai.Mistral(os.getenv("MISTRAL_API_KEY", None))
 
     @backoff.on_exception(
@@ -23,21 +28,18 @@ class MistralModels(PatchGenerationStrategy):
             AssertionError,
         ),
     )
-    def _completions_with_backoff(self, **kwargs):
-        response = self.client.chat.complete(**kwargs)
+    async def _completions_with_backoff(self, **kwargs):
+        # Only the errors of the client expose the headers of the response
+        async with self.request_slot(estimate_tokens(kwargs["messages"])):
+            response = await self.client.chat.complete_async(**kwargs)
         assert response is not None
         return response
 
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-
-        for prompt in chunk:
-            completion = self._completions_with_backoff(
-                model=self.model_name,
-                messages=[{"role": "user", "content": prompt}],
-                temperature=self.temperature,
-                n=self.n_samples,
-            )
-            result.append(completion.model_dump())
-
-        return result
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        completion = await self._completions_with_backoff(
+            model=self.model_name,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=self.temperature,
+            n=self.n_samples,
+        )
+        return completion.model_dump()
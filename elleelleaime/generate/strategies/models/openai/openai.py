@@ -1,14 +1,23 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.generate.strategies.rate_limit import estimate_tokens
 
-from typing import Any, List
+from typing import Any, Dict, List, Optional, Tuple
 
 import os
+import json
+import time
 import openai
+import asyncio
 import backoff
+import logging
 
 
-class OpenAIChatCompletionModels(PatchGenerationStrategy):
+class OpenAIChatCompletionModels(AsyncPatchGenerationStrategy):
+    PROVIDER = "openai"
+    BATCH_FINAL_STATUSES = {"completed", "failed", "expired", "cancelled"}
+
     def __init__(self, model_name: str, **kwargs) -> None:
+        super().__init__(**kwargs)
         self.model_name = model_name
         self.temperature = kwargs.get("temperature", 0.0)
         self.n_samples = kwargs.get("n_samples", 1)
@@ -17,34 +26,124 @@ class OpenAIChatCompletionModels(PatchGenerationStrategy):
         self.batching = kwargs.get("batching", True)
 
         openai.api_key = os.getenv("OPENAI_API_KEY")
-        self.client = openai.OpenAI(api_key=openai.api_key, base_url=self.base_url)
+
+    def get_rate_limit_key(self) -> Tuple[str, str]:
+        # OpenAI-compatible servers have their own limits
+        return self.base_url or self.PROVIDER, self.model_name
+
+    async def _aopen(self) -> None:
+        self.client = openai.AsyncOpenAI(api_key=openai.api_key, base_url=self.base_url)
+
+    async def _aclose(self) -> None:
+        await self.client.close()
 
     @backoff.on_exception(backoff.expo, Exception)
-    def _completions_with_backoff(self, **kwargs):
-        return self.client.chat.completions.create(**kwargs)
-
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-
-        for prompt in chunk:
-            if not self.batching:
-                result_sample = []
-                for _ in range(self.n_samples):
-                    completion = self._completions_with_backoff(
-                        model=self.model_name,
-                        messages=[{"role": "user", "content": prompt}],
-                        temperature=self.temperature,
-                        reasoning_effort=self.reasoning_effort,
+    async def _completions_with_backoff(self, **kwargs):
+        async with self.request_slot(estimate_tokens(kwargs["messages"])) as limiter:
+            response = await self.client.chat.completions.with_raw_response.create(
+                **kwargs
+            )
+        limiter.update_from_headers(response.headers)
+        return response.parse()
+
+    def _get_requests(self, prompt: str) -> List[dict]:
+        """
+        Returns the bodies of the requests generating the samples of the prompt.
+        """
+        if not self.batching:
+            return [
+                {
+                    "model": self.model_name,
+                    "messages": [{"role": "user", "content": prompt}],
+                    "temperature": self.temperature,
+                    "reasoning_effort": self.reasoning_effort,
+                }
+                for _ in range(self.n_samples)
+            ]
+        return [
+            {
+                "model": self.model_name,
+                "messages": [{"role": "user", "content": prompt}],
+                "temperature": self.temperature,
+                "n": self.n_samples,
+            }
+        ]
+
+    def _get_generation(self, completions: List[Optional[dict]]) -> Any:
+        if not self.batching:
+            return completions
+        return completions[0]
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        completions = await asyncio.gather(
+            *(
+                self._completions_with_backoff(**request)
+                for request in self._get_requests(prompt)
+            )
+        )
+        return self._get_generation(
+            [completion.to_dict() for completion in completions]
+        )
+
+    def _open_batch_client(self) -> openai.OpenAI:
+        return openai.OpenAI(api_key=openai.api_key, base_url=self.base_url)
+
+    def _get_batch_requests(self, prompt: str) -> List[dict]:
+        return self._get_requests(prompt)
+
+    def _get_batch_generation(self, completions: List[Optional[dict]]) -> Any:
+        return self._get_generation(completions)
+
+    def _submit_batch(self, client: openai.OpenAI, requests: Dict[str, dict]) -> str:
+        input_file = client.files.create(
+            file=(
+                "batch.jsonl",
+                "".join(
+                    json.dumps(
+                        {
+                            "custom_id": custom_id,
+                            "method": "POST",
+                            "url": "/v1/chat/completions",
+                            "body": body,
+                        }
+                    )
+                    + "\n"
+                    for custom_id, body in requests.items()
+                ).encode("utf-8"),
+            ),
+            purpose="batch",
+        )
+        return client.batches.create(
+            input_file_id=input_file.id,
+            endpoint="/v1/chat/completions",
+            completion_window="24h",
+        ).id
+
+    def _wait_for_batch(
+        self, client: openai.OpenAI, batch_id: str
+    ) -> Dict[str, Optional[dict]]:
+        batch = client.batches.retrieve(batch_id)
+        while batch.status not in self.BATCH_FINAL_STATUSES:
+            logging.info(f"Batch {batch.id} is {batch.status}: {batch.request_counts}")
+            time.sleep(self.batch_poll_interval)
+            batch = client.batches.retrieve(batch_id)
+        if batch.status != "completed":
+            logging.error(f"Batch {batch.id} ended as {batch.status}: {batch.errors}")
+
+        # Results are not in the order of the requests, and failed requests are None
+        completions: Dict[str, Optional[dict]] = {}
+        for file_id in [batch.output_file_id, batch.error_file_id]:
+            if file_id is None:
+                continue
+            for line in client.files.content(file_id).text.splitlines():
+                if not line.strip():
+                    continue
+                result = json.loads(line)
+                response = result.get("response") or {}
+                if response.get("status_code") == 200 and not result.get("error"):
+                    completions[result["custom_id"]] = response["body"]
+                else:
+                    logging.error(
+                        f"Request {result['custom_id']} of batch {batch.id} failed: {result.get('error') or response.get('body')}"
                     )
-                    result_sample.append(completion.to_dict())
-                result.append(result_sample)
-            else:
-                completion = self._completions_with_backoff(
-                    model=self.model_name,
-                    messages=[{"role": "user", "content": prompt}],
-                    temperature=self.temperature,
-                    n=self.n_samples,
-                )
-                result.append(completion.to_dict())
-
-        return result
+        return completions
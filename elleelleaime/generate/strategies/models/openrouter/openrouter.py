@@ -1,16 +1,22 @@
 import requests.exceptions
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.generate.strategies.rate_limit import RateLimiter, estimate_tokens
+from concurrent.futures import ThreadPoolExecutor
 
-from typing import Any, List
+from typing import Any
 
 import os
+import asyncio
 import requests
 import json
 import backoff
 
 
-class OpenRouterModels(PatchGenerationStrategy):
+class OpenRouterModels(AsyncPatchGenerationStrategy):
+    PROVIDER = "openrouter"
+
     def __init__(self, model_name: str, **kwargs) -> None:
+        super().__init__(**kwargs)
         self.model_name = model_name
         self.temperature = kwargs.get("temperature", 0.0)
         self.n_samples = kwargs.get("n_samples", 1)
@@ -23,6 +29,8 @@ class OpenRouterModels(PatchGenerationStrategy):
             self.provider_args["order"] = [self.provider]
 
         self.openrouter_api_key = os.getenv("OPENROUTER_API_KEY")
+        # Requests are blocking, and run on threads so that max_concurrency of them can be in flight
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency)
 
     @backoff.on_exception(
         backoff.expo,
@@ -30,7 +38,13 @@ class OpenRouterModels(PatchGenerationStrategy):
         max_tries=5,
         raise_on_giveup=False,
     )
-    def _completions_with_backoff(self, **kwargs):
+    async def _completions_with_backoff(self, **kwargs):
+        async with self.request_slot(estimate_tokens(kwargs["messages"])) as limiter:
+            return await asyncio.get_running_loop().run_in_executor(
+                self.executor, lambda: self._completions(limiter, **kwargs)
+            )
+
+    def _completions(self, limiter: RateLimiter, **kwargs):
         response = requests.post(
             url="https://openrouter.ai/api/v1/chat/completions",
             headers={
@@ -43,6 +57,7 @@ class OpenRouterModels(PatchGenerationStrategy):
             data=json.dumps(kwargs),
         )
 
+        limiter.update_from_headers(response.headers)
         response = response.json()
 
         if "error" in response:
@@ -50,22 +65,20 @@ class OpenRouterModels(PatchGenerationStrategy):
 
         return response
 
-    def _generate_impl(self, chunk: List[str]) -> Any:
-        result = []
-
-        for prompt in chunk:
-            result_sample = []
-            for _ in range(self.n_samples):
-                kwargs = {
-                    "model": self.model_name,
-                    "messages": [{"role": "user", "content": prompt}],
-                    "temperature": self.temperature,
-                    "include_reasoning": self.include_reasoning,
-                    "provider": self.provider_args,
-                }
-                kwargs = {k: v for k, v in kwargs.items() if v}
-                completion = self._completions_with_backoff(**kwargs)
-                result_sample.append(completion)
-            result.append(result_sample)
-
-        return result
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        kwargs = {
+            "model": self.model_name,
+            "messages": [{"role": "user", "content": prompt}],
+            "temperature": self.temperature,
+            "include_reasoning": self.include_reasoning,
+            "provider": self.provider_args,
+        }
+        kwargs = {k: v for k, v in kwargs.items() if v}
+        return list(
+            await asyncio.gather(
+                *(
+                    self._completions_with_backoff(**kwargs)
+                    for _ in range(self.n_samples)
+                )
+            )
+        )
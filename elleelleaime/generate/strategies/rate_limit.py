@@ -0,0 +1,246 @@
+from email.utils import parsedate_to_datetime
+from typing import Dict, List, Mapping, Optional, Tuple, Union
+
+import math
+import time
+import asyncio
+import logging
+import threading
+
+# Rough average for code and English text, used to estimate prompts before sending them
+CHARS_PER_TOKEN = 4
+
+# Rate-limit headers of the providers, most specific first
+REQUESTS_LIMIT_HEADERS = [
+    "x-ratelimit-limit-requests",
+    "anthropic-ratelimit-requests-limit",
+]
+REQUESTS_REMAINING_HEADERS = [
+    "x-ratelimit-remaining-requests",
+    "anthropic-ratelimit-requests-remaining",
+]
+TOKENS_LIMIT_HEADERS = [
+    "x-ratelimit-limit-tokens",
+    "anthropic-ratelimit-input-tokens-limit",
+    "anthropic-ratelimit-tokens-limit",
+]
+TOKENS_REMAINING_HEADERS = [
+    "x-ratelimit-remaining-tokens",
+    "anthropic-ratelimit-input-tokens-remaining",
+    "anthropic-ratelimit-tokens-remaining",
+]
+
+
+def estimate_tokens(prompt: Union[str, List[dict]]) -> int:
+    """
+    Estimates the number of tokens of a prompt, or of the content of chat messages.
+    """
+    if not isinstance(prompt, str):
+        return sum(estimate_tokens(str(message["content"])) for message in prompt)
+    return math.ceil(len(prompt) / CHARS_PER_TOKEN)
+
+
+class TokenBucket:
+    """
+    Budget of a quantity per minute, refilled continuously.
+
+    A bucket without a limit never waits, until a limit is learned from the provider.
+    """
+
+    def __init__(self, per_minute: Optional[float] = None):
+        self.configured = per_minute
+        self.capacity = per_minute
+        self.level = per_minute
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        if self.capacity is not None and self.level is not None:
+            self.level = min(
+                self.capacity,
+                self.level + (now - self.updated) * self.capacity / 60,
+            )
+        self.updated = now
+
+    def get_wait_time(self, amount: float) -> float:
+        """
+        Returns the seconds until amount is available, which is capped to the capacity.
+        """
+        if self.capacity is None or self.level is None:
+            return 0.0
+        amount = min(amount, self.capacity)
+        if self.level >= amount:
+            return 0.0
+        return (amount - self.level) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        if self.capacity is not None and self.level is not None:
+            self.level -= min(amount, self.capacity)
+
+    def set_limit(self, per_minute: float) -> None:
+        # The configured budget is a cap on the one of the provider
+        if self.configured is not None:
+            per_minute = min(per_minute, self.configured)
+        if per_minute <= 0:
+            return
+        self.capacity = per_minute
+        self.level = per_minute if self.level is None else min(self.level, per_minute)
+
+    def set_remaining(self, remaining: float) -> None:
+        if self.level is not None:
+            self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """
+    Requests-per-minute and tokens-per-minute budgets of one provider and model.
+
+    The budgets are given by rpm and tpm, and adapted from the rate-limit and retry-after
+    headers of the responses. A limiter can be shared by the threads generating patches,
+    each waiting on its own event loop.
+    """
+
+    def __init__(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.paused_until = 0.0
+        self.lock = threading.Lock()
+
+    def configure(self, rpm: Optional[float] = None, tpm: Optional[float] = None):
+        with self.lock:
+            if rpm is not None:
+                self.requests.configured = rpm
+                self.requests.set_limit(rpm)
+            if tpm is not None:
+                self.tokens.configured = tpm
+                self.tokens.set_limit(tpm)
+
+    def reserve(self, tokens: int = 0) -> float:
+        """
+        Takes one request and the given tokens from the budgets if they are available.
+
+        :return: 0 if they were taken, otherwise the seconds to wait before trying again.
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.requests.refill(now)
+            self.tokens.refill(now)
+            wait_time = max(
+                self.paused_until - now,
+                self.requests.get_wait_time(1),
+                self.tokens.get_wait_time(tokens),
+            )
+            if wait_time <= 0:
+                self.requests.take(1)
+                self.tokens.take(tokens)
+                return 0.0
+            return wait_time
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """
+        Waits until the budgets allow sending a request of the given tokens.
+        """
+        while (wait_time := self.reserve(tokens)) > 0:
+            await asyncio.sleep(wait_time)
+
+    def pause(self, seconds: float) -> None:
+        """
+        Holds all requests for the given seconds, e.g. as asked by a retry-after header.
+        """
+        with self.lock:
+            self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers: Optional[Mapping[str, str]]) -> None:
+        """
+        Adapts the budgets to the rate-limit headers of a response.
+        """
+        if not headers:
+            return
+        headers = {str(k).lower(): str(v) for k, v in headers.items()}
+
+        retry_after = parse_retry_after(headers)
+        if retry_after is not None:
+            self.pause(retry_after)
+
+        with self.lock:
+            now = time.monotonic()
+            for bucket, limit_headers, remaining_headers in [
+                (self.requests, REQUESTS_LIMIT_HEADERS, REQUESTS_REMAINING_HEADERS),
+                (self.tokens, TOKENS_LIMIT_HEADERS, TOKENS_REMAINING_HEADERS),
+            ]:
+                bucket.refill(now)
+                limit = get_number_header(headers, limit_headers)
+                if limit is not None:
+                    bucket.set_limit(limit)
+                remaining = get_number_header(headers, remaining_headers)
+                if remaining is not None:
+                    bucket.set_remaining(remaining)
+
+    def update_from_error(self, error: BaseException) -> None:
+        """
+        Adapts the budgets to the headers of the response of a failed request, if any.
+        """
+        # The errors of the openai, anthropic and requests clients hold the response, and
+        # the ones of the mistral client the raw response
+        response = getattr(error, "response", None)
+        if response is None:
+            response = getattr(error, "raw_response", None)
+        headers = getattr(response, "headers", None)
+        if headers is not None:
+            try:
+                self.update_from_headers(headers)
+            except Exception as e:
+                logging.debug(f"Ignoring unreadable rate-limit headers: {e}")
+
+
+def get_number_header(headers: Dict[str, str], names: List[str]) -> Optional[float]:
+    for name in names:
+        if name in headers:
+            try:
+                return float(headers[name])
+            except ValueError:
+                continue
+    return None
+
+
+def parse_retry_after(headers: Dict[str, str]) -> Optional[float]:
+    """
+    Returns the seconds asked by the retry-after headers, which hold seconds or an HTTP date.
+    """
+    if "retry-after-ms" in headers:
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    if "retry-after" not in headers:
+        return None
+    try:
+        return max(0.0, float(headers["retry-after"]))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(headers["retry-after"])
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+_rate_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+_rate_limiters_lock = threading.Lock()
+
+
+def get_rate_limiter(
+    provider: str,
+    model: str,
+    rpm: Optional[float] = None,
+    tpm: Optional[float] = None,
+) -> RateLimiter:
+    """
+    Returns the rate limiter of this process for the given provider and model, creating it if needed.
+    """
+    with _rate_limiters_lock:
+        if (provider, model) not in _rate_limiters:
+            _rate_limiters[(provider, model)] = RateLimiter(rpm, tpm)
+            return _rate_limiters[(provider, model)]
+        rate_limiter = _rate_limiters[(provider, model)]
+    rate_limiter.configure(rpm, tpm)
+    return rate_limiter
@@ -1,4 +1,7 @@
-from elleelleaime.generate.strategies.strategy import PatchGenerationStrategy
+from elleelleaime.generate.strategies.strategy import (
+    OPERATIONAL_KWARGS,
+    PatchGenerationStrategy,
+)
 from elleelleaime.generate.strategies.models.openai.openai import (
     OpenAIChatCompletionModels,
 )
@@ -27,6 +30,12 @@ from elleelleaime.generate.strategies.models.litellm.litellm import (
     LiteLLMChatCompletionModels,
 )
 
+from elleelleaime.core.caching.generation import (
+    DEFAULT_GENERATION_CACHE_DIR,
+    get_generation_cache,
+)
+
+from pathlib import Path
 from typing import Tuple
 
 
@@ -49,13 +58,51 @@ class PatchGenerationStrategyRegistry:
         "litellm-chatcompletion": (LiteLLMChatCompletionModels, ()),
     }
 
+    # Options that change how the generations are obtained but not the generations themselves
+    OPERATIONAL_KWARGS = OPERATIONAL_KWARGS
+    # Options of the generation cache, which are not passed to the strategies
+    GENERATION_CACHE_KWARGS = {
+        "use_generation_cache",
+        "refresh_generation_cache",
+        "generation_cache_path",
+    }
+
     @classmethod
     def get_generation(cls, name: str, **kwargs) -> PatchGenerationStrategy:
+        """
+        Returns the strategy with the given name, serving its generations from the generation
+        cache unless use_generation_cache is False. With refresh_generation_cache, the cached
+        generations are generated again and replaced.
+        """
         if name.lower().strip() not in cls.__MODELS:
             raise ValueError(f"Unknown strategy {name}")
 
+        cache_kwargs = {
+            key: kwargs.pop(key) for key in cls.GENERATION_CACHE_KWARGS if key in kwargs
+        }
         strategy_class, strategy_args = cls.__MODELS[name.lower().strip()]
         for strategy_arg in strategy_args:
             if strategy_arg not in kwargs:
                 raise ValueError(f"Missing argument {strategy_arg} for strategy {name}")
-        return strategy_class(**kwargs)
+        strategy = strategy_class(**kwargs)
+
+        if cache_kwargs.get("use_generation_cache", True):
+            strategy.set_generation_cache(
+                get_generation_cache(
+                    Path(
+                        cache_kwargs.get(
+                            "generation_cache_path", DEFAULT_GENERATION_CACHE_DIR
+                        )
+                    )
+                ),
+                {
+                    "strategy": name.lower().strip(),
+                    **{
+                        key: value
+                        for key, value in kwargs.items()
+                        if key not in cls.OPERATIONAL_KWARGS
+                    },
+                },
+                refresh=cache_kwargs.get("refresh_generation_cache", False),
+            )
+        return strategy
@@ -1,6 +1,31 @@
 from abc import ABC, abstractmethod
 
-from typing import List, Any, final
+from contextlib import asynccontextmanager, nullcontext
+from contextvars import ContextVar
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    ContextManager,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Tuple,
+    final,
+)
+
+import queue
+import asyncio
+import logging
+import threading
+
+from elleelleaime.generate.strategies.rate_limit import RateLimiter, get_rate_limiter
+from elleelleaime.generate.strategies.batch_journal import (
+    BatchJournal,
+    get_request_keys,
+)
+from elleelleaime.core.caching.generation import GenerationCache
 
 
 class PatchGenerationStrategy(ABC):
@@ -19,12 +44,340 @@ class PatchGenerationStrategy(ABC):
         """
         return None
 
+    generation_cache: Optional[GenerationCache] = None
+    generation_cache_settings: Dict[str, Any] = {}
+    refresh_generation_cache: bool = False
+
+    @final
+    def set_generation_cache(
+        self,
+        generation_cache: GenerationCache,
+        settings: Dict[str, Any],
+        refresh: bool = False,
+    ) -> None:
+        """
+        Serves the generations from the cache, keyed by the settings of the strategy.
+        If refresh, the generations are generated again and replace the cached ones.
+        """
+        self.generation_cache = generation_cache
+        self.generation_cache_settings = settings
+        self.refresh_generation_cache = refresh
+
     @final
-    def generate(self, chunk: List[str]) -> Any:
+    def generate(self, chunk: List[str], prompt_ids: Optional[List[Any]] = None) -> Any:
         """
         Returns the generation results for the given prompt.
 
         :param prompt: The prompt to use for generation.
+        :param prompt_ids: Stable identifiers of the prompts, keying their cached generations.
         :return: A tuple containing the generation results.
         """
-        return self._generate_impl(chunk)
+        if self.generation_cache is None and prompt_ids is None:
+            return self._generate_impl(chunk)
+
+        generations: List[Any] = [None] * len(chunk)
+        for index, generation in self.generate_stream(chunk, prompt_ids):
+            generations[index] = generation
+        return generations
+
+    @final
+    def generate_stream(
+        self, chunk: List[str], prompt_ids: Optional[List[Any]] = None
+    ) -> Iterator[Tuple[int, Any]]:
+        """
+        Yields (index, generation) for the prompts of the chunk as their generations complete.
+        Cached generations are yielded first, and only the other prompts are generated.
+
+        :param prompt_ids: Stable identifiers of the prompts, e.g. the ones of their samples,
+            keying their cached generations. Without them, identical prompts are told apart by
+            their position among each other in the chunk.
+        """
+        if self.generation_cache is None:
+            yield from self._generate_stream_impl(chunk, prompt_ids)
+            return
+
+        keys = self.generation_cache.get_keys(
+            self.generation_cache_settings, chunk, prompt_ids
+        )
+        misses = []
+        for index, key in enumerate(keys):
+            generation = (
+                None
+                if self.refresh_generation_cache
+                else self.generation_cache.load(key)
+            )
+            if generation is None:
+                misses.append(index)
+            else:
+                yield index, generation
+
+        for j, generation in self._generate_stream_impl(
+            [chunk[i] for i in misses],
+            None if prompt_ids is None else [prompt_ids[i] for i in misses],
+        ):
+            self.generation_cache.save(keys[misses[j]], generation)
+            yield misses[j], generation
+
+    def _generate_stream_impl(
+        self, chunk: List[str], prompt_ids: Optional[List[Any]] = None
+    ) -> Iterator[Tuple[int, Any]]:
+        """
+        Yields (index, generation) for the prompts of the chunk as their generations complete.
+        By default, the generations are yielded once the whole chunk is generated.
+        """
+        yield from enumerate(self._generate_impl(chunk))
+
+
+# Options of the API strategies that change how the generations are obtained but not the
+# generations themselves
+OPERATIONAL_KWARGS = {
+    "max_concurrency",
+    "rpm",
+    "tpm",
+    "batch_api",
+    "batch_poll_interval",
+    "batch_journal_path",
+}
+
+# Limits the requests in flight of the generation running in the current context
+_request_semaphore: ContextVar[asyncio.Semaphore] = ContextVar("request_semaphore")
+
+
+class AsyncPatchGenerationStrategy(PatchGenerationStrategy):
+    """
+    Base class for strategies querying an API, which keep many requests in flight.
+
+    Subclasses implement _agenerate_prompt, which returns the generation of one prompt and
+    sends each of its API requests within request_slot. All prompts of a chunk are generated
+    concurrently, with at most max_concurrency requests in flight.
+
+    Requests are also paced by the rate limiter of the provider and model, which enforces
+    the rpm (requests per minute) and tpm (tokens per minute) budgets, if given, and the
+    limits learned from the responses.
+
+    With batch_api, the chunk is instead submitted to the batch API of the provider, for
+    strategies implementing the batch methods, and polled every batch_poll_interval seconds.
+    The submitted batches are recorded in the journal at batch_journal_path, if given, so that
+    an interrupted run reattaches to them.
+    """
+
+    DEFAULT_MAX_CONCURRENCY = 16
+    DEFAULT_BATCH_POLL_INTERVAL = 60
+    # Name of the provider, which shares its rate limits between the strategies of a model
+    PROVIDER = "api"
+
+    def __init__(self, **kwargs) -> None:
+        self.max_concurrency: int = kwargs.get(
+            "max_concurrency", self.DEFAULT_MAX_CONCURRENCY
+        )
+        self.rpm: Optional[float] = kwargs.get("rpm", None)
+        self.tpm: Optional[float] = kwargs.get("tpm", None)
+        self.batch_api: bool = kwargs.get("batch_api", False)
+        self.batch_poll_interval: float = kwargs.get(
+            "batch_poll_interval", self.DEFAULT_BATCH_POLL_INTERVAL
+        )
+        self.batch_journal_path: Optional[str] = kwargs.get("batch_journal_path", None)
+
+    def get_rate_limit_key(self) -> Tuple[str, str]:
+        return self.PROVIDER, str(getattr(self, "model_name", None))
+
+    @property
+    def rate_limiter(self) -> RateLimiter:
+        return get_rate_limiter(*self.get_rate_limit_key(), self.rpm, self.tpm)
+
+    async def _aopen(self) -> None:
+        """
+        Called at the start of each generation, e.g. to create clients bound to its event loop.
+        """
+        pass
+
+    async def _aclose(self) -> None:
+        """
+        Called at the end of each generation.
+        """
+        pass
+
+    @abstractmethod
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        """
+        Returns the generation for the given prompt.
+        """
+        pass
+
+    @asynccontextmanager
+    async def request_slot(self, tokens: int = 0) -> AsyncIterator[RateLimiter]:
+        """
+        Waits for one of the max_concurrency request slots, to be held while a request is in flight,
+        and for the rate limiter to allow a request of the given estimated tokens.
+
+        Yields the rate limiter, to be updated with the headers of the response, and updates it
+        with the ones of a failed request.
+        """
+        semaphore = _request_semaphore.get(None)
+        async with semaphore if semaphore is not None else nullcontext():
+            rate_limiter = self.rate_limiter
+            await rate_limiter.acquire(tokens)
+            try:
+                yield rate_limiter
+            except Exception as e:
+                rate_limiter.update_from_error(e)
+                raise
+
+    async def _agenerate(
+        self,
+        chunk: List[str],
+        on_generation: Optional[Callable[[int, Any], None]] = None,
+    ) -> List[Any]:
+        # Tasks inherit the context, and with it the semaphore of this generation
+        _request_semaphore.set(asyncio.Semaphore(self.max_concurrency))
+
+        async def generate_prompt(index: int, prompt: str) -> Any:
+            generation = await self._agenerate_prompt(prompt)
+            if on_generation is not None:
+                on_generation(index, generation)
+            return generation
+
+        await self._aopen()
+        try:
+            return await asyncio.gather(
+                *(generate_prompt(index, prompt) for index, prompt in enumerate(chunk))
+            )
+        finally:
+            await self._aclose()
+
+    def _open_batch_client(self) -> ContextManager[Any]:
+        """
+        Returns the client of the batch API of the provider, closed when exiting it.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the batch API"
+        )
+
+    def _get_batch_requests(self, prompt: str) -> List[dict]:
+        """
+        Returns the requests of the batch API generating the samples of the prompt.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the batch API"
+        )
+
+    def _submit_batch(self, client: Any, requests: Dict[str, dict]) -> str:
+        """
+        Submits the requests by custom_id as a batch, and returns the id of the batch.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the batch API"
+        )
+
+    def _wait_for_batch(self, client: Any, batch_id: str) -> Dict[str, Optional[dict]]:
+        """
+        Polls the batch until it ends, and returns its completions by custom_id.
+        Completions of failed requests are None or missing.
+        """
+        raise NotImplementedError(
+            f"{type(self).__name__} does not support the batch API"
+        )
+
+    def _get_batch_generation(self, completions: List[Optional[dict]]) -> Any:
+        """
+        Returns the generation of a prompt given the completions of its requests.
+        """
+        return completions
+
+    def _generate_batch(
+        self, chunk: List[str], prompt_ids: Optional[List[Any]] = None
+    ) -> List[Any]:
+        """
+        Returns the generations of the chunk, generated through the batch API of the provider.
+        Generations of failed requests are None.
+
+        Requests recorded in the batch journal by an interrupted run are taken from their
+        batch, and only the others, or the ones that failed there, are submitted.
+        """
+        if len(chunk) == 0:
+            return []
+
+        requests = [self._get_batch_requests(prompt) for prompt in chunk]
+        keys = get_request_keys(requests, prompt_ids)
+        journal = (
+            BatchJournal(self.batch_journal_path) if self.batch_journal_path else None
+        )
+        completions: Dict[str, Optional[dict]] = {}
+        with self._open_batch_client() as client:
+            if journal is not None:
+                batches = journal.find([key for ks in keys for key in ks])
+                for batch_id, batch_keys in batches.items():
+                    logging.info(
+                        f"Reattaching to batch {batch_id} of {len(batch_keys)} requests"
+                    )
+                    try:
+                        results = self._wait_for_batch(client, batch_id)
+                    except Exception as e:
+                        logging.warning(f"Cannot reattach to batch {batch_id}: {e}")
+                        continue
+                    for custom_id, key in batch_keys.items():
+                        completions[key] = results.get(custom_id)
+
+            missing = {
+                f"{i}-{k}": (i, k)
+                for i, bodies in enumerate(requests)
+                for k in range(len(bodies))
+                if completions.get(keys[i][k]) is None
+            }
+            if missing:
+                batch_id = self._submit_batch(
+                    client,
+                    {
+                        custom_id: requests[i][k]
+                        for custom_id, (i, k) in missing.items()
+                    },
+                )
+                logging.info(f"Submitted batch {batch_id} of {len(missing)} requests")
+                if journal is not None:
+                    journal.record(
+                        batch_id,
+                        {
+                            custom_id: keys[i][k]
+                            for custom_id, (i, k) in missing.items()
+                        },
+                    )
+                results = self._wait_for_batch(client, batch_id)
+                for custom_id, (i, k) in missing.items():
+                    completions[keys[i][k]] = results.get(custom_id)
+
+        return [
+            self._get_batch_generation([completions.get(key) for key in ks])
+            for ks in keys
+        ]
+
+    def _generate_impl(self, chunk: List[str]) -> Any:
+        if self.batch_api:
+            return self._generate_batch(chunk)
+        return asyncio.run(self._agenerate(chunk))
+
+    def _generate_stream_impl(
+        self, chunk: List[str], prompt_ids: Optional[List[Any]] = None
+    ) -> Iterator[Tuple[int, Any]]:
+        if self.batch_api:
+            yield from enumerate(self._generate_batch(chunk, prompt_ids))
+            return
+
+        generations: queue.Queue = queue.Queue()
+        done = object()
+
+        def run():
+            try:
+                asyncio.run(
+                    self._agenerate(chunk, lambda index, g: generations.put((index, g)))
+                )
+                generations.put(done)
+            except BaseException as e:
+                generations.put(e)
+
+        thread = threading.Thread(target=run, daemon=True)
+        thread.start()
+        while (item := generations.get()) is not done:
+            if isinstance(item, BaseException):
+                raise item
+            yield item
+        thread.join()
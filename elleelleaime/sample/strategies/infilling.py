@@ -5,6 +5,7 @@ import re
 from elleelleaime.sample.strategy import PromptingStrategy
 from elleelleaime.core.benchmarks.bug import Bug
 from elleelleaime.core.utils.java.java import (
+    EXTRACTION_TOOLS,
     extract_single_function,
     compute_diff,
     remove_java_comments,
@@ -32,7 +33,7 @@ class InfillingPrompting(PromptingStrategy):
     }
 
     def __init__(self, **kwargs):
-        super().__init__("infilling")
+        super().__init__("infilling", **kwargs)
 
         self.model_name: str = kwargs.get("model_name", "").strip().lower()
         assert (
@@ -161,7 +162,12 @@ class InfillingPrompting(PromptingStrategy):
         Returns:
             Tuple: A tuple of the form (buggy_code, fixed_code, prompt).
         """
-        result = extract_single_function(bug)
+        result = self.get_extractions(
+            bug,
+            EXTRACTION_TOOLS,
+            ["single_function"],
+            lambda: {"single_function": extract_single_function(bug)},
+        )["single_function"]
 
         if result is None:
             return None, None, None
@@ -4,6 +4,8 @@ from unidiff import PatchSet
 from elleelleaime.sample.strategy import PromptingStrategy
 from elleelleaime.core.benchmarks.bug import RichBug
 from elleelleaime.core.utils.java.java import (
+    EXTRACTION_TOOLS,
+    checkout_bug,
     extract_single_function,
     extract_failing_test_cases,
 )
@@ -15,7 +17,18 @@ class InstructPrompting(PromptingStrategy):
     """
 
     def __init__(self, **kwargs):
-        super().__init__("instruct")
+        super().__init__("instruct", **kwargs)
+
+    def extract(self, bug: RichBug) -> dict:
+        """
+        Extracts the buggy and fixed function and the failing test cases of the bug.
+        """
+        # The buggy checkout is shared by the function and the failing test cases
+        with checkout_bug(bug, fixed=False) as buggy_path:
+            return {
+                "single_function": extract_single_function(bug, buggy_path),
+                "failing_test_cases": extract_failing_test_cases(bug, buggy_path),
+            }
 
     def instruct(
         self, bug: RichBug
@@ -28,13 +41,19 @@ class InstructPrompting(PromptingStrategy):
         Returns:
             Tuple: A tuple of the form (buggy_code, fixed_code, prompt).
         """
-        result = extract_single_function(bug)
+        extractions = self.get_extractions(
+            bug,
+            EXTRACTION_TOOLS,
+            ["single_function", "failing_test_cases"],
+            lambda: self.extract(bug),
+        )
+        result = extractions["single_function"]
         if result is None:
             return None, None, None
 
         buggy_code, fixed_code = result
 
-        failing_test_cases = extract_failing_test_cases(bug)
+        failing_test_cases = extractions["failing_test_cases"]
         failing_test_causes = bug.get_failing_tests()
         if len(failing_test_causes) == 0 or len(failing_test_cases) == 0:
             return None, None, None
@@ -5,6 +5,7 @@ import re
 from elleelleaime.sample.strategy import PromptingStrategy
 from elleelleaime.core.benchmarks.bug import RichBug
 from elleelleaime.core.utils.python.python import (
+    EXTRACTION_TOOLS,
     extract_single_function,
     # extract_failing_test_cases,
 )
@@ -16,7 +17,7 @@ class InstructPromptingPython(PromptingStrategy):
     """
 
     def __init__(self, **kwargs):
-        super().__init__("instruct_python")
+        super().__init__("instruct_python", **kwargs)
 
     def instruct(
         self, bug: RichBug
@@ -29,7 +30,12 @@ class InstructPromptingPython(PromptingStrategy):
         Returns:
             Tuple: A tuple of the form (buggy_code, fixed_code, prompt).
         """
-        result = extract_single_function(bug)
+        result = self.get_extractions(
+            bug,
+            EXTRACTION_TOOLS,
+            ["single_function"],
+            lambda: {"single_function": extract_single_function(bug)},
+        )["single_function"]
         if result is None:
             return None, None, None
 
@@ -1,12 +1,44 @@
 from abc import ABC, abstractmethod
 from elleelleaime.core.benchmarks.bug import Bug
+from elleelleaime.core.caching.extraction import (
+    DEFAULT_EXTRACTION_CACHE_DIR,
+    ExtractionCache,
+    get_extraction_cache,
+)
 
-from typing import Optional, Union
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union
 
 
 class PromptingStrategy(ABC):
     def __init__(self, strategy_name: str, **kwargs):
         self.strategy_name = strategy_name
+        # Strategies sharing an extraction cache extract each bug once
+        self.extraction_cache: Optional[ExtractionCache] = kwargs.get(
+            "extraction_cache", None
+        )
+        if self.extraction_cache is None and kwargs.get("use_extraction_cache", True):
+            self.extraction_cache = get_extraction_cache(
+                Path(kwargs.get("extraction_cache_path", DEFAULT_EXTRACTION_CACHE_DIR))
+            )
+
+    def get_extractions(
+        self,
+        bug: Bug,
+        tools: List[Path],
+        fields: List[str],
+        extract: Callable[[], Dict[str, Any]],
+    ) -> Dict[str, Any]:
+        """
+        Returns the extractions of the bug named in fields, computing them with extract() unless
+        they were already cached (by any prompting strategy) for the same bug and tools.
+        Negative results are cached as well, failed extractions raise and are not.
+
+        :param tools: The files the extraction depends on, e.g. the extractor jar.
+        """
+        if self.extraction_cache is None:
+            return extract()
+        return self.extraction_cache.get_or_extract(bug, tools, fields, extract)
 
     @abstractmethod
     def prompt(self, bug: Bug) -> dict[str, Optional[str]]:
@@ -1,10 +1,12 @@
-from concurrent.futures import ThreadPoolExecutor, as_completed
 from elleelleaime.core.utils.benchmarks import get_benchmark
 from elleelleaime.core.benchmarks.bug import Bug
 from elleelleaime.core.utils.jsonl import stream_jsonl, write_jsonl
 from elleelleaime.evaluate.strategies.registry import PatchEvaluationStrategyRegistry
+from elleelleaime.evaluate.scheduler import CandidateScheduler
+from elleelleaime.core.utils.java.jar_runner import set_jar_runner_enabled
 
 from pathlib import Path
+from typing import Optional
 
 import numpy as np
 import fire
@@ -13,19 +15,22 @@ import tqdm
 import logging
 import json
 import os
+import threading
 
 
 def evaluate_candidate(bug: Bug, sample: dict, strategy: str, **kwargs) -> dict:
     """
-    Evaluates the candidate patch for the given sample.
+    Evaluates the candidate patches of the given sample.
+    Equivalent candidates are evaluated once, as in entry_point.
     """
-
     evaluation_strategy = PatchEvaluationStrategyRegistry(**kwargs).get_evaluation(
         strategy
     )
-    evaluation = evaluation_strategy.evaluate(bug, sample)
-    sample["evaluation"] = evaluation
-
+    sample["evaluation"] = evaluation_strategy.evaluate(bug, sample)
+    if sample["evaluation"] is not None:
+        candidates = evaluation_strategy.extract_candidates(sample)
+        groups = evaluation_strategy.group_candidates(bug, candidates)
+        sample["num_deduplicated_candidates"] = len(candidates) - len(set(groups))
     return sample
 
 
@@ -34,12 +39,21 @@ def entry_point(
     samples_path: str,
     strategy: str,
     n_workers: int = 4,
+    use_jar_runner: bool = False,
+    test_workers: Optional[int] = None,
     **kwargs,
 ):
     """
     Evaluates the candidate patches given the samples,
     and writes the results to f"evaluation_{benchmark}_{prompt_strategy}_{model_name}.jsonl"
+
+    With use_jar_runner, the AST matcher runs in a small pool of persistent JVMs instead of
+    one container per candidate.
+
+    For RunBugRun, test_workers test cases of each candidate are run in parallel.
     """
+    set_jar_runner_enabled(use_jar_runner)
+
     # Get the benchmark, check if it exists, and initialize it
     samples_file_name = os.path.basename(samples_path)
     dir_path = os.path.dirname(samples_path)
@@ -50,26 +64,78 @@ def entry_point(
     logging.info("Reading samples...")
     samples = list(stream_jsonl(samples_path))
 
-    benchmark_obj = get_benchmark(benchmark)
+    # Only the bugs referenced by the samples are materialized
+    benchmark_kwargs = {} if test_workers is None else {"test_workers": test_workers}
+    benchmark_obj = get_benchmark(benchmark, lazy=True, **benchmark_kwargs)
     if benchmark_obj is None:
         raise ValueError(f"Unknown benchmark {benchmark}")
     benchmark_obj.initialize()
 
-    with ThreadPoolExecutor(max_workers=n_workers) as executor:
-        futures = []
-        for sample in tqdm.tqdm(samples, "Lauching candidate evaluation..."):
-            bug = benchmark_obj.get_bug(sample["identifier"])
-            if bug is None:
-                raise ValueError(f"Unknown bug {sample['identifier']}")
-            futures.append(
-                executor.submit(evaluate_candidate, bug, sample, strategy, **kwargs)
-            )
+    evaluation_strategy = PatchEvaluationStrategyRegistry(**kwargs).get_evaluation(
+        strategy
+    )
 
-        logging.info("Evaluating candidates...")
-        results = []
-        for future in tqdm.tqdm(as_completed(futures), total=len(futures)):
-            results.append(future.result())
-        samples = results
+    # Candidates are evaluated individually, so that the candidates of slow bugs are spread across workers
+    scheduler = CandidateScheduler(n_workers)
+    evaluations = {}
+    candidate_groups = {}
+    # Number of candidates left to evaluate for each sample
+    remaining = {}
+    remaining_lock = threading.Lock()
+    num_candidates = 0
+    for i, sample in enumerate(tqdm.tqdm(samples, "Lauching candidate evaluation...")):
+        bug = benchmark_obj.get_bug(sample["identifier"])
+        if bug is None:
+            raise ValueError(f"Unknown bug {sample['identifier']}")
+        if "generation" not in sample or sample["generation"] is None:
+            sample["evaluation"] = None
+            continue
+
+        candidates = evaluation_strategy.extract_candidates(sample)
+        groups = evaluation_strategy.group_candidates(bug, candidates)
+        evaluations[i] = [None] * len(candidates)
+        candidate_groups[i] = (candidates, groups)
+        remaining[i] = len(set(groups))
+        for j, candidate in enumerate(candidates):
+            # Equivalent candidates share the evaluation of the first one
+            if groups[j] == j:
+                scheduler.add(bug.get_identifier(), (i, j, bug, candidate))
+        sample["num_deduplicated_candidates"] = len(candidates) - len(set(groups))
+        num_candidates += len(candidates)
+
+    num_deduplicated = num_candidates - scheduler.pending()
+    logging.info(
+        f"Evaluating {scheduler.pending()} out of {num_candidates} candidates ({num_deduplicated} deduplicated)..."
+    )
+    pbar = tqdm.tqdm(total=scheduler.pending())
+
+    def evaluate_unit(unit):
+        i, j, bug, candidate = unit
+        evaluations[i][j] = evaluation_strategy.evaluate_candidate(
+            bug, samples[i], candidate
+        )
+        with remaining_lock:
+            remaining[i] -= 1
+            last = remaining[i] == 0
+        # The evaluations of a sample are completed together, e.g. to match the ASTs of its plausible candidates in one batch
+        if last:
+            evaluations[i] = evaluation_strategy.complete_evaluations(
+                bug, samples[i], evaluations[i]
+            )
+        pbar.update()
+
+    scheduler.run(evaluate_unit)
+    pbar.close()
+
+    # Samples are written in the same order as they were read
+    for i, evaluation in evaluations.items():
+        candidates, groups = candidate_groups[i]
+        for j, candidate in enumerate(candidates):
+            if groups[j] != j:
+                evaluation[j] = evaluation_strategy.share_evaluation(
+                    evaluation[groups[j]], candidate
+                )
+        samples[i]["evaluation"] = evaluation
 
     # Write results to jsonl file
     write_jsonl(
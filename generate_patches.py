@@ -2,27 +2,40 @@ from concurrent.futures import ThreadPoolExecutor, as_completed
 from elleelleaime.core.utils.jsonl import stream_jsonl, write_jsonl
 from elleelleaime.generate.strategies.registry import PatchGenerationStrategyRegistry
 
-from typing import List, Optional
+from typing import Callable, List, Optional
 from pathlib import Path
 import fire
 import sys
 import os
 import tqdm
 import logging
+import threading
 
+# Options that change how the candidates are generated but not the candidates themselves
+OPERATIONAL_KWARGS = (
+    PatchGenerationStrategyRegistry.OPERATIONAL_KWARGS
+    | PatchGenerationStrategyRegistry.GENERATION_CACHE_KWARGS
+)
 
-def generate_candidate(chunk: List[dict], strategy_name: str, **kwargs) -> List[dict]:
+
+def generate_candidate(
+    chunk: List[dict],
+    strategy_name: str,
+    on_sample: Optional[Callable[[int, dict], None]] = None,
+    **kwargs,
+) -> List[dict]:
     """
     Generates the candidate patch for the given sample and model.
+    on_sample(i, sample) is called as soon as the generation of chunk[i] completes.
     """
 
     generation_strategy = PatchGenerationStrategyRegistry.get_generation(
         strategy_name, **kwargs
     )
 
-    chunk_to_generate = [
-        sample
-        for sample in chunk
+    indices_to_generate = [
+        i
+        for i, sample in enumerate(chunk)
         if sample["prompt"]
         and not (
             "generation" in sample
@@ -31,12 +44,17 @@ def generate_candidate(chunk: List[dict], strategy_name: str, **kwargs) -> List[
             and not any("error" in generation for generation in sample["generation"])
         )
     ]
-    logging.info(f"Gerating patches for {len(chunk_to_generate)} samples...")
-    non_empty_prompt_chunk = [sample["prompt"] for sample in chunk_to_generate]
-    generations = generation_strategy.generate(non_empty_prompt_chunk)
-
-    for generation, sample in zip(generations, chunk_to_generate):
+    logging.info(f"Gerating patches for {len(indices_to_generate)} samples...")
+    non_empty_prompt_chunk = [chunk[i]["prompt"] for i in indices_to_generate]
+    # Generations are cached by sample, whichever worker and run generates them
+    sample_ids = [chunk[i].get("identifier") for i in indices_to_generate]
+    for j, generation in generation_strategy.generate_stream(
+        non_empty_prompt_chunk, sample_ids
+    ):
+        sample = chunk[indices_to_generate[j]]
         sample["generation"] = generation
+        if on_sample is not None:
+            on_sample(indices_to_generate[j], sample)
 
     for sample in chunk:
         if not sample["prompt"]:
@@ -45,28 +63,119 @@ def generate_candidate(chunk: List[dict], strategy_name: str, **kwargs) -> List[
     return chunk
 
 
+def get_candidates_filename(samples_path: str, strategy_name: str, **kwargs) -> str:
+    samples_file_name = os.path.basename(samples_path)
+    benchmark = samples_file_name.split("_")[1]
+    prompt_strategy = samples_file_name.split("_")[2].split(".")[0]
+
+    # FIXME: This is a hack to shorten the kwargs string
+    for key in kwargs:
+        if Path(str(kwargs[key])).exists():
+            kwargs[key] = Path(kwargs[key]).name
+
+    kwargs_str = "_".join(
+        [f"{k}={v}" for k, v in kwargs.items() if k not in OPERATIONAL_KWARGS]
+    )
+    kwargs_str = kwargs_str.replace("/", "-")
+    return (
+        f"candidates_{benchmark}_{prompt_strategy}_{strategy_name}_{kwargs_str}.jsonl"
+    )
+
+
+def load_journal(journal_path: str, samples: List[dict]) -> int:
+    """
+    Replaces the samples by their generated versions recorded in the journal.
+    Entries left incomplete by an interrupted run, or not matching the samples, are ignored.
+    Returns the number of samples restored.
+    """
+    restored = set()
+    for entry in stream_jsonl(journal_path, ignore_invalid=True):
+        index, sample = entry.get("index"), entry.get("sample")
+        if (
+            isinstance(index, int)
+            and 0 <= index < len(samples)
+            and isinstance(sample, dict)
+            and sample.get("identifier") == samples[index].get("identifier")
+        ):
+            samples[index] = sample
+            restored.add(index)
+    return len(restored)
+
+
 def entry_point(
     samples_path: str,
     strategy_name: str,
     n_workers: int = 1,
     output_dir: Optional[str] = None,
+    resume: bool = True,
     **kwargs,
 ):
     """
     Generates the candidate patches given the samples and the model,
     and writes the results to f"candidates_{benchmark}_{prompt_strategy}_{model_name}.jsonl"
+
+    API strategies send the requests of each worker concurrently, with at most
+    max_concurrency (default 16) requests in flight per worker. Their requests are paced by
+    the rpm and tpm (requests and tokens per minute) budgets, if given, shared by all workers,
+    and by the rate limits returned by the provider.
+
+    Each sample is appended to a journal next to the candidates file as soon as it is
+    generated. With resume, an interrupted run restarts from its journal, and the samples
+    already generated are not generated again. The journal is removed once the candidates
+    file, in the order of the samples, is written.
+
+    Generations are cached in generation_cache_path (default .cache/generation), keyed by
+    the strategy, its settings and the prompt, so that re-running the same generation is
+    free. Pass use_generation_cache=False to bypass the cache, or refresh_generation_cache=True
+    to generate again and replace the cached generations.
+
+    With batch_api=True, the OpenAI and Anthropic strategies submit each chunk to the batch
+    API of the provider instead, and poll it every batch_poll_interval (default 60) seconds.
+    The submitted batches are recorded in a batch journal next to the journal, so that a
+    resumed run waits for the batches of the interrupted one instead of submitting them again.
     """
-    results = []
+    samples = list(stream_jsonl(samples_path))
+
+    dir_path = output_dir or os.path.dirname(samples_path)
+    candidates_path = os.path.join(
+        dir_path, get_candidates_filename(samples_path, strategy_name, **kwargs)
+    )
+    journal_path = f"{candidates_path}.journal"
+    batch_journal_path = f"{candidates_path}.batches"
+    if resume and os.path.exists(journal_path):
+        logging.info(
+            f"Resuming from {journal_path} with {load_journal(journal_path, samples)} samples already generated"
+        )
+    else:
+        write_jsonl(journal_path, [])
+        if os.path.exists(batch_journal_path):
+            os.remove(batch_journal_path)
+    if kwargs.get("batch_api", False):
+        kwargs["batch_journal_path"] = batch_journal_path
+
+    journal_lock = threading.Lock()
+
+    def journal_sample(index: int, sample: dict):
+        with journal_lock:
+            write_jsonl(journal_path, [{"index": index, "sample": sample}], append=True)
 
     with ThreadPoolExecutor(max_workers=n_workers) as executor:
         futures = []
 
-        samples = list(stream_jsonl(samples_path))
         chunks = [samples[i::n_workers] for i in range(n_workers)]
 
-        for chunk in tqdm.tqdm(chunks, desc="Launching workers", total=len(chunks)):
+        for i, chunk in tqdm.tqdm(
+            enumerate(chunks), desc="Launching workers", total=len(chunks)
+        ):
             futures.append(
-                executor.submit(generate_candidate, chunk, strategy_name, **kwargs)
+                executor.submit(
+                    generate_candidate,
+                    chunk,
+                    strategy_name,
+                    # chunk[j] is samples[i + j * n_workers]
+                    lambda j, sample, i=i: journal_sample(i + j * n_workers, sample),
+                    **kwargs,
+                )
             )
 
         logging.info("Generating candidates...")
@@ -75,28 +184,15 @@ def entry_point(
             desc="Waiting for chunks to be processed",
             total=len(futures),
         ):
-            results.extend(future.result())
-
-    # Write results to jsonl file
-    samples_file_name = os.path.basename(samples_path)
-    dir_path = output_dir or os.path.dirname(samples_path)
-    benchmark = samples_file_name.split("_")[1]
-    prompt_strategy = samples_file_name.split("_")[2].split(".")[0]
-
-    # FIXME: This is a hack to shorten the kwargs string
-    for key in kwargs:
-        if Path(str(kwargs[key])).exists():
-            kwargs[key] = Path(kwargs[key]).name
-
-    kwargs_str = "_".join([f"{k}={v}" for k, v in kwargs.items()])
-    kwargs_str = kwargs_str.replace("/", "-")
-    write_jsonl(
-        os.path.join(
-            dir_path,
-            f"candidates_{benchmark}_{prompt_strategy}_{strategy_name}_{kwargs_str}.jsonl",
-        ),
-        results,
-    )
+            future.result()
+
+    # Write results to jsonl file, in the order of the samples
+    tmp_path = f"{candidates_path}.tmp"
+    write_jsonl(tmp_path, samples)
+    os.replace(tmp_path, candidates_path)
+    os.remove(journal_path)
+    if os.path.exists(batch_journal_path):
+        os.remove(batch_journal_path)
 
 
 def main():
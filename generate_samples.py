@@ -1,38 +1,131 @@
 from concurrent.futures import ThreadPoolExecutor, as_completed
 from elleelleaime.core.utils.benchmarks import get_benchmark
-from elleelleaime.core.utils.jsonl import write_jsonl
+from elleelleaime.core.utils.jsonl import stream_jsonl, write_jsonl
 from elleelleaime.core.benchmarks.bug import Bug
-from typing import Optional, Union
+from typing import List, Optional, Set, Union
 from elleelleaime.sample.registry import PromptStrategyRegistry
-
+from elleelleaime.sample.strategy import PromptingStrategy
+from elleelleaime.core.caching.extraction import (
+    DEFAULT_EXTRACTION_CACHE_DIR,
+    ExtractionCache,
+    get_extraction_cache,
+)
+from elleelleaime.core.utils.java.jar_runner import set_jar_runner_enabled
+from pathlib import Path
+
+import os
 import fire
 import traceback
 import sys
 import tqdm
 import logging
 
+# Options that change how the samples are generated but not the samples themselves
+OPERATIONAL_KWARGS = {"use_extraction_cache", "extraction_cache_path"}
+
 
 def generate_sample(
     bug: Bug, prompt_strategy: str, **kwargs
 ) -> dict[str, Optional[Union[str, Bug]]]:
     """
     Generates the sample for the given bug with the given prompt strategy.
+    Use generate_samples to generate several variants of the same bug.
     """
-
     prompt_strategy_obj = PromptStrategyRegistry.get_strategy(prompt_strategy, **kwargs)
     return prompt_strategy_obj.prompt(bug)
 
 
+def generate_samples(
+    bug: Bug, prompt_strategies: List[PromptingStrategy]
+) -> List[Optional[dict[str, Optional[Union[str, Bug]]]]]:
+    """
+    Generates the samples for the given bug with each of the given prompt strategies.
+    Strategies sharing an extraction cache extract the bug once.
+    A strategy failing on the bug is logged and yields None.
+    """
+    samples = []
+    for prompt_strategy_obj in prompt_strategies:
+        try:
+            samples.append(prompt_strategy_obj.prompt(bug))
+        except Exception as e:
+            logging.error(
+                f"Error while generating {prompt_strategy_obj.strategy_name} sample for bug {bug}: {traceback.format_exc()}"
+            )
+            samples.append(None)
+    return samples
+
+
+def get_samples_filename(benchmark: str, prompt_strategy: str, **kwargs) -> str:
+    kwargs_str = "_".join(
+        [
+            f"{key}_{value}"
+            for key, value in kwargs.items()
+            if key not in OPERATIONAL_KWARGS
+        ]
+    )
+    return f"samples_{benchmark}_{prompt_strategy}_{kwargs_str}.jsonl"
+
+
+def finalize_samples(filename: str, identifiers: List[str]) -> Set[str]:
+    """
+    Rewrites a samples file with one sample per bug, in the order of identifiers.
+    Lines left incomplete by an interrupted run are dropped.
+    Returns the identifiers of the samples in the file.
+    """
+    samples = {}
+    for sample in stream_jsonl(filename, ignore_invalid=True):
+        samples[sample["identifier"]] = sample
+
+    order = {identifier: i for i, identifier in enumerate(identifiers)}
+    tmp_filename = f"{filename}.tmp"
+    write_jsonl(
+        tmp_filename,
+        sorted(
+            samples.values(),
+            key=lambda sample: order.get(sample["identifier"], len(order)),
+        ),
+    )
+    os.replace(tmp_filename, filename)
+    return set(samples.keys())
+
+
 def entry_point(
     benchmark: str,
-    prompt_strategy: str,
+    prompt_strategy: Optional[str] = None,
     n_workers: int = 1,
+    strategies: Optional[List[dict]] = None,
+    resume: bool = True,
+    use_jar_runner: bool = False,
     **kwargs,
 ):
     """
     Generates the test samples for the bugs of the given benchmark with the given
     prompt strategy, and writes the results to f"samples_{dataset}_{prompt_strategy}.jsonl"
+
+    Several variants can be generated in the same pass by passing strategies instead of
+    prompt_strategy, a list of dicts of the form {"prompt_strategy": ..., **kwargs}, e.g.
+    --strategies='[{"prompt_strategy": "instruct"}, {"prompt_strategy": "infilling", "model_name": "codellama"}]'
+    Each bug is checked out and extracted once for all variants, and each variant is
+    written to its own file. The kwargs given outside strategies apply to all variants.
+
+    Samples are appended to the files as soon as they are generated. With resume, the
+    bugs that already have a sample in an existing file are skipped.
+
+    With use_jar_runner, the code extractor runs in a small pool of persistent JVMs instead
+    of one container per extraction.
     """
+    set_jar_runner_enabled(use_jar_runner)
+
+    if (prompt_strategy is None) == (strategies is None):
+        raise ValueError("Exactly one of prompt_strategy and strategies must be given")
+    if strategies is None:
+        strategies = [{"prompt_strategy": prompt_strategy}]
+
+    variants = []
+    for config in strategies:
+        config = dict(config)
+        variant_prompt_strategy = config.pop("prompt_strategy")
+        variants.append((variant_prompt_strategy, {**kwargs, **config}))
 
     # Get the benchmark, check if it exists, and initialize it
     benchmark_obj = get_benchmark(benchmark)
@@ -40,37 +133,84 @@ def entry_point(
         raise ValueError(f"Unknown benchmark {benchmark}")
     benchmark_obj.initialize()
 
+    # The variants share the extractions, in memory if the extraction cache is disabled
+    extraction_cache = (
+        get_extraction_cache(
+            Path(kwargs.get("extraction_cache_path", DEFAULT_EXTRACTION_CACHE_DIR))
+        )
+        if kwargs.get("use_extraction_cache", True)
+        else ExtractionCache(None)
+    )
+    prompt_strategies = [
+        PromptStrategyRegistry.get_strategy(
+            variant_prompt_strategy,
+            **{**variant_kwargs, "extraction_cache": extraction_cache},
+        )
+        for variant_prompt_strategy, variant_kwargs in variants
+    ]
+
+    bugs = benchmark_obj.get_bugs()
+    identifiers = [bug.get_identifier() for bug in bugs]
+
+    # Samples are appended to the files as they are generated, resuming from previous runs
+    filenames = [
+        get_samples_filename(benchmark, variant_prompt_strategy, **variant_kwargs)
+        for variant_prompt_strategy, variant_kwargs in variants
+    ]
+    completed: List[Set[str]] = []
+    for filename in filenames:
+        if resume and os.path.exists(filename):
+            completed.append(finalize_samples(filename, identifiers))
+            logging.info(
+                f"Resuming {filename} with {len(completed[-1])} samples already generated"
+            )
+        else:
+            write_jsonl(filename, [])
+            completed.append(set())
+
     # Generate the prompts in parallel
     logging.info("Building the prompts...")
-    results = []
 
     with ThreadPoolExecutor(max_workers=n_workers) as executor:
         futures = []
 
-        # Launch a thread for each bug
+        # Launch a thread for each bug with the variants it is missing
         future_to_bug = {}
-        for bug in benchmark_obj.get_bugs():
-            future = executor.submit(generate_sample, bug, prompt_strategy, **kwargs)
+        future_to_variants = {}
+        skipped = 0
+        for bug in bugs:
+            pending = [
+                k
+                for k in range(len(variants))
+                if bug.get_identifier() not in completed[k]
+            ]
+            if len(pending) == 0:
+                skipped += 1
+                continue
+            future = executor.submit(
+                generate_samples, bug, [prompt_strategies[k] for k in pending]
+            )
             future_to_bug[future] = bug
+            future_to_variants[future] = pending
             futures.append(future)
 
         # Check that all bugs are being processed
-        assert len(futures) == len(
-            benchmark_obj.get_bugs()
-        ), "Some bugs are not being processed"
+        assert len(futures) + skipped == len(bugs), "Some bugs are not being processed"
 
-        # Wait for the results
+        # Wait for the results, and write them as they arrive
         for future in tqdm.tqdm(as_completed(futures), total=len(futures)):
             try:
-                results.append(future.result())
+                for k, sample in zip(future_to_variants[future], future.result()):
+                    if sample is not None:
+                        write_jsonl(filenames[k], [sample], append=True)
             except Exception as e:
                 logging.error(
                     f"Error while generating sample for bug {future_to_bug[future]}: {traceback.format_exc()}"
                 )
 
-    # Write results to jsonl file
-    kwargs_str = "_".join([f"{key}_{value}" for key, value in kwargs.items()])
-    write_jsonl(f"samples_{benchmark}_{prompt_strategy}_{kwargs_str}.jsonl", results)
+    # Rewrite the files in the order of the bugs, so that they do not depend on the order of completion
+    for filename in filenames:
+        finalize_samples(filename, identifiers)
 
 
 def main():
@@ -1,5 +1,6 @@
 from elleelleaime.core.utils.benchmarks import get_benchmark
 from elleelleaime.core.benchmarks.bug import Bug
+from elleelleaime.core.benchmarks.defects4j.defects4j import Defects4J
 
 from pathlib import Path
 import uuid
@@ -23,6 +24,30 @@ class TestDefects4J:
         assert len(set([bug.get_identifier() for bug in bugs])) == 835
         assert all(bug.get_ground_truth().strip() != "" for bug in bugs)
 
+    def test_get_benchmark_from_snapshot(self):
+        snapshot_path = Path(
+            tempfile.gettempdir(),
+            f"elleelleaime-{getpass.getuser()}",
+            f"defects4j-snapshot-{uuid.uuid4()}.json.gz",
+        )
+        try:
+            fresh = Defects4J(snapshot_path=snapshot_path)
+            fresh.initialize()
+            assert snapshot_path.exists()
+
+            # The second initialization must not query the framework
+            cached = Defects4J(snapshot_path=snapshot_path)
+            cached.collect_bugs = None
+            cached.initialize()
+
+            assert len(cached.get_bugs()) == 835
+            for bug in fresh.get_bugs():
+                cached_bug = cached.get_bug(bug.get_identifier())
+                assert cached_bug.get_ground_truth() == bug.get_ground_truth()
+                assert cached_bug.get_failing_tests() == bug.get_failing_tests()
+        finally:
+            snapshot_path.unlink(missing_ok=True)
+
     def checkout_bug(self, bug: Bug) -> bool:
         buggy_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-buggy-{uuid.uuid4()}"
         fixed_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-fixed-{uuid.uuid4()}"
@@ -0,0 +1,119 @@
+from elleelleaime.core.benchmarks.defects4j.defects4j import (
+    Defects4J,
+    parse_trigger_tests,
+    split_trigger_causes,
+)
+
+from io import StringIO
+from pathlib import Path
+import subprocess
+import logging
+import pytest
+import time
+import pandas as pd
+
+
+def parse_trigger_tests_with_pandas(query_output: str) -> dict:
+    """
+    Reference implementation: one DataFrame scan per bug.
+    """
+    df = pd.read_csv(StringIO(query_output), sep=",", names=["bid", "tests", "errors"])
+    trigger_tests = {}
+    for bid in df["bid"].values:
+        failing_test_cases = df[df["bid"] == bid]["tests"].values[0]
+        trigger_cause = df[df["bid"] == bid]["errors"].values[0]
+        trigger_tests[int(bid)] = split_trigger_causes(
+            failing_test_cases, trigger_cause
+        )
+    return trigger_tests
+
+
+class TestQueryParser:
+    QUERY_OUTPUT = "\n".join(
+        [
+            '1,"org.A::test1","org.A::test1 --> java.lang.AssertionError: expected:<1> but was:<2>"',
+            '2,"org.A::test2","org.A::test2 --> java.lang.IllegalStateException: a, b; c"',
+            '10,"org.A::test3;org.B::test4","org.A::test3 --> junit.framework.AssertionFailedError;org.B::test4 --> java.lang.NullPointerException"',
+        ]
+    )
+
+    def test_parse_trigger_tests(self):
+        trigger_tests = parse_trigger_tests(self.QUERY_OUTPUT)
+
+        assert list(trigger_tests.keys()) == [1, 2, 10]
+        assert trigger_tests[1] == {
+            "org.A::test1": "java.lang.AssertionError: expected:<1> but was:<2>"
+        }
+        assert trigger_tests[2] == {
+            "org.A::test2": "java.lang.IllegalStateException: a, b; c"
+        }
+        assert list(trigger_tests[10].keys()) == ["org.A::test3", "org.B::test4"]
+
+    def test_parse_trigger_tests_same_as_pandas(self):
+        assert parse_trigger_tests(
+            self.QUERY_OUTPUT
+        ) == parse_trigger_tests_with_pandas(self.QUERY_OUTPUT)
+
+    def test_quoted_fields(self):
+        # Causes may hold commas and line breaks, and the output may hold blank lines
+        query_output = "\n".join(
+            [
+                '3,"org.A::test5","org.A::test5 --> java.lang.RuntimeException: line one',
+                'line two, with a comma"',
+                "",
+                '4,"org.A::test6","org.A::test6 --> java.lang.Error"',
+                "",
+            ]
+        )
+
+        trigger_tests = parse_trigger_tests(query_output)
+
+        assert trigger_tests == {
+            3: {
+                "org.A::test5": "java.lang.RuntimeException: line one\nline two, with a comma"
+            },
+            4: {"org.A::test6": "java.lang.Error"},
+        }
+        assert trigger_tests == parse_trigger_tests_with_pandas(query_output)
+
+    def test_empty_output(self):
+        assert parse_trigger_tests("") == {}
+
+    def test_split_trigger_causes(self):
+        # Causes may hold the separator of the causes
+        assert split_trigger_causes(
+            "org.A::test2", "org.A::test2 --> java.lang.Error: a; b"
+        ) == {"org.A::test2": "java.lang.Error: a; b"}
+        # Causes are stripped
+        assert split_trigger_causes("org.A::t", "org.A::t -->  java.lang.Error ") == {
+            "org.A::t": "java.lang.Error"
+        }
+
+    def test_benchmark_closure_math(self):
+        defects4j = Defects4J()
+        if not Path(defects4j.get_bin()).exists():
+            pytest.skip("requires Defects4J")
+
+        for pid in ["Closure", "Math"]:
+            run = subprocess.run(
+                f"{defects4j.get_bin()} query -p {pid} -q 'tests.trigger,tests.trigger.cause'",
+                shell=True,
+                capture_output=True,
+            )
+            query_output = run.stdout.decode("utf-8")
+            if run.returncode != 0 or not query_output.strip():
+                pytest.skip(f"requires the Defects4J query output of {pid}")
+
+            start = time.perf_counter()
+            expected = parse_trigger_tests_with_pandas(query_output)
+            pandas_time = time.perf_counter() - start
+
+            start = time.perf_counter()
+            actual = parse_trigger_tests(query_output)
+            parser_time = time.perf_counter() - start
+
+            # The timings are only reported, as wall-clock comparisons are flaky
+            logging.info(
+                f"{pid}: {len(actual)} bugs, pandas {pandas_time * 1000:.2f}ms, parser {parser_time * 1000:.2f}ms"
+            )
+            assert actual == expected
@@ -22,6 +22,22 @@ class TestHumanEvalJava:
         assert len(bugs) == 163
         assert len(set([bug.get_identifier() for bug in bugs])) == 163
 
+    def test_initialize_does_not_modify_benchmark(self):
+        humanevaljava = get_benchmark("humanevaljava")
+        assert humanevaljava is not None
+
+        correct_dir = Path(
+            humanevaljava.get_path(), "src", "main", "java", "humaneval", "correct"
+        )
+        before = {path: path.stat().st_mtime_ns for path in correct_dir.glob("*.java")}
+        humanevaljava.initialize()
+        after = {path: path.stat().st_mtime_ns for path in correct_dir.glob("*.java")}
+
+        assert before == after
+        for bug in humanevaljava.get_bugs():
+            # The package line is normalized before computing the diff
+            assert "package humaneval.correct" not in bug.get_ground_truth()
+
     def checkout_bug(self, bug: Bug) -> bool:
         buggy_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-buggy-{uuid.uuid4()}"
         fixed_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-fixed-{uuid.uuid4()}"
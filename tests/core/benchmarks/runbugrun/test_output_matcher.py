@@ -0,0 +1,123 @@
+from elleelleaime.core.benchmarks.runbugrun.output_matcher import (
+    OutputParser,
+    match,
+    FLOAT_EPS,
+    DEFAULT_FLOAT_EPS,
+)
+
+from decimal import Decimal
+from pathlib import Path
+import pandas as pd
+import random
+
+
+def match_with_parser(expected_output, actual_output, problem_id):
+    """
+    Reference implementation: parses both outputs with OutputParser before comparing them.
+    """
+    if actual_output is None:
+        return False
+
+    expected_output = expected_output.rstrip("\n")
+    actual_output = actual_output.rstrip("\n")
+    if expected_output == actual_output:
+        return True
+
+    expected_parsed = OutputParser(expected_output).parse()
+    actual_parsed = OutputParser(actual_output).parse()
+
+    if len(expected_parsed) != len(actual_parsed):
+        return False
+
+    float_eps = FLOAT_EPS.get(problem_id, DEFAULT_FLOAT_EPS)
+
+    for expected_line, actual_line in zip(expected_parsed, actual_parsed):
+        if len(expected_line) != len(actual_line):
+            return False
+
+        for expected_element, actual_element in zip(expected_line, actual_line):
+            if isinstance(expected_element, Decimal) and isinstance(
+                actual_element, Decimal
+            ):
+                if abs(actual_element - expected_element) > float_eps:
+                    return False
+            elif actual_element != expected_element:
+                return False
+
+    return True
+
+
+def perturb(output: str, rng: random.Random) -> str:
+    """
+    Returns a variant of the output that may or may not match it.
+    """
+    tokens = output.split(" ")
+    index = rng.randrange(len(tokens))
+    token = tokens[index]
+    choice = rng.randrange(8)
+    if choice == 0:
+        tokens[index] = f"{token}0"
+    elif choice == 1:
+        tokens[index] = token.replace("\n", " ")
+    elif choice == 2:
+        tokens[index] = f"{token}\n"
+    elif choice == 3:
+        tokens[index] = f"{token}.{rng.randrange(10)}"
+    elif choice == 4:
+        tokens[index] = f"-{token}"
+    elif choice == 5:
+        tokens[index] = f"{token}  "
+    elif choice == 6:
+        tokens[index] = rng.choice(["abc", "1e5", "0.00001", " ", " ", "1"])
+    return " ".join(tokens)
+
+
+class TestOutputMatcher:
+    def test_match(self):
+        assert match("1 2\n3\n", "1 2\n3", "p00000")
+        assert match("1 2\n3", "1  2 \n3", "p00000")
+        assert match("0.33333", "0.333333333", "p00000")
+        assert not match("0.3333", "0.3335", "p03001")
+        assert match("Yes", "Yes", "p00000")
+        assert not match("Yes", "No", "p00000")
+        assert not match("1", "1.0 2", "p00000")
+        assert not match("1\n2", "1", "p00000")
+        assert not match("1", None, "p00000")
+
+    def test_match_same_as_parser(self):
+        rng = random.Random(0)
+        outputs = [
+            "1 2 3",
+            "Yes\nNo\nYes",
+            "3.14159265 2.71828\n-1 0",
+            "abc 12 -0.5\n\n7",
+            "1 2 3",
+            "100000000000000000000000000000000001",
+        ]
+        for _ in range(5000):
+            expected = rng.choice(outputs)
+            actual = perturb(expected, rng)
+            problem_id = rng.choice(["p00000", "p03001", "p02705"])
+            assert match(expected, actual, problem_id) == match_with_parser(
+                expected, actual, problem_id
+            ), (expected, actual)
+
+    def test_tests_all_same_as_parser(self):
+        test_path = Path("benchmarks/run_bug_run/tests_all.jsonl").absolute()
+        test_df = pd.read_json(open(test_path), lines=True)
+        rng = random.Random(0)
+
+        cases = []
+        for problem_id, output in test_df[["problem_id", "output"]].itertuples(
+            index=False
+        ):
+            output = str(output)
+            if not output.strip():
+                continue
+            cases.append((problem_id, output, output))
+            cases.append((problem_id, output, perturb(output, rng)))
+
+        for problem_id, expected, actual in cases:
+            assert match(expected, actual, problem_id) == match_with_parser(
+                expected, actual, problem_id
+            ), (expected, actual)
@@ -1,5 +1,7 @@
 from elleelleaime.core.utils.benchmarks import get_benchmark
 from elleelleaime.core.benchmarks.bug import Bug
+from elleelleaime.core.benchmarks.runbugrun.runbugrun import write_if_changed
+from elleelleaime.core.benchmarks.runbugrun.runbugrunbug import RunBugRunBug
 
 from pathlib import Path
 import shutil
@@ -23,6 +25,44 @@ class TestRunBugRun:
         assert len(bugs)
         assert len(set([bug.get_identifier() for bug in bugs]))
 
+    def test_get_benchmark_lazy(self):
+        runbugrun = get_benchmark("runbugrun", lazy=True)
+        assert runbugrun is not None
+        runbugrun.initialize()
+
+        identifiers = runbugrun.get_bug_identifiers()
+        assert len(identifiers) > 0
+        assert len(runbugrun.bugs) == 0
+
+        # Only the requested bugs are materialized
+        bugs = [runbugrun.get_bug(identifier) for identifier in identifiers[:20]]
+        bugs = [bug for bug in bugs if bug is not None]
+        assert len(bugs) > 0
+        assert len(runbugrun.bugs) == len(bugs)
+        assert all(len(bug.get_failing_tests()) > 0 for bug in bugs)
+
+    def test_write_if_changed(self, tmp_path):
+        path = Path(tmp_path, "p00000_1.py")
+
+        assert write_if_changed(path, "print(1)\n")
+        mtime = path.stat().st_mtime_ns
+
+        # Unchanged content is not rewritten
+        assert not write_if_changed(path, "print(1)\n")
+        assert path.stat().st_mtime_ns == mtime
+
+        assert write_if_changed(path, "print(2)\n")
+        assert path.read_text() == "print(2)\n"
+
+    def test_test_cases_from_failing_tests(self):
+        failing_tests = {
+            "test_1": "Function with input:\n1 2\nexpected to output:\n3\nbut got:\n4",
+            "test_2": "Function with input:\n5\n6\nexpected to output:\n11\nfailed with error:\nValueError",
+        }
+        bug = RunBugRunBug(None, "p00000_1", "", failing_tests)
+
+        assert bug.test_cases == {"test_1": ("1 2", "3"), "test_2": ("5\n6", "11")}
+
     def checkout_bug(self, bug: Bug) -> bool:
         buggy_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-buggy-{uuid.uuid4()}"
         fixed_path = f"{tempfile.gettempdir()}/elleelleaime-{getpass.getuser()}/{bug.get_identifier()}-fixed-{uuid.uuid4()}"
@@ -0,0 +1,82 @@
+from elleelleaime.core.benchmarks.runbugrun.runner import PythonWorkerPool
+
+from pathlib import Path
+import concurrent.futures
+import pytest
+
+
+class TestPythonWorkerPool:
+    @pytest.fixture
+    def pool(self):
+        pool = PythonWorkerPool(n_workers=2)
+        yield pool
+        pool.close()
+
+    def write(self, tmp_path, code: str) -> Path:
+        path = Path(tmp_path, "p00000_1.py")
+        path.write_text(code)
+        return path
+
+    def test_execute(self, pool, tmp_path):
+        path = self.write(tmp_path, "a, b = map(int, input().split())\nprint(a + b)\n")
+
+        assert pool.execute(path, "1 2") == (0, "3")
+        assert pool.execute(path, "40 2") == (0, "42")
+
+    def test_execute_error(self, pool, tmp_path):
+        path = self.write(tmp_path, "print('ok')\nraise ValueError('boom')\n")
+
+        returncode, output = pool.execute(path, "")
+        assert returncode == 1
+        assert output.startswith("Traceback (most recent call last):")
+        assert output.endswith("ValueError: boom")
+        # Only the frames of the submission are reported
+        assert "runpy" not in output and "worker.py" not in output
+
+    def test_execute_closes_inherited_fds(self, pool, tmp_path):
+        # The submission only sees its standard streams, and the descriptor of the listing
+        path = self.write(
+            tmp_path,
+            "import os\nprint(sorted(map(int, os.listdir('/proc/self/fd'))))\n",
+        )
+
+        assert pool.execute(path, "") == (0, "[0, 1, 2, 3]")
+
+    def test_execute_exit_code(self, pool, tmp_path):
+        path = self.write(tmp_path, "import sys\nsys.exit(3)\n")
+
+        assert pool.execute(path, "") == (3, "")
+
+    def test_execute_timeout(self, pool, tmp_path):
+        path = self.write(tmp_path, "while True:\n    pass\n")
+
+        returncode, output = pool.execute(path, "")
+        assert returncode == 1
+        assert "timed out" in output
+
+    def test_execute_empty_input_does_not_hang(self, pool, tmp_path):
+        path = self.write(tmp_path, "import sys\nprint(len(sys.stdin.read()))\n")
+
+        assert pool.execute(path, "") == (0, "0")
+
+    def test_execute_shell_characters(self, pool, tmp_path):
+        path = self.write(tmp_path, "print(input())\n")
+
+        assert pool.execute(path, 'a `b` $c "d"') == (0, 'a `b` $c "d"')
+
+    def test_execute_large_input(self, pool, tmp_path):
+        path = self.write(tmp_path, "import sys\nprint(len(sys.stdin.read()))\n")
+
+        # Larger than the maximum argument length of /bin/sh
+        assert pool.execute(path, "x" * 4_000_000) == (0, "4000001")
+
+    def test_execute_concurrently(self, pool, tmp_path):
+        path = self.write(tmp_path, "print(int(input()) * 2)\n")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(lambda i: pool.execute(path, str(i)), range(50))
+            )
+
+        assert results == [(0, str(i * 2)) for i in range(50)]
+        assert len(pool.workers) <= 2
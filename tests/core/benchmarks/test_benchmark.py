@@ -0,0 +1,57 @@
+from tests.utils import FakeBenchmark, FakeBug
+
+from concurrent.futures import ThreadPoolExecutor
+import threading
+import pytest
+
+
+class TestLazyBenchmark:
+    def test_concurrent_get_bug(self):
+        benchmark = FakeBenchmark(lazy=True)
+        # Both bugs must be loading at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout=10)
+        calls = []
+
+        def load_bug(identifier):
+            calls.append(identifier)
+            barrier.wait()
+            return FakeBug(benchmark, identifier, "diff")
+
+        for identifier in ["Fake-1", "Fake-2"]:
+            benchmark.add_lazy_bug(identifier, lambda i=identifier: load_bug(i))
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            bugs = list(executor.map(benchmark.get_bug, ["Fake-1", "Fake-2"] * 4))
+
+        # Every thread gets its bug, which is loaded once
+        assert [bug.get_identifier() for bug in bugs] == ["Fake-1", "Fake-2"] * 4
+        assert sorted(calls) == ["Fake-1", "Fake-2"]
+        assert benchmark.get_bug_identifiers() == ["Fake-1", "Fake-2"]
+
+    def test_discarded_bug(self):
+        benchmark = FakeBenchmark(lazy=True)
+        benchmark.add_lazy_bug("Fake-1", lambda: None)
+
+        assert benchmark.get_bug("Fake-1") is None
+        assert benchmark.get_bug("Fake-1") is None
+        assert benchmark.get_bug_identifiers() == []
+
+    def test_failing_loader(self):
+        benchmark = FakeBenchmark(lazy=True)
+        attempts = []
+
+        def load_bug():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise RuntimeError("checkout failed")
+            return FakeBug(benchmark, "Fake-1", "diff")
+
+        benchmark.add_lazy_bug("Fake-1", load_bug)
+
+        with pytest.raises(RuntimeError):
+            benchmark.get_bug("Fake-1")
+
+        # The bug is not lost
+        assert benchmark.get_bug_identifiers() == ["Fake-1"]
+        assert benchmark.get_bug("Fake-1").get_identifier() == "Fake-1"
+        assert len(attempts) == 2
@@ -0,0 +1,127 @@
+from tests.utils import FakeBenchmark, FakeBug
+from elleelleaime.core.caching import checkout_pool
+from elleelleaime.core.caching.checkout_pool import CheckoutPool
+
+from pathlib import Path
+import concurrent.futures
+import subprocess
+import threading
+import logging
+import pytest
+
+
+def get_bug(benchmark: FakeBenchmark, identifier: str, size: int = 100) -> FakeBug:
+    source = "a" * size
+    return FakeBug(
+        benchmark,
+        identifier,
+        files={"src/A.java": source, "buggy": ""},
+        fixed_files={"src/A.java": source, "fixed": ""},
+    )
+
+
+class TestCheckoutPool:
+    @pytest.fixture
+    def pool(self, tmp_path):
+        pool = CheckoutPool(Path(tmp_path, "pool"), max_bytes=1000)
+        yield pool
+        pool.close()
+
+    def test_checkout_once_per_bug(self, pool, tmp_path):
+        bug = get_bug(FakeBenchmark(), "A-1")
+
+        for i in range(3):
+            path = Path(tmp_path, f"copy-{i}")
+            assert pool.checkout(bug, str(path))
+            assert Path(path, "src", "A.java").read_text() == "a" * 100
+            assert Path(path, "buggy").exists()
+        assert bug.checkouts == 1
+
+        pool.checkout(bug, str(Path(tmp_path, "fixed")), fixed=True)
+        assert Path(tmp_path, "fixed", "fixed").exists()
+        assert bug.checkouts == 2
+
+    def test_working_copies_are_independent(self, pool, tmp_path):
+        bug = get_bug(FakeBenchmark(), "A-1")
+
+        pool.checkout(bug, str(Path(tmp_path, "copy-1")))
+        Path(tmp_path, "copy-1", "src", "A.java").write_text("candidate")
+        Path(tmp_path, "copy-1", "build").mkdir()
+
+        pool.checkout(bug, str(Path(tmp_path, "copy-2")))
+        assert Path(tmp_path, "copy-2", "src", "A.java").read_text() == "a" * 100
+        assert not Path(tmp_path, "copy-2", "build").exists()
+
+    def test_evict_least_recently_used(self, pool, tmp_path):
+        benchmark = FakeBenchmark()
+        bugs = [get_bug(benchmark, f"A-{i}", size=400) for i in range(3)]
+
+        pool.checkout(bugs[0], str(Path(tmp_path, "copy-0")))
+        pool.checkout(bugs[1], str(Path(tmp_path, "copy-1")))
+        pool.checkout(bugs[0], str(Path(tmp_path, "copy-2")))
+        pool.checkout(bugs[2], str(Path(tmp_path, "copy-3")))
+
+        # A-1 is the least recently used template and is evicted to fit in the budget
+        assert list(pool.templates) == ["fake-A-0-buggy", "fake-A-2-buggy"]
+        assert sum(pool.templates.values()) <= pool.max_bytes
+
+        pool.checkout(bugs[1], str(Path(tmp_path, "copy-4")))
+        assert [bug.checkouts for bug in bugs] == [1, 2, 1]
+
+    def test_checkout_concurrently(self, pool, tmp_path):
+        bug = get_bug(FakeBenchmark(), "A-1")
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=8) as executor:
+            results = list(
+                executor.map(
+                    lambda i: pool.checkout(bug, str(Path(tmp_path, f"copy-{i}"))),
+                    range(16),
+                )
+            )
+
+        assert all(results)
+        assert bug.checkouts == 1
+
+    def test_copy_outside_template_lock(self, pool, tmp_path, monkeypatch):
+        bug = get_bug(FakeBenchmark(), "A-1")
+        pool.checkout(bug, str(Path(tmp_path, "copy-0")))
+
+        # Both copies must be running at the same time to pass the barrier
+        barrier = threading.Barrier(2, timeout=10)
+        run = subprocess.run
+
+        def copy(command, **kwargs):
+            barrier.wait()
+            # A template being copied is not evicted
+            pool.max_bytes = 0
+            pool.evict()
+            assert "fake-A-1-buggy" in pool.templates
+            return run(command, **kwargs)
+
+        monkeypatch.setattr(checkout_pool.subprocess, "run", copy)
+        with concurrent.futures.ThreadPoolExecutor(max_workers=2) as executor:
+            results = list(
+                executor.map(
+                    lambda i: pool.checkout(bug, str(Path(tmp_path, f"copy-{i}"))),
+                    range(1, 3),
+                )
+            )
+
+        assert all(results)
+        assert bug.checkouts == 1
+        # Once the copies are done, the template is evicted
+        assert list(pool.templates) == []
+
+    def test_reflinks_unsupported(self, tmp_path, monkeypatch, caplog):
+        monkeypatch.setattr(checkout_pool, "supports_reflinks", lambda path: False)
+        pool = CheckoutPool(Path(tmp_path, "pool"))
+        bug = get_bug(FakeBenchmark(), "A-1")
+
+        with caplog.at_level(logging.WARNING):
+            pool.checkout(bug, str(Path(tmp_path, "copy-1")))
+            pool.checkout(bug, str(Path(tmp_path, "copy-2")))
+        pool.close()
+
+        # Checkouts are deep copies, which is logged once
+        assert Path(tmp_path, "copy-2", "src", "A.java").read_text() == "a" * 100
+        assert caplog.text.count("Reflinks are not supported") == 1
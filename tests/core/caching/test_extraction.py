@@ -0,0 +1,149 @@
+from tests.utils import FakeBenchmark, FakeBug
+from elleelleaime.core.caching.extraction import ExtractionCache, ExtractionError
+
+from pathlib import Path
+import pytest
+
+
+class Extractor:
+    def __init__(self, **extractions):
+        self.extractions = extractions
+        self.calls = 0
+
+    def __call__(self) -> dict:
+        self.calls += 1
+        return self.extractions
+
+
+class TestExtractionCache:
+    def test_get_or_extract(self, tmp_path):
+        cache = ExtractionCache(Path(tmp_path, "cache"))
+        tool = Path(tmp_path, "extractor.jar")
+        tool.write_bytes(b"v1")
+        bug = FakeBug(FakeBenchmark(), "Fake-1", "diff")
+
+        extract = Extractor(single_function=("buggy", "fixed"))
+        for _ in range(3):
+            record = cache.get_or_extract(bug, [tool], ["single_function"], extract)
+            assert list(record["single_function"]) == ["buggy", "fixed"]
+        assert extract.calls == 1
+
+        # A removed function is a complete extraction
+        other_bug = FakeBug(FakeBenchmark(), "Fake-2", "diff")
+        extract = Extractor(single_function=["buggy", ""])
+        for _ in range(2):
+            cache.get_or_extract(other_bug, [tool], ["single_function"], extract)
+        assert extract.calls == 1
+
+    def test_negative_extractions(self, tmp_path):
+        cache = ExtractionCache(Path(tmp_path, "cache"))
+        tool = Path(tmp_path, "extractor.jar")
+        tool.write_bytes(b"v1")
+        bug = FakeBug(FakeBenchmark(), "Fake-1", "diff")
+        fields = ["single_function", "failing_test_cases"]
+
+        # A bug that is not single-function, and has no failing test cases, is extracted once
+        extract = Extractor(single_function=None, failing_test_cases={})
+        for _ in range(3):
+            record = cache.get_or_extract(bug, [tool], fields, extract)
+            assert record == {"single_function": None, "failing_test_cases": {}}
+        assert extract.calls == 1
+
+        # Also by a new instance reading the same directory
+        cache = ExtractionCache(Path(tmp_path, "cache"))
+        assert cache.load(bug, [tool]) == {
+            "single_function": None,
+            "failing_test_cases": {},
+        }
+
+    def test_failed_extractions(self, tmp_path):
+        cache = ExtractionCache(Path(tmp_path, "cache"))
+        tool = Path(tmp_path, "extractor.jar")
+        tool.write_bytes(b"v1")
+        bug = FakeBug(FakeBenchmark(), "Fake-1", "diff")
+        fields = ["single_function", "failing_test_cases"]
+
+        # Failed extractions raise, and are extracted again on the next call
+        calls = []
+
+        def extract():
+            calls.append(1)
+            raise ExtractionError("The extractor failed")
+
+        for _ in range(2):
+            with pytest.raises(ExtractionError):
+                cache.get_or_extract(bug, [tool], fields, extract)
+        assert len(calls) == 2
+        assert cache.load(bug, [tool]) == {}
+
+        # Until they succeed
+        extract = Extractor(single_function=["a", "b"], failing_test_cases={})
+        cache.get_or_extract(bug, [tool], fields, extract)
+        record = cache.get_or_extract(bug, [tool], fields, extract)
+        assert extract.calls == 1
+        assert record == {"single_function": ["a", "b"], "failing_test_cases": {}}
+
+    def test_shared_record(self, tmp_path):
+        cache = ExtractionCache(Path(tmp_path, "cache"))
+        tool = Path(tmp_path, "extractor.jar")
+        tool.write_bytes(b"v1")
+        bug = FakeBug(FakeBenchmark(), "Fake-1", "diff")
+
+        cache.get_or_extract(
+            bug, [tool], ["single_function"], Extractor(single_function=["a", "b"])
+        )
+
+        # A strategy needing more fields extracts them once, and keeps the others
+        extract = Extractor(single_function=["a", "b"], failing_test_cases={"T::t": ""})
+        fields = ["single_function", "failing_test_cases"]
+        cache.get_or_extract(bug, [tool], fields, extract)
+        record = cache.get_or_extract(bug, [tool], fields, extract)
+        assert extract.calls == 1
+        assert record == {
+            "single_function": ["a", "b"],
+            "failing_test_cases": {"T::t": ""},
+        }
+
+        # So does a new instance reading the same directory
+        record = ExtractionCache(Path(tmp_path, "cache")).load(bug, [tool])
+        assert record["failing_test_cases"] == {"T::t": ""}
+
+    def test_invalidation(self, tmp_path):
+        cache = ExtractionCache(Path(tmp_path, "cache"))
+        tool = Path(tmp_path, "extractor.jar")
+        tool.write_bytes(b"v1")
+        bug = FakeBug(FakeBenchmark(), "Fake-1", "diff")
+        extract = Extractor(single_function=["a", "b"])
+
+        cache.get_or_extract(bug, [tool], ["single_function"], extract)
+        assert extract.calls == 1
+
+        # A new version of the tool
+        tool.write_bytes(b"v2-with-another-size")
+        cache.get_or_extract(bug, [tool], ["single_function"], extract)
+        assert extract.calls == 2
+
+        # A new ground truth
+        changed_bug = FakeBug(FakeBenchmark(), "Fake-1", "another diff")
+        cache.get_or_extract(changed_bug, [tool], ["single_function"], extract)
+        assert extract.calls == 3
+
+        # An unreadable record
+        record_id = cache.get_record_id(bug, [tool])
+        cache.get_record_path(record_id).write_text("{")
+        cache = ExtractionCache(Path(tmp_path, "cache"))
+        assert cache.load(bug, [tool]) == {}
+        cache.get_or_extract(bug, [tool], ["single_function"], extract)
+        assert extract.calls == 4
+        assert cache.load(bug, [tool]) == {"single_function": ["a", "b"]}
+
+    def test_in_memory(self, tmp_path):
+        cache = ExtractionCache(None)
+        bug = FakeBug(FakeBenchmark(), "Fake-1", "diff")
+        extract = Extractor(single_function=("a", "b"))
+
+        for _ in range(2):
+            record = cache.get_or_extract(bug, [], ["single_function"], extract)
+            assert record == {"single_function": ["a", "b"]}
+        assert extract.calls == 1
+        assert cache.get_record_path(cache.get_record_id(bug, [])) is None
@@ -0,0 +1,63 @@
+from elleelleaime.core.caching.generation import GenerationCache
+
+from pathlib import Path
+import gzip
+import json
+
+
+class TestGenerationCache:
+    def test_save_and_load(self, tmp_path):
+        cache = GenerationCache(Path(tmp_path, "cache"))
+        settings = {"strategy": "openai-chatcompletion", "model_name": "m"}
+        key = cache.get_key(settings, "prompt")
+        generation = [{"choices": [{"message": {"content": "fix " * 100}}]}]
+
+        assert cache.load(key) is None
+        assert cache.save(key, generation)
+        assert cache.load(key) == generation
+        # Entries are compressed
+        entry_path = cache.get_entry_path(key)
+        assert json.loads(gzip.decompress(entry_path.read_bytes())) == generation
+        assert entry_path.stat().st_size < len(json.dumps(generation))
+        # A new instance reading the same directory finds it
+        assert GenerationCache(Path(tmp_path, "cache")).load(key) == generation
+
+    def test_keys(self, tmp_path):
+        cache = GenerationCache(Path(tmp_path, "cache"))
+        settings = {"strategy": "openai-chatcompletion", "temperature": 0.0, "n": 1}
+
+        key = cache.get_key(settings, "prompt")
+        assert key == cache.get_key(dict(reversed(settings.items())), "prompt")
+        assert key != cache.get_key(settings, "other prompt")
+        assert key != cache.get_key({**settings, "temperature": 1.0}, "prompt")
+        assert key != cache.get_key({**settings, "n": 10}, "prompt")
+        assert key != cache.get_key({**settings, "model_name": "m"}, "prompt")
+
+        # Identical prompts of a chunk are numbered
+        keys = cache.get_keys(settings, ["prompt", "other prompt", "prompt"])
+        assert keys[0] == key
+        assert keys[2] == cache.get_key(settings, "prompt", 1)
+        assert len(set(keys)) == 3
+
+        # Unless they are identified, whatever the chunk they are in
+        keys = cache.get_keys(settings, ["prompt", "prompt"], ["b1", "b2"])
+        assert keys == cache.get_keys(settings, ["prompt"] * 3, ["b0", "b1", "b2"])[1:]
+        assert len(set(keys)) == 2
+
+    def test_incomplete_generations(self, tmp_path):
+        cache = GenerationCache(Path(tmp_path, "cache"))
+
+        for i, generation in enumerate(
+            [None, [None], [{"error": "rate limited"}], {"error": "rate limited"}]
+        ):
+            key = cache.get_key({}, "prompt", i)
+            assert not cache.save(key, generation)
+            assert cache.load(key) is None
+
+    def test_unreadable_entry(self, tmp_path):
+        cache = GenerationCache(Path(tmp_path, "cache"))
+        key = cache.get_key({}, "prompt")
+        cache.save(key, ["generation"])
+
+        cache.get_entry_path(key).write_bytes(b"not gzip")
+        assert cache.load(key) is None
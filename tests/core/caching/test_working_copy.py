@@ -0,0 +1,73 @@
+from tests.utils import FakeBenchmark, FakeBug
+from elleelleaime.core.caching.working_copy import WorkingCopyPool
+
+from pathlib import Path
+import pytest
+import os
+
+
+def get_bug(benchmark: FakeBenchmark, identifier: str) -> FakeBug:
+    return FakeBug(
+        benchmark,
+        identifier,
+        files={"src/A.java": "class A {}", "src/B.java": "class B {}"},
+    )
+
+
+class TestWorkingCopyPool:
+    @pytest.fixture
+    def pool(self, tmp_path):
+        pool = WorkingCopyPool(tmp_path)
+        yield pool
+        pool.close()
+
+    def evaluate(self, pool: WorkingCopyPool, bug: FakeBug, candidate: str):
+        working_copy = pool.acquire(bug, lambda path: bug.checkout(path))
+        file_path = str(Path(working_copy.path, "src", "A.java"))
+        working_copy.save(file_path)
+        Path(file_path).write_text(candidate)
+        # Simulate build outputs
+        Path(working_copy.path, "build", "classes").mkdir(parents=True)
+        Path(working_copy.path, "build", "classes", "A.class").write_text(candidate)
+        Path(working_copy.path, "src", "A.class").write_text(candidate)
+        return working_copy
+
+    def test_reuse_working_copy(self, pool):
+        bug = get_bug(FakeBenchmark(), "A-1")
+
+        working_copy = self.evaluate(pool, bug, "class A { int a; }")
+        mtime = working_copy.manifest[os.path.join("src", "A.java")][1]
+        pool.release(working_copy)
+
+        # The patched file is restored and build outputs are removed
+        assert Path(working_copy.path, "src", "A.java").read_text() == "class A {}"
+        assert Path(working_copy.path, "src", "A.java").stat().st_mtime_ns == mtime
+        assert not Path(working_copy.path, "build").exists()
+        assert not Path(working_copy.path, "src", "A.class").exists()
+
+        assert self.evaluate(pool, bug, "class A { int b; }") is working_copy
+        pool.release(working_copy)
+        assert bug.checkouts == 1
+
+    def test_discard_modified_working_copy(self, pool):
+        bug = get_bug(FakeBenchmark(), "A-1")
+
+        working_copy = self.evaluate(pool, bug, "class A { int a; }")
+        Path(working_copy.path, "src", "B.java").write_text("class B { int b; }")
+        pool.release(working_copy)
+
+        assert not working_copy.path.exists()
+        assert self.evaluate(pool, bug, "class A {}") is not working_copy
+        assert bug.checkouts == 2
+
+    def test_discard_previous_bug(self, pool):
+        benchmark = FakeBenchmark()
+        bug_1, bug_2 = get_bug(benchmark, "A-1"), get_bug(benchmark, "A-2")
+
+        working_copy_1 = self.evaluate(pool, bug_1, "class A {}")
+        pool.release(working_copy_1)
+        working_copy_2 = self.evaluate(pool, bug_2, "class A {}")
+        pool.release(working_copy_2)
+
+        assert not working_copy_1.path.exists()
+        assert working_copy_2.path.exists()
@@ -6,14 +6,20 @@ from unidiff import PatchSet
 from pathlib import Path
 from uuid import uuid4
 
+from elleelleaime.core.benchmarks.benchmark import Benchmark
+from elleelleaime.core.benchmarks.bug import RichBug
+from elleelleaime.core.utils.java import jar_runner
+from elleelleaime.core.utils.java.jar_runner import JarRunner
 from elleelleaime.core.utils.java.java import (
+    EXTRACTOR_JAR,
     extract_failing_test_cases,
     get_source_filename,
     get_target_filename,
 )
 from elleelleaime.core.utils.benchmarks import get_benchmark
-from elleelleaime.core.benchmarks.benchmark import Benchmark
-from elleelleaime.core.benchmarks.bug import RichBug
+from tests.core.utils.java.test_jar_runner import FAKE_EXTRACTOR
+
+import sys
 
 
 class TestExtractFailingTestCases:
@@ -51,3 +57,73 @@ class TestExtractFailingTestCases:
         bug = TestExtractFailingTestCases.DEFECTS4J.get_bug("Closure-70")
         assert bug is not None
         self.assert_extract_failing_test_cases(bug)
+
+
+class FakeBenchmark(Benchmark):
+    def __init__(self):
+        super().__init__("fake", Path("."))
+
+    def initialize(self) -> None:
+        pass
+
+
+class FakeRichBug(RichBug):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.checkouts = 0
+        self.src_test_dir_calls = 0
+
+    def checkout(self, path: str, fixed: bool = False) -> bool:
+        self.checkouts += 1
+        for class_name in ["a.ATest", "b.ATest", "a.BTest"]:
+            test_file = Path(path, "src/test", f"{class_name.replace('.', '/')}.java")
+            test_file.parent.mkdir(parents=True, exist_ok=True)
+            test_file.write_text(f"class {class_name}\n")
+        return True
+
+    def compile(self, path: str):
+        pass
+
+    def test(self, path: str):
+        pass
+
+    def get_src_test_dir(self, path: str) -> str:
+        self.src_test_dir_calls += 1
+        return "src/test"
+
+
+class TestExtractFailingTestCasesSingleCheckout:
+    def test_single_checkout(self, monkeypatch):
+        runner = JarRunner([sys.executable, "-c", FAKE_EXTRACTOR], timeout=10)
+        monkeypatch.setitem(jar_runner._runners, EXTRACTOR_JAR, runner)
+        monkeypatch.setattr(jar_runner, "_enabled", True)
+
+        bug = FakeRichBug(
+            FakeBenchmark(),
+            "Fake-1",
+            "",
+            {"a.ATest::test1": "", "a.ATest::test2": "", "a.BTest::test1": ""},
+        )
+        try:
+            failing_test_cases = extract_failing_test_cases(bug)
+        finally:
+            runner.close()
+
+        assert bug.checkouts == 1
+        assert bug.src_test_dir_calls == 1
+        assert failing_test_cases == {
+            "a.ATest::test1": "class a.ATest\n--method test1",
+            "a.ATest::test2": "class a.ATest\n--method test2",
+            "a.BTest::test1": "class a.BTest\n--method test1",
+        }
+
+    def test_ambiguous_test_class(self, monkeypatch):
+        runner = JarRunner([sys.executable, "-c", FAKE_EXTRACTOR], timeout=10)
+        monkeypatch.setitem(jar_runner._runners, EXTRACTOR_JAR, runner)
+        monkeypatch.setattr(jar_runner, "_enabled", True)
+
+        bug = FakeRichBug(FakeBenchmark(), "Fake-1", "", {"ATest::test1": ""})
+        try:
+            assert extract_failing_test_cases(bug) == {}
+        finally:
+            runner.close()
@@ -0,0 +1,319 @@
+from elleelleaime.core.benchmarks.benchmark import Benchmark
+from elleelleaime.core.utils.java import jar_runner, java
+from elleelleaime.core.utils.java.jar_runner import (
+    JAR_RUNNER_SOURCE,
+    JARS_PATH,
+    JarRunner,
+    JarRunnerPool,
+    run_jar_batch,
+)
+from elleelleaime.core.utils.java.java import (
+    EXTRACTION_TOOLS,
+    EXTRACTOR_JAR,
+    run_extractor,
+)
+from elleelleaime.evaluate.strategies.strategy import AST_MATCHER_JAR
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import sys
+import time
+import shutil
+import pytest
+import subprocess
+
+# Speaks the protocol of JarRunner.java, with a main that echoes its arguments,
+# and fails on "fail", after which "runs" prints the number of runs of the process
+FAKE_RUNNER = """
+import sys, time
+runs = 0
+for line in sys.stdin.buffer:
+    runs += 1
+    args = line.rstrip(b"\\n").split(b"\\t")
+    if args[0] == b"sleep":
+        time.sleep(float(args[1]))
+    if args[0] == b"die":
+        sys.exit(1)
+    output = b"%d" % runs if args[0] == b"runs" else b" ".join(args)
+    status = 1 if args[0] == b"fail" else 0
+    sys.stdout.buffer.write(b"%d %d\\n" % (status, len(output)) + output)
+    sys.stdout.buffer.flush()
+"""
+
+
+def get_fake_runner(timeout: float = 10) -> JarRunner:
+    return JarRunner([sys.executable, "-c", FAKE_RUNNER], timeout=timeout)
+
+
+class TestJarRunner:
+    def test_run(self):
+        runner = get_fake_runner()
+        try:
+            assert runner.run(["a", "b"]) == (0, "a b")
+            assert runner.run(["ü"]) == (0, "ü")
+            # The same process serves every request
+            process = runner.process
+            assert runner.run(["c"]) == (0, "c")
+            assert runner.process is process
+        finally:
+            runner.close()
+        assert runner.process is None
+
+    def test_run_batch(self):
+        runner = get_fake_runner()
+        try:
+            # Large enough to fill the pipes if requests were not written concurrently
+            batch = [[str(i), "x" * 1000] for i in range(1000)]
+            results = runner.run_batch(batch)
+            assert results == [(0, f"{i} {'x' * 1000}") for i in range(1000)]
+            assert runner.run_batch([]) == []
+        finally:
+            runner.close()
+
+    def test_unsupported_arguments(self):
+        runner = get_fake_runner()
+        try:
+            assert runner.run(["a\tb"]) is None
+            assert runner.run(["a\nb"]) is None
+            assert runner.run(["a"]) == (0, "a")
+        finally:
+            runner.close()
+
+    def test_timeout(self):
+        runner = get_fake_runner(timeout=0.5)
+        try:
+            assert runner.run(["a"]) == (0, "a")
+            start = time.monotonic()
+            assert runner.run(["sleep", "10"]) is None
+            assert time.monotonic() - start < 5
+            # The runner is restarted on the next request
+            assert runner.run(["b"]) == (0, "b")
+        finally:
+            runner.close()
+
+    def test_process_dies(self):
+        runner = get_fake_runner()
+        try:
+            assert runner.run(["a"]) == (0, "a")
+            assert runner.run_batch([["b"], ["die"], ["c"]]) is None
+            assert runner.run(["d"]) == (0, "d")
+        finally:
+            runner.close()
+
+    def test_recycle_after_failure(self):
+        runner = get_fake_runner()
+        try:
+            assert runner.run_batch([["a"], ["runs"]]) == [(0, "a"), (0, "2")]
+            # The runs after a failed one are run again in a new process
+            assert runner.run_batch([["fail"], ["runs"], ["fail"], ["b"]]) == [
+                (1, "fail"),
+                (0, "1"),
+                (1, "fail"),
+                (0, "b"),
+            ]
+            assert runner.run(["runs"]) == (0, "2")
+            assert runner.run(["fail"]) == (1, "fail")
+            assert runner.process is None
+            assert runner.run(["runs"]) == (0, "1")
+        finally:
+            runner.close()
+
+    def test_unavailable(self):
+        runner = JarRunner(["/nonexistent/java", "JarRunner.java"])
+        assert runner.run(["a"]) is None
+        assert not runner.available
+
+        # A runner that never answers is not retried
+        runner = get_fake_runner()
+        try:
+            assert runner.run(["die"]) is None
+            assert not runner.available
+            assert runner.run(["a"]) is None
+            assert runner.process is None
+        finally:
+            runner.close()
+
+
+class TestJarRunnerPool:
+    def test_concurrent_callers(self):
+        pool = JarRunnerPool([sys.executable, "-c", FAKE_RUNNER], size=4, timeout=10)
+        try:
+            start = time.monotonic()
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = list(
+                    executor.map(lambda i: pool.run(["sleep", "0.5", str(i)]), range(4))
+                )
+            assert results == [(0, f"sleep 0.5 {i}") for i in range(4)]
+            # The callers are served by different processes rather than waiting on one
+            assert time.monotonic() - start < 1.5
+            assert len(pool.runners) == 4
+
+            # Idle runners are reused
+            assert pool.run(["a"]) == (0, "a")
+            assert len(pool.runners) == 4
+        finally:
+            pool.close()
+        assert all(runner.process is None for runner in pool.runners)
+
+    def test_unavailable(self):
+        pool = JarRunnerPool(["/nonexistent/java", "JarRunner.java"], size=2)
+        assert pool.run(["a"]) is None
+        assert not pool.available
+        assert pool.run(["a"]) is None
+        assert len(pool.runners) == 1
+
+    def test_disabled_by_default(self, monkeypatch):
+        pool = JarRunnerPool([sys.executable, "-c", FAKE_RUNNER], timeout=10)
+        monkeypatch.setitem(jar_runner._runners, "fake.jar", pool)
+        try:
+            assert run_jar_batch("fake.jar", [["a"]]) is None
+            assert pool.runners == []
+
+            monkeypatch.setattr(jar_runner, "_enabled", True)
+            assert run_jar_batch("fake.jar", [["a"]]) == [(0, "a")]
+        finally:
+            pool.close()
+
+
+@pytest.mark.skipif(
+    shutil.which("java") is None or not Path(JARS_PATH, AST_MATCHER_JAR).exists(),
+    reason="requires java and the AST matcher jar",
+)
+class TestRealJar:
+    def test_same_output_as_java_jar(self, tmp_path):
+        sources = {
+            "A.java": "class A { int f() { return 1; } }\n",
+            "B.java": "class A {\n  int f() {\n    return 1;\n  }\n}\n",
+            "C.java": "class A { int f() { return 2; } }\n",
+            "D.java": "class A { int f() { return 1 + 1; } }\n",
+        }
+        for name, source in sources.items():
+            Path(tmp_path, name).write_text(source)
+        pairs = [
+            [str(Path(tmp_path, a)), str(Path(tmp_path, b))]
+            for a in sources
+            for b in sources
+        ]
+
+        runner = JarRunner(
+            ["java", str(JAR_RUNNER_SOURCE), str(Path(JARS_PATH, AST_MATCHER_JAR))]
+        )
+        try:
+            # Twice, so that the state the jar keeps between runs is exercised
+            results = runner.run_batch(pairs + pairs)
+        finally:
+            runner.close()
+
+        assert results is not None
+        for args, (status, output) in zip(pairs + pairs, results):
+            run = subprocess.run(
+                ["java", "-jar", str(Path(JARS_PATH, AST_MATCHER_JAR)), *args],
+                capture_output=True,
+            )
+            assert status == run.returncode
+            assert output == run.stdout.decode("utf-8")
+        assert "no AST change" in results[1][1]
+        assert "no AST change" not in results[2][1]
+
+
+# Speaks the protocol of JarRunner.java, with a main that prints the file given with -i
+FAKE_EXTRACTOR = """
+import os, sys
+for line in sys.stdin.buffer:
+    args = line.rstrip(b"\\n").decode("utf-8").split("\\t")
+    path = args[args.index("-i") + 1]
+    if not os.path.exists(path):
+        sys.stdout.buffer.write(b"1 0\\n")
+    else:
+        with open(path, "rb") as f:
+            output = f.read() + " ".join(args[2:]).encode("utf-8")
+        sys.stdout.buffer.write(b"0 %d\\n" % len(output) + output)
+    sys.stdout.buffer.flush()
+"""
+
+
+class TestRunExtractor:
+    def test_run_extractor(self, tmp_path, monkeypatch):
+        runner = JarRunner([sys.executable, "-c", FAKE_EXTRACTOR], timeout=10)
+        monkeypatch.setitem(jar_runner._runners, EXTRACTOR_JAR, runner)
+        monkeypatch.setattr(jar_runner, "_enabled", True)
+
+        Path(tmp_path, "A.java").write_text("class A {}\n")
+        try:
+            assert run_extractor(
+                [
+                    (Path(tmp_path, "A.java"), ["--lines", "1", "--lines", "2"]),
+                    (Path(tmp_path, "B.java"), ["--method", "test"]),
+                    (Path(tmp_path, "A.java"), ["--method", "test"]),
+                ]
+            ) == ["class A {}\n--lines 1 --lines 2", None, "class A {}\n--method test"]
+        finally:
+            runner.close()
+
+    def test_fallback(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(
+            java,
+            "run_jar_batch",
+            lambda jar, batch: [(0, "class A {}"), (1, ""), (0, "")],
+        )
+        runs = []
+
+        def fake_run(command, **kwargs):
+            runs.append(command)
+            return subprocess.CompletedProcess(command, 0, b"class B {}", b"")
+
+        monkeypatch.setattr(java.subprocess, "run", fake_run)
+
+        # Failed and empty outputs of the persistent JVMs are run again in a container
+        assert run_extractor(
+            [
+                (Path(tmp_path, "A.java"), []),
+                (Path(tmp_path, "B.java"), []),
+                (Path(tmp_path, "C.java"), []),
+            ]
+        ) == ["class A {}", "class B {}", "class B {}"]
+        assert len(runs) == 2
+        assert all(EXTRACTOR_JAR in command for command in runs)
+
+    def test_extraction_tools(self, tmp_path, monkeypatch):
+        # The jar is found at the root of the repository, wherever the scripts are run from
+        monkeypatch.chdir(tmp_path)
+        assert EXTRACTION_TOOLS[0] == Path(JARS_PATH, EXTRACTOR_JAR)
+        assert EXTRACTION_TOOLS[0].is_absolute()
+        assert Path(JARS_PATH, "generate_samples.py").exists()
+
+
+@pytest.mark.skipif(
+    shutil.which("java") is None or not Path(JARS_PATH, EXTRACTOR_JAR).exists(),
+    reason="requires java and the extractor jar",
+)
+class TestRealExtractor:
+    def test_same_output_as_java_jar(self, tmp_path):
+        source = Path(tmp_path, "A.java")
+        source.write_text(
+            "class A {\n  int f() {\n    return 1;\n  }\n\n  void g() {\n    f();\n  }\n}\n"
+        )
+        requests = [
+            ["-i", str(source), "--lines", "3"],
+            ["-i", str(source), "--lines", "7"],
+            ["-i", str(source), "--method", "g"],
+            ["-i", str(Path(tmp_path, "Missing.java")), "--method", "g"],
+        ]
+
+        runner = JarRunner(
+            ["java", str(JAR_RUNNER_SOURCE), str(Path(JARS_PATH, EXTRACTOR_JAR))]
+        )
+        try:
+            # Twice, so that the state the jar keeps between runs is exercised
+            results = runner.run_batch(requests + requests)
+        finally:
+            runner.close()
+
+        assert results is not None
+        for args, (status, output) in zip(requests + requests, results):
+            run = subprocess.run(
+                ["java", "-jar", str(Path(JARS_PATH, EXTRACTOR_JAR)), *args],
+                capture_output=True,
+            )
+            assert status == run.returncode
+            assert output == run.stdout.decode("utf-8")
@@ -0,0 +1,70 @@
+from elleelleaime.core.utils.diff import unified_diff
+from unidiff import PatchSet
+
+import subprocess
+import tempfile
+from pathlib import Path
+
+
+def diff_with_gnu_diff(source: str, target: str) -> str:
+    """
+    Reference implementation: `diff --unified` on two temporary files.
+    """
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        Path(tmp_dir, "a").write_text(source, encoding="utf-8", newline="")
+        Path(tmp_dir, "b").write_text(target, encoding="utf-8", newline="")
+        run = subprocess.run(
+            f"cd {tmp_dir} && diff --unified a b",
+            shell=True,
+            capture_output=True,
+        )
+        # Drop the timestamps from the header, which unified_diff does not emit
+        return "".join(
+            line.split("\t")[0] + "\n" if line.startswith(("--- ", "+++ ")) else line
+            for line in run.stdout.decode("utf-8").splitlines(keepends=True)
+        )
+
+
+class TestUnifiedDiff:
+    SOURCE = "".join(f"line {i}\n" for i in range(20))
+
+    def test_simple_change(self):
+        target = self.SOURCE.replace("line 10\n", "line ten\n")
+        diff = unified_diff(self.SOURCE, target, "a", "b")
+
+        assert diff == diff_with_gnu_diff(self.SOURCE, target)
+        patch = PatchSet(diff)
+        assert len(patch) == 1
+        assert patch[0].source_file == "a"
+        assert patch[0].target_file == "b"
+        assert patch[0].added == 1
+        assert patch[0].removed == 1
+
+    def test_multiple_hunks(self):
+        target = self.SOURCE.replace("line 1\n", "").replace("line 18\n", "new\n")
+        diff = unified_diff(self.SOURCE, target, "a", "b")
+
+        assert diff == diff_with_gnu_diff(self.SOURCE, target)
+        assert len(PatchSet(diff)[0]) == 2
+
+    def test_no_newline_at_end_of_file(self):
+        source = "int a = 1;\nint b = 2;"
+        target = "int a = 1;\nint b = 3;"
+        diff = unified_diff(source, target, "a", "b")
+
+        assert diff == diff_with_gnu_diff(source, target)
+        assert "\\ No newline at end of file" in diff
+        assert len(PatchSet(diff)) == 1
+
+    def test_other_line_breaks(self):
+        # Only "\n" ends a line, as for diff and Java source files
+        source = "a\r\nb\rc\x0cd\u2028e\x85f\nint g = 1;\n"
+        target = "a\r\nb\rc\x0cd\u2028e\x85f\nint g = 2;\n"
+        diff = unified_diff(source, target, "a", "b")
+
+        assert diff == diff_with_gnu_diff(source, target)
+        assert PatchSet(diff)[0].removed == 1
+
+    def test_identical_files(self):
+        assert unified_diff(self.SOURCE, self.SOURCE, "a", "b") == ""
+        assert len(PatchSet(unified_diff(self.SOURCE, self.SOURCE, "a", "b"))) == 0
@@ -0,0 +1,160 @@
+from tests.utils import FakeBenchmark, FakeBug
+from elleelleaime.evaluate.strategies.text.replace import ReplaceEvaluationStrategy
+from elleelleaime.evaluate.strategies import strategy as strategy_module
+
+
+def get_ground_truth(path: str) -> str:
+    return f"--- {path}\n+++ {path}\n@@ -1 +1 @@\n-a\n+b\n"
+
+
+class TestDeduplicateCandidates:
+    STRATEGY = ReplaceEvaluationStrategy(use_cache=False)
+
+    def test_group_java_candidates(self):
+        bug = FakeBug(FakeBenchmark(), "A-1", get_ground_truth("src/A.java"))
+        candidates = [
+            "int f() {\n    return 1;\n}",
+            "int f() {\n  // one\n  return 1;\n\n}",
+            "int f() {\n    return 2;\n}",
+            None,
+            None,
+            "int f() { return 1; }",
+        ]
+
+        assert self.STRATEGY.group_candidates(bug, candidates) == [0, 0, 2, 3, 4, 5]
+
+    def test_group_python_candidates(self):
+        bug = FakeBug(
+            FakeBenchmark(), "p00000_1", get_ground_truth("buggy/p00000_1.py")
+        )
+        candidates = [
+            "if a:\n    b()\nc()",
+            "if a:\n    b()\n    c()",
+            "print(a // 2)",
+            "print(a)",
+            "if a:\n    b()\nc()",
+        ]
+
+        # Indentation and `//` are significant in Python, only identical candidates are grouped
+        assert self.STRATEGY.group_candidates(bug, candidates) == [0, 1, 2, 3, 0]
+
+    def test_group_disabled(self):
+        strategy = ReplaceEvaluationStrategy(
+            use_cache=False, deduplicate_candidates=False
+        )
+        bug = FakeBug(FakeBenchmark(), "A-1", get_ground_truth("src/A.java"))
+
+        assert strategy.group_candidates(bug, ["a", "a"]) == [0, 1]
+
+    def test_share_evaluation(self):
+        evaluation = {
+            "generation": "return 1;",
+            "exact_match": False,
+            "ast_match": False,
+            "compile": True,
+            "test": True,
+        }
+
+        shared = self.STRATEGY.share_evaluation(evaluation, "return 1; // one")
+        assert shared == {**evaluation, "generation": "return 1; // one"}
+        assert evaluation["generation"] == "return 1;"
+        assert self.STRATEGY.share_evaluation(None, "return 1;") is None
+
+    def test_evaluate(self, monkeypatch, caplog):
+        strategy = ReplaceEvaluationStrategy(use_cache=False)
+        evaluated = []
+
+        def evaluate_candidate(bug, sample, candidate):
+            evaluated.append(candidate)
+            return {"generation": candidate, "test": True}
+
+        monkeypatch.setattr(strategy, "evaluate_candidate", evaluate_candidate)
+        bug = FakeBug(FakeBenchmark(), "A-1", get_ground_truth("src/A.java"))
+        sample = {"generation": ["return 1;", "return 1; // one", "return 2;"]}
+
+        with caplog.at_level("INFO"):
+            evaluation = strategy.evaluate(bug, sample)
+
+        assert evaluated == ["return 1;", "return 2;"]
+        assert [e["generation"] for e in evaluation] == sample["generation"]
+        # The sample is left as is
+        assert "num_deduplicated_candidates" not in sample
+        assert "Evaluating 2 out of 3 candidates of A-1 (1 deduplicated)" in caplog.text
+
+
+class FakeRun:
+    def __init__(self, stdout: str):
+        self.stdout = stdout.encode("utf-8")
+        self.returncode = 0
+
+
+class TestAstMatchBatch:
+    STRATEGY = ReplaceEvaluationStrategy(use_cache=False)
+
+    def test_fallback(self, monkeypatch):
+        monkeypatch.setattr(
+            strategy_module,
+            "run_jar_batch",
+            lambda jar, batch: [(0, "no AST change"), (1, ""), (0, "")],
+        )
+        runs = []
+
+        def fake_run(command, **kwargs):
+            runs.append(command)
+            return FakeRun("no AST change" if len(runs) == 1 else "Update Literal")
+
+        monkeypatch.setattr(strategy_module.subprocess, "run", fake_run)
+
+        # Failed and empty outputs of the persistent JVMs are run again in a container
+        assert self.STRATEGY.ast_match_batch([("a", "a"), ("b", "b"), ("c", "d")]) == [
+            True,
+            True,
+            False,
+        ]
+        assert len(runs) == 2
+
+    def test_complete_evaluations(self, monkeypatch):
+        strategy = ReplaceEvaluationStrategy(use_cache=False)
+        batches = []
+
+        def ast_match_batch(pairs):
+            batches.append(pairs)
+            return [True, False]
+
+        monkeypatch.setattr(strategy, "ast_match_batch", ast_match_batch)
+        bug = FakeBug(FakeBenchmark(), "A-1", get_ground_truth("src/A.java"))
+        evaluations = [
+            {"generation": "a", "test": True, "ast_match": False},
+            None,
+            {"generation": "b", "test": False, "ast_match": False},
+            {"generation": "c", "test": True, "ast_match": False},
+        ]
+        for evaluation in [evaluations[0], evaluations[3]]:
+            strategy.pending_ast_matches[id(evaluation)] = (
+                evaluation,
+                "fixed",
+                evaluation["generation"],
+            )
+
+        # The plausible candidates of the sample are matched in one batch
+        assert strategy.complete_evaluations(bug, {}, evaluations) is evaluations
+        assert batches == [[("fixed", "a"), ("fixed", "c")]]
+        assert [e["ast_match"] for e in evaluations if e is not None] == [
+            True,
+            False,
+            False,
+        ]
+        assert strategy.pending_ast_matches == {}
+
+        strategy.complete_evaluations(bug, {}, evaluations)
+        assert len(batches) == 1
+
+    def test_disabled(self, monkeypatch):
+        monkeypatch.setattr(strategy_module, "run_jar_batch", lambda jar, batch: None)
+        monkeypatch.setattr(
+            strategy_module.subprocess,
+            "run",
+            lambda command, **kwargs: FakeRun("no AST change"),
+        )
+
+        assert self.STRATEGY.ast_match_batch([("a", "a"), ("b", "b")]) == [True, True]
@@ -0,0 +1,60 @@
+from tests.utils import FakeBenchmark, FakeBug
+from elleelleaime.core.utils.jsonl import write_jsonl
+from elleelleaime.evaluate.strategies.text.replace import ReplaceEvaluationStrategy
+
+from pathlib import Path
+import evaluate_patches
+import pytest
+
+
+class TestEvaluateCandidate:
+    def test_num_deduplicated_candidates(self, monkeypatch):
+        monkeypatch.setattr(
+            ReplaceEvaluationStrategy,
+            "evaluate_candidate",
+            lambda self, bug, sample, candidate: {"generation": candidate},
+        )
+        bug = FakeBug(
+            FakeBenchmark(),
+            "A-1",
+            "--- src/A.java\n+++ src/A.java\n@@ -1 +1 @@\n-a\n+b\n",
+        )
+        sample = {"generation": ["return 1;", "return 1; // one", "return 2;"]}
+
+        sample = evaluate_patches.evaluate_candidate(
+            bug, sample, "replace", use_cache=False
+        )
+        assert [e["generation"] for e in sample["evaluation"]] == sample["generation"]
+        assert sample["num_deduplicated_candidates"] == 1
+
+        sample = evaluate_patches.evaluate_candidate(
+            bug, {"generation": None}, "replace", use_cache=False
+        )
+        assert sample["evaluation"] is None
+        assert "num_deduplicated_candidates" not in sample
+
+
+class TestEntryPoint:
+    @pytest.mark.parametrize(
+        "kwargs, benchmark_kwargs",
+        [
+            ({}, {"lazy": True}),
+            ({"test_workers": 4}, {"lazy": True, "test_workers": 4}),
+        ],
+    )
+    def test_benchmark_kwargs(self, tmp_path, monkeypatch, kwargs, benchmark_kwargs):
+        samples_path = Path(tmp_path, "samples_runbugrun_instruct_model.jsonl")
+        write_jsonl(str(samples_path), [])
+        calls = []
+
+        def get_benchmark(benchmark, **kwargs):
+            calls.append((benchmark, kwargs))
+            return None
+
+        monkeypatch.setattr(evaluate_patches, "get_benchmark", get_benchmark)
+
+        with pytest.raises(ValueError):
+            evaluate_patches.entry_point(
+                "runbugrun", str(samples_path), "replace", **kwargs
+            )
+        assert calls == [("runbugrun", benchmark_kwargs)]
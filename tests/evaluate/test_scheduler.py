@@ -0,0 +1,63 @@
+from elleelleaime.evaluate.scheduler import CandidateScheduler
+
+import threading
+import pytest
+import time
+
+
+class TestCandidateScheduler:
+    def test_affinity(self):
+        scheduler = CandidateScheduler(n_workers=2)
+        for key, n in [("A", 3), ("B", 2), ("C", 1)]:
+            for i in range(n):
+                scheduler.add(key, (key, i))
+
+        # Each worker starts on a different bug and keeps to it
+        assert scheduler.next(0) == ("A", 0)
+        assert scheduler.next(1) == ("B", 0)
+        assert scheduler.next(1) == ("B", 1)
+        # Worker 1 moves to the bug nobody is working on
+        assert scheduler.next(1) == ("C", 0)
+        # Then steals from the bug with the most pending units
+        assert scheduler.next(1) == ("A", 1)
+        assert scheduler.next(0) == ("A", 2)
+        assert scheduler.next(0) is None
+        assert scheduler.next(1) is None
+
+    def test_run(self):
+        scheduler = CandidateScheduler(n_workers=4)
+        for key in range(3):
+            for i in range(10):
+                scheduler.add(str(key), (key, i))
+
+        results = []
+        workers = {}
+        lock = threading.Lock()
+
+        def evaluate(unit):
+            time.sleep(0.001)
+            with lock:
+                results.append(unit)
+                workers.setdefault(unit[0], set()).add(threading.get_ident())
+
+        scheduler.run(evaluate)
+
+        assert sorted(results) == [(key, i) for key in range(3) for i in range(10)]
+        # The tail of the bugs is shared by the idle workers
+        assert any(len(threads) > 1 for threads in workers.values())
+
+    def test_run_error(self):
+        scheduler = CandidateScheduler(n_workers=2)
+        for i in range(100):
+            scheduler.add("A", i)
+
+        evaluated = []
+
+        def evaluate(unit):
+            if unit == 5:
+                raise ValueError("boom")
+            evaluated.append(unit)
+
+        with pytest.raises(ValueError):
+            scheduler.run(evaluate)
+        assert len(evaluated) < 99
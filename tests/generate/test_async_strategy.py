@@ -0,0 +1,287 @@
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.core.caching.generation import GenerationCache
+from elleelleaime.generate.strategies.models.openai.openai import (
+    OpenAIChatCompletionModels,
+)
+from elleelleaime.generate.strategies.models.google.google import GoogleModels
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+
+import json
+import time
+import google.generativeai as genai
+import asyncio
+import threading
+import pytest
+
+
+class FakeAsyncModels(AsyncPatchGenerationStrategy):
+    def __init__(self, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.n_samples = kwargs.get("n_samples", 1)
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.prompts: list = []
+
+    async def _request(self, prompt: str) -> str:
+        async with self.request_slot():
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+            await asyncio.sleep(0.01)
+            self.in_flight -= 1
+        if prompt == "fail":
+            raise ValueError(prompt)
+        return prompt.upper()
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        self.prompts.append(prompt)
+        return list(
+            await asyncio.gather(
+                *(self._request(prompt) for _ in range(self.n_samples))
+            )
+        )
+
+
+class ReversedAsyncModels(FakeAsyncModels):
+    """
+    Completes the prompts of the chunk in reverse order, each one after the next one.
+    """
+
+    def __init__(self, chunk: list, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.chunk = chunk
+
+    async def _aopen(self) -> None:
+        self.completed = {prompt: asyncio.Event() for prompt in self.chunk}
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        index = self.chunk.index(prompt)
+        if index + 1 < len(self.chunk):
+            await self.completed[self.chunk[index + 1]].wait()
+        generation = await super()._agenerate_prompt(prompt)
+        self.completed[prompt].set()
+        return generation
+
+
+class TestAsyncPatchGenerationStrategy:
+    def test_generate(self):
+        strategy = FakeAsyncModels(n_samples=3, max_concurrency=4)
+        chunk = ["a" * i for i in range(1, 20)]
+
+        generations = strategy.generate(chunk)
+
+        assert generations == [[prompt.upper()] * 3 for prompt in chunk]
+        assert strategy.max_in_flight == 4
+        # The strategy can generate again, with a new event loop
+        assert strategy.generate(["b"]) == [["B"] * 3]
+
+    def test_generate_stream(self):
+        chunk = ["a" * i for i in range(1, 20)]
+        strategy = ReversedAsyncModels(chunk, max_concurrency=100)
+
+        generations = list(strategy.generate_stream(chunk))
+
+        # Generations are yielded as they complete
+        assert generations == [
+            (index, [prompt.upper()])
+            for index, prompt in reversed(list(enumerate(chunk)))
+        ]
+
+    def test_errors(self):
+        strategy = FakeAsyncModels()
+        with pytest.raises(ValueError):
+            strategy.generate(["a", "fail"])
+        with pytest.raises(ValueError):
+            list(strategy.generate_stream(["a", "fail"]))
+
+    def test_generation_cache(self, tmp_path):
+        strategy = FakeAsyncModels()
+        strategy.set_generation_cache(
+            GenerationCache(tmp_path), {"strategy": "fake", "n_samples": 1}
+        )
+
+        assert strategy.generate(["a", "bb", "a"]) == [["A"], ["BB"], ["A"]]
+        # Identical prompts are generated independently
+        assert sorted(strategy.prompts) == ["a", "a", "bb"]
+
+        # Cached generations are not generated again
+        strategy.prompts = []
+        assert strategy.generate(["a", "a", "ccc"]) == [["A"], ["A"], ["CCC"]]
+        assert list(strategy.generate_stream(["bb"])) == [(0, ["BB"])]
+        assert strategy.prompts == ["ccc"]
+
+        # Failed generations are not cached
+        with pytest.raises(ValueError):
+            strategy.generate(["fail"])
+        strategy.prompts = []
+        with pytest.raises(ValueError):
+            strategy.generate(["fail"])
+        assert strategy.prompts == ["fail"]
+
+        # Unless refreshed
+        strategy.set_generation_cache(
+            GenerationCache(tmp_path),
+            {"strategy": "fake", "n_samples": 1},
+            refresh=True,
+        )
+        strategy.prompts = []
+        strategy.generate(["a", "bb"])
+        assert sorted(strategy.prompts) == ["a", "bb"]
+
+
+class ChatCompletionsHandler(BaseHTTPRequestHandler):
+    in_flight = 0
+    max_in_flight = 0
+    requests = 0
+    headers_to_send: dict = {}
+    lock = threading.Lock()
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        with self.lock:
+            ChatCompletionsHandler.in_flight += 1
+            ChatCompletionsHandler.max_in_flight = max(
+                ChatCompletionsHandler.max_in_flight, ChatCompletionsHandler.in_flight
+            )
+        time.sleep(0.05)
+        with self.lock:
+            ChatCompletionsHandler.in_flight -= 1
+            ChatCompletionsHandler.requests += 1
+
+        content = request["messages"][0]["content"][::-1]
+        body = json.dumps(
+            {
+                "id": "chatcmpl-0",
+                "object": "chat.completion",
+                "created": 0,
+                "model": request["model"],
+                "choices": [
+                    {
+                        "index": i,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }
+                    for i in range(request.get("n", 1))
+                ],
+            }
+        ).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in self.headers_to_send.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def openai_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), ChatCompletionsHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    ChatCompletionsHandler.max_in_flight = 0
+    ChatCompletionsHandler.requests = 0
+    ChatCompletionsHandler.headers_to_send = {}
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}/v1"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class TestOpenAIChatCompletionModels:
+    def test_concurrent_requests(self, openai_server):
+        strategy = OpenAIChatCompletionModels(
+            "test-model",
+            base_url=openai_server,
+            batching=False,
+            n_samples=2,
+            max_concurrency=8,
+        )
+        chunk = [f"prompt {i}" for i in range(10)]
+
+        generations = strategy.generate(chunk)
+
+        assert len(generations) == len(chunk)
+        for prompt, generation in zip(chunk, generations):
+            assert len(generation) == 2
+            assert all(
+                completion["choices"][0]["message"]["content"] == prompt[::-1]
+                for completion in generation
+            )
+        assert 1 < ChatCompletionsHandler.max_in_flight <= 8
+
+    def test_batching(self, openai_server):
+        strategy = OpenAIChatCompletionModels(
+            "test-model", base_url=openai_server, n_samples=3
+        )
+
+        generations = strategy.generate(["abc"])
+
+        assert len(generations[0]["choices"]) == 3
+
+    def test_rate_limit_headers(self, openai_server):
+        # The server allows 120 requests per minute, and none is left in this minute
+        ChatCompletionsHandler.headers_to_send = {
+            "x-ratelimit-limit-requests": "120",
+            "x-ratelimit-remaining-requests": "0",
+        }
+        strategy = OpenAIChatCompletionModels(
+            "rate-limited-model", base_url=openai_server, max_concurrency=8
+        )
+
+        start = time.monotonic()
+        strategy.generate(["a"])
+        strategy.generate(["b", "c"])
+
+        # The requests after the first wait for the budget to refill, at 2 per second
+        assert time.monotonic() - start > 0.9
+        assert ChatCompletionsHandler.requests == 3
+        assert strategy.rate_limiter.requests.capacity == 120
+
+
+class FakeCompletion:
+    def __init__(self, client):
+        self.client = client
+
+    def to_dict(self) -> dict:
+        return {"client": self.client}
+
+
+class TestGoogleModels:
+    def test_client_per_event_loop(self, monkeypatch):
+        async def generate_content_async(model, prompt, **kwargs):
+            return FakeCompletion(model._async_client)
+
+        monkeypatch.setenv("GOOGLE_API_KEY", "test")
+        monkeypatch.setattr(
+            genai.GenerativeModel, "generate_content_async", generate_content_async
+        )
+        strategies = [GoogleModels("test-model", n_samples=2) for _ in range(2)]
+
+        # The strategies of the worker threads generate on their own event loops
+        generations = []
+        threads = [
+            threading.Thread(
+                target=lambda s=strategy: generations.extend(s.generate(["a"]))
+            )
+            for strategy in strategies
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        clients = [generation[0]["client"] for generation in generations]
+        assert all(
+            generation[1]["client"] is generation[0]["client"]
+            for generation in generations
+        )
+        assert clients[0] is not clients[1]
+        assert {id(client) for client in clients} == {
+            id(strategy.client) for strategy in strategies
+        }
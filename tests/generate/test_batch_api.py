@@ -0,0 +1,355 @@
+from elleelleaime.generate.strategies.models.openai.openai import (
+    OpenAIChatCompletionModels,
+)
+from elleelleaime.generate.strategies.models.anthropic.anthropic import (
+    AnthropicModels,
+)
+from email.parser import BytesParser
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import json
+import threading
+import pytest
+
+
+def chat_completion(body: dict) -> dict:
+    content = body["messages"][0]["content"]
+    return {
+        "id": "chatcmpl-0",
+        "object": "chat.completion",
+        "created": 0,
+        "model": body["model"],
+        "choices": [
+            {
+                "index": i,
+                "message": {"role": "assistant", "content": content[::-1]},
+                "finish_reason": "stop",
+            }
+            for i in range(body.get("n", 1))
+        ],
+    }
+
+
+def message(params: dict) -> dict:
+    return {
+        "id": "msg_0",
+        "type": "message",
+        "role": "assistant",
+        "model": params["model"],
+        "content": [{"type": "text", "text": params["messages"][0]["content"][::-1]}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 1, "output_tokens": 1},
+    }
+
+
+class BatchHandler(BaseHTTPRequestHandler):
+    """
+    Stub of the batch APIs of OpenAI and Anthropic, which fails the requests of prompts
+    containing "fail" and returns the results in reverse order.
+    """
+
+    files: dict = {}
+    batches: dict = {}
+    polls = 0
+    created = 0
+
+    def send_json(self, body: dict):
+        self.send_bytes(json.dumps(body).encode(), "application/json")
+
+    def send_bytes(self, body: bytes, content_type: str):
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        return self.rfile.read(int(self.headers["Content-Length"]))
+
+    def do_POST(self):
+        body = self.read_body()
+        if self.path == "/v1/files":
+            form = BytesParser().parsebytes(
+                f"Content-Type: {self.headers['Content-Type']}\r\n\r\n".encode() + body
+            )
+            (content,) = [
+                part.get_payload(decode=True)
+                for part in form.get_payload()
+                if part.get_param("name", header="content-disposition") == "file"
+            ]
+            file_id = f"file-{len(self.files)}"
+            BatchHandler.files[file_id] = content
+            self.send_json(
+                {
+                    "id": file_id,
+                    "object": "file",
+                    "bytes": len(content),
+                    "created_at": 0,
+                    "filename": "batch.jsonl",
+                    "purpose": "batch",
+                    "status": "processed",
+                }
+            )
+        elif self.path == "/v1/batches":
+            request = json.loads(body)
+            BatchHandler.batches["batch-0"] = request
+            BatchHandler.created += 1
+            self.send_json(self.openai_batch("validating"))
+        elif self.path == "/v1/messages/batches":
+            BatchHandler.batches["msgbatch_0"] = json.loads(body)
+            BatchHandler.created += 1
+            self.send_json(self.anthropic_batch("in_progress"))
+        else:
+            self.send_error(404)
+
+    def do_GET(self):
+        if self.path == "/v1/batches/batch-0":
+            BatchHandler.polls += 1
+            if BatchHandler.polls < 2:
+                self.send_json(self.openai_batch("in_progress"))
+                return
+            outputs, errors = [], []
+            lines = self.files[self.batches["batch-0"]["input_file_id"]].splitlines()
+            for line in reversed(lines):
+                request = json.loads(line)
+                if "fail" in request["body"]["messages"][0]["content"]:
+                    errors.append(
+                        {
+                            "custom_id": request["custom_id"],
+                            "response": {"status_code": 400, "body": {"error": {}}},
+                            "error": None,
+                        }
+                    )
+                else:
+                    outputs.append(
+                        {
+                            "custom_id": request["custom_id"],
+                            "response": {
+                                "status_code": 200,
+                                "body": chat_completion(request["body"]),
+                            },
+                            "error": None,
+                        }
+                    )
+            BatchHandler.files["file-output"] = "".join(
+                json.dumps(output) + "\n" for output in outputs
+            ).encode()
+            BatchHandler.files["file-errors"] = "".join(
+                json.dumps(error) + "\n" for error in errors
+            ).encode()
+            self.send_json(
+                self.openai_batch(
+                    "completed",
+                    output_file_id="file-output",
+                    error_file_id="file-errors",
+                )
+            )
+        elif self.path.startswith("/v1/files/") and self.path.endswith("/content"):
+            self.send_bytes(
+                self.files[self.path.split("/")[3]], "application/octet-stream"
+            )
+        elif self.path == "/v1/messages/batches/msgbatch_0":
+            BatchHandler.polls += 1
+            if BatchHandler.polls < 2:
+                self.send_json(self.anthropic_batch("in_progress"))
+            else:
+                self.send_json(
+                    self.anthropic_batch(
+                        "ended",
+                        results_url=f"http://{self.headers['Host']}/v1/messages/batches/msgbatch_0/results",
+                    )
+                )
+        elif self.path == "/v1/messages/batches/msgbatch_0/results":
+            results = []
+            for request in reversed(self.batches["msgbatch_0"]["requests"]):
+                if "fail" in request["params"]["messages"][0]["content"]:
+                    result = {
+                        "type": "errored",
+                        "error": {
+                            "type": "error",
+                            "error": {"type": "api_error", "message": "failed"},
+                        },
+                    }
+                else:
+                    result = {
+                        "type": "succeeded",
+                        "message": message(request["params"]),
+                    }
+                results.append({"custom_id": request["custom_id"], "result": result})
+            self.send_bytes(
+                "".join(json.dumps(result) + "\n" for result in results).encode(),
+                "application/binary",
+            )
+        else:
+            self.send_error(404)
+
+    def openai_batch(self, status: str, **kwargs) -> dict:
+        return {
+            "id": "batch-0",
+            "object": "batch",
+            "endpoint": "/v1/chat/completions",
+            "input_file_id": self.batches["batch-0"]["input_file_id"],
+            "completion_window": "24h",
+            "status": status,
+            "created_at": 0,
+            **kwargs,
+        }
+
+    def anthropic_batch(self, processing_status: str, **kwargs) -> dict:
+        return {
+            "id": "msgbatch_0",
+            "type": "message_batch",
+            "processing_status": processing_status,
+            "request_counts": {
+                "processing": 0,
+                "succeeded": 0,
+                "errored": 0,
+                "canceled": 0,
+                "expired": 0,
+            },
+            "created_at": "2024-01-01T00:00:00Z",
+            "expires_at": "2024-01-02T00:00:00Z",
+            **kwargs,
+        }
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def batch_server(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BatchHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setenv("OPENAI_API_KEY", "test")
+    monkeypatch.setenv("ANTHROPIC_API_KEY", "test")
+    BatchHandler.files = {}
+    BatchHandler.batches = {}
+    BatchHandler.polls = 0
+    BatchHandler.created = 0
+    try:
+        yield f"http://127.0.0.1:{server.server_address[1]}"
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+class TestOpenAIBatchAPI:
+    def test_batching(self, batch_server):
+        strategy = OpenAIChatCompletionModels(
+            "test-model",
+            base_url=f"{batch_server}/v1",
+            n_samples=2,
+            batch_api=True,
+            batch_poll_interval=0.01,
+        )
+
+        generations = strategy.generate(["abc", "fail", "def"])
+
+        # The generations are the same as the ones of the chat completions endpoint
+        assert generations[0] == chat_completion(
+            {
+                "model": "test-model",
+                "messages": [{"role": "user", "content": "abc"}],
+                "n": 2,
+            }
+        )
+        assert generations[1] is None
+        assert generations[2]["choices"][1]["message"]["content"] == "fed"
+        assert BatchHandler.polls == 2
+        assert BatchHandler.batches["batch-0"]["endpoint"] == "/v1/chat/completions"
+
+    def test_no_batching(self, batch_server):
+        strategy = OpenAIChatCompletionModels(
+            "test-model",
+            base_url=f"{batch_server}/v1",
+            n_samples=3,
+            batching=False,
+            batch_api=True,
+            batch_poll_interval=0.01,
+        )
+
+        generations = list(strategy.generate_stream(["abc", "fail"]))
+
+        assert [index for index, _ in generations] == [0, 1]
+        assert len(generations[0][1]) == 3
+        assert all(
+            completion["choices"][0]["message"]["content"] == "cba"
+            for completion in generations[0][1]
+        )
+        assert generations[1][1] == [None, None, None]
+
+    def test_reattach(self, batch_server, tmp_path, monkeypatch):
+        kwargs = dict(
+            base_url=f"{batch_server}/v1",
+            batch_api=True,
+            batch_poll_interval=0.01,
+            batch_journal_path=str(tmp_path / "candidates.jsonl.batches"),
+        )
+        wait_for_batch = OpenAIChatCompletionModels._wait_for_batch
+
+        def interrupt(self, client, batch_id):
+            raise KeyboardInterrupt()
+
+        # The run is interrupted while waiting for its batch
+        monkeypatch.setattr(OpenAIChatCompletionModels, "_wait_for_batch", interrupt)
+        with pytest.raises(KeyboardInterrupt):
+            OpenAIChatCompletionModels("test-model", **kwargs).generate_stream(
+                ["abc", "fail", "def"], ["b0", "b1", "b2"]
+            ).__next__()
+        assert BatchHandler.created == 1
+
+        # The next run waits for it, and only submits the requests that failed there
+        monkeypatch.setattr(
+            OpenAIChatCompletionModels, "_wait_for_batch", wait_for_batch
+        )
+        generations = list(
+            OpenAIChatCompletionModels("test-model", **kwargs).generate_stream(
+                ["def", "fail"], ["b2", "b1"]
+            )
+        )
+
+        assert generations[0][1]["choices"][0]["message"]["content"] == "fed"
+        assert generations[1][1] is None
+        assert BatchHandler.created == 2
+        lines = BatchHandler.files[BatchHandler.batches["batch-0"]["input_file_id"]]
+        assert [
+            json.loads(line)["body"]["messages"][0]["content"]
+            for line in lines.splitlines()
+        ] == ["fail"]
+
+        # Other samples of the same prompt are not taken from its batches
+        OpenAIChatCompletionModels("test-model", **kwargs).generate(["abc"], ["b3"])
+        assert BatchHandler.created == 3
+
+
+class TestAnthropicBatchAPI:
+    def test_batch(self, batch_server):
+        strategy = AnthropicModels(
+            "test-model",
+            100,
+            base_url=batch_server,
+            n_samples=2,
+            batch_api=True,
+            batch_poll_interval=0.01,
+        )
+
+        generations = strategy.generate(["abc", "fail", "def"])
+
+        assert len(generations) == 3
+        assert generations[0][0]["content"][0]["text"] == "cba"
+        assert generations[0][1]["usage"]["output_tokens"] == 1
+        assert generations[1] == [None, None]
+        assert generations[2][1]["content"][0]["text"] == "fed"
+        (request,) = [
+            request
+            for request in BatchHandler.batches["msgbatch_0"]["requests"]
+            if request["custom_id"] == "2-1"
+        ]
+        assert request["params"] == {
+            "model": "test-model",
+            "max_tokens": 100,
+            "messages": [{"role": "user", "content": "def"}],
+            "temperature": 0.0,
+        }
@@ -0,0 +1,225 @@
+from elleelleaime.generate.strategies.strategy import AsyncPatchGenerationStrategy
+from elleelleaime.core.utils.jsonl import stream_jsonl, write_jsonl
+from elleelleaime.generate.strategies.registry import PatchGenerationStrategyRegistry
+
+from pathlib import Path
+from typing import Any
+import generate_patches
+import pytest
+
+
+class FakeModels(AsyncPatchGenerationStrategy):
+    generated: list = []
+    fail_on = None
+
+    def __init__(self, model_name: str, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.model_name = model_name
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        if prompt == FakeModels.fail_on:
+            raise ConnectionError(prompt)
+        FakeModels.generated.append(prompt)
+        return [{"choices": [{"message": {"content": prompt.upper()}}]}]
+
+
+class NumberingModels(FakeModels):
+    """
+    Generates a different generation for each request, like a model sampling at temperature > 0.
+    """
+
+    async def _agenerate_prompt(self, prompt: str) -> Any:
+        FakeModels.generated.append(prompt)
+        content = f"{prompt} #{len(FakeModels.generated)}"
+        return [{"choices": [{"message": {"content": content}}]}]
+
+
+def write_samples(path: Path):
+    write_jsonl(
+        str(path),
+        [
+            {"identifier": f"b{i}", "prompt": f"prompt {i}" if i != 3 else None}
+            for i in range(10)
+        ],
+    )
+
+
+@pytest.fixture
+def fake_models(monkeypatch):
+    monkeypatch.setattr(
+        generate_patches.PatchGenerationStrategyRegistry,
+        "get_generation",
+        lambda name, **kwargs: FakeModels(**kwargs),
+    )
+    FakeModels.generated = []
+    FakeModels.fail_on = None
+
+
+class TestGeneratePatches:
+    def test_generate(self, tmp_path, fake_models):
+        samples_path = Path(tmp_path, "samples_fake_instruct_.jsonl")
+        write_samples(samples_path)
+
+        generate_patches.entry_point(
+            str(samples_path), "fake", n_workers=3, model_name="m", max_concurrency=2
+        )
+
+        candidates_path = Path(
+            tmp_path, "candidates_fake_instruct_fake_model_name=m.jsonl"
+        )
+        candidates = list(stream_jsonl(str(candidates_path)))
+        # The candidates are in the order of the samples, and the journal is removed
+        assert [c["identifier"] for c in candidates] == [f"b{i}" for i in range(10)]
+        assert candidates[3]["generation"] is None
+        assert (
+            candidates[0]["generation"][0]["choices"][0]["message"]["content"]
+            == "PROMPT 0"
+        )
+        assert len(FakeModels.generated) == 9
+        assert list(tmp_path.glob("*.journal")) == []
+
+    def test_resume(self, tmp_path, fake_models):
+        samples_path = Path(tmp_path, "samples_fake_instruct_.jsonl")
+        write_samples(samples_path)
+        reference_dir = Path(tmp_path, "reference")
+        reference_dir.mkdir()
+        generate_patches.entry_point(
+            str(samples_path), "fake", output_dir=str(reference_dir), model_name="m"
+        )
+
+        # The run is interrupted by the failure of one of the chunks
+        FakeModels.generated = []
+        FakeModels.fail_on = "prompt 7"
+        with pytest.raises(ConnectionError):
+            generate_patches.entry_point(
+                str(samples_path), "fake", n_workers=2, model_name="m"
+            )
+        candidates_path = Path(
+            tmp_path, "candidates_fake_instruct_fake_model_name=m.jsonl"
+        )
+        assert not candidates_path.exists()
+        journal_path = Path(f"{candidates_path}.journal")
+        # The other chunk is journaled, and an incomplete entry is left behind
+        assert len(list(stream_jsonl(str(journal_path)))) >= 4
+        with open(journal_path, "a") as f:
+            f.write('{"index": 1, "sample": {"ident')
+
+        # The next run only generates the missing samples
+        FakeModels.generated = []
+        FakeModels.fail_on = None
+        generate_patches.entry_point(
+            str(samples_path), "fake", n_workers=2, model_name="m"
+        )
+
+        assert "prompt 0" not in FakeModels.generated
+        assert "prompt 7" in FakeModels.generated
+        assert (
+            candidates_path.read_text()
+            == Path(reference_dir, candidates_path.name).read_text()
+        )
+        assert not journal_path.exists()
+
+    def test_no_resume(self, tmp_path, fake_models):
+        samples_path = Path(tmp_path, "samples_fake_instruct_.jsonl")
+        write_samples(samples_path)
+        candidates_path = Path(
+            tmp_path, "candidates_fake_instruct_fake_model_name=m.jsonl"
+        )
+        write_jsonl(
+            f"{candidates_path}.journal",
+            [
+                {
+                    "index": 0,
+                    "sample": {
+                        "identifier": "b0",
+                        "prompt": "prompt 0",
+                        "generation": [{}],
+                    },
+                }
+            ],
+        )
+
+        generate_patches.entry_point(
+            str(samples_path), "fake", resume=False, model_name="m"
+        )
+
+        assert len(FakeModels.generated) == 9
+
+
+class TestGeneratePatchesCache:
+    def test_generation_cache(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setitem(
+            PatchGenerationStrategyRegistry._PatchGenerationStrategyRegistry__MODELS,
+            "fake",
+            (FakeModels, ("model_name",)),
+        )
+        FakeModels.generated = []
+        FakeModels.fail_on = None
+        samples_path = Path(tmp_path, "samples_fake_instruct_.jsonl")
+        write_samples(samples_path)
+        candidates_path = Path(
+            tmp_path, "candidates_fake_instruct_fake_model_name=m.jsonl"
+        )
+
+        generate_patches.entry_point(str(samples_path), "fake", model_name="m")
+        candidates = candidates_path.read_text()
+        assert len(FakeModels.generated) == 9
+        assert (
+            len(list(Path(tmp_path, ".cache", "generation").glob("*/*.json.gz"))) == 9
+        )
+
+        # The same generation is served from the cache
+        FakeModels.generated = []
+        generate_patches.entry_point(
+            str(samples_path), "fake", model_name="m", max_concurrency=4
+        )
+        assert FakeModels.generated == []
+        assert candidates_path.read_text() == candidates
+
+        # Other settings are generated
+        generate_patches.entry_point(
+            str(samples_path), "fake", model_name="m", temperature=1.0
+        )
+        assert len(FakeModels.generated) == 9
+
+        # Unless the cache is bypassed or refreshed
+        for cache_kwargs in [
+            {"use_generation_cache": False},
+            {"refresh_generation_cache": True},
+        ]:
+            FakeModels.generated = []
+            generate_patches.entry_point(
+                str(samples_path), "fake", model_name="m", **cache_kwargs
+            )
+            assert len(FakeModels.generated) == 9
+            assert candidates_path.read_text() == candidates
+
+    def test_identical_prompts(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setitem(
+            PatchGenerationStrategyRegistry._PatchGenerationStrategyRegistry__MODELS,
+            "fake",
+            (NumberingModels, ("model_name",)),
+        )
+        FakeModels.generated = []
+        samples_path = Path(tmp_path, "samples_fake_instruct_.jsonl")
+        write_jsonl(
+            str(samples_path),
+            [{"identifier": f"b{i}", "prompt": "prompt"} for i in range(6)],
+        )
+        candidates_path = Path(
+            tmp_path, "candidates_fake_instruct_fake_model_name=m.jsonl"
+        )
+
+        generate_patches.entry_point(str(samples_path), "fake", model_name="m")
+        candidates = candidates_path.read_text()
+        assert len(FakeModels.generated) == 6
+
+        # The samples are served from the cache whichever worker generates them
+        FakeModels.generated = []
+        generate_patches.entry_point(
+            str(samples_path), "fake", n_workers=4, model_name="m"
+        )
+        assert FakeModels.generated == []
+        assert candidates_path.read_text() == candidates
@@ -0,0 +1,143 @@
+from elleelleaime.generate.strategies import rate_limit
+from elleelleaime.generate.strategies.rate_limit import (
+    RateLimiter,
+    estimate_tokens,
+    get_rate_limiter,
+)
+from email.utils import formatdate
+from types import SimpleNamespace
+
+import asyncio
+import pytest
+
+
+class FakeClock:
+    """
+    Clock of the rate limiter, which only advances when the waiting requests sleep.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    async def sleep(self, seconds: float) -> None:
+        # Like a real clock, time passes even for waits lost in rounding
+        deadline = self.now + max(seconds, 1e-6)
+        # Let the other requests start waiting at the same time
+        await asyncio.sleep(0)
+        self.now = max(self.now, deadline)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limit, "time", clock)
+    monkeypatch.setattr(rate_limit, "asyncio", SimpleNamespace(sleep=clock.sleep))
+    return clock
+
+
+class FakeResponse:
+    def __init__(self, headers):
+        self.headers = headers
+
+    def __bool__(self):
+        # Like the responses of requests, which are falsy for errors
+        return False
+
+
+class FakeError(Exception):
+    def __init__(self, headers):
+        self.response = FakeResponse(headers)
+
+
+class TestRateLimiter:
+    def test_estimate_tokens(self):
+        assert estimate_tokens("") == 0
+        assert estimate_tokens("a" * 9) == 3
+        assert estimate_tokens([{"content": "a" * 8}, {"content": "b" * 4}]) == 3
+
+    def test_unlimited(self):
+        rate_limiter = RateLimiter()
+        for _ in range(1000):
+            assert rate_limiter.reserve(10**6) == 0
+
+    def test_requests_per_minute(self, clock):
+        # 10 requests per second, after a burst of a full minute of requests
+        rate_limiter = RateLimiter(rpm=600)
+
+        async def acquire_all():
+            await asyncio.gather(*(rate_limiter.acquire() for _ in range(605)))
+
+        asyncio.run(acquire_all())
+        assert clock.now - 1000 == pytest.approx(0.5, abs=0.01)
+
+    def test_tokens_per_minute(self, clock):
+        rate_limiter = RateLimiter(tpm=6000)
+
+        assert rate_limiter.reserve(5000) == 0
+        assert rate_limiter.reserve(2000) == pytest.approx(10)
+        clock.now += 5
+        assert rate_limiter.reserve(2000) == pytest.approx(5)
+        # Requests larger than the budget wait for a full budget only
+        rate_limiter = RateLimiter(tpm=6000)
+        assert rate_limiter.reserve(10**6) == 0
+        assert rate_limiter.reserve(10**6) == pytest.approx(60)
+
+    def test_headers(self, clock):
+        rate_limiter = RateLimiter(rpm=1000)
+
+        rate_limiter.update_from_headers(
+            {"X-RateLimit-Limit-Requests": "60", "X-RateLimit-Remaining-Requests": "0"}
+        )
+        assert rate_limiter.requests.capacity == 60
+        assert rate_limiter.reserve() == pytest.approx(1)
+
+        # The configured budget caps the one of the provider
+        rate_limiter.update_from_headers({"x-ratelimit-limit-requests": "10000"})
+        assert rate_limiter.requests.capacity == 1000
+
+        rate_limiter.update_from_headers(
+            {
+                "anthropic-ratelimit-input-tokens-limit": "600",
+                "anthropic-ratelimit-input-tokens-remaining": "100",
+                "anthropic-ratelimit-tokens-limit": "1200",
+            }
+        )
+        assert rate_limiter.tokens.capacity == 600
+        assert rate_limiter.tokens.level <= 100
+
+    def test_retry_after(self, clock):
+        rate_limiter = RateLimiter()
+
+        rate_limiter.update_from_error(FakeError({"Retry-After": "20"}))
+        assert rate_limiter.reserve() == pytest.approx(20)
+
+        rate_limiter = RateLimiter()
+        rate_limiter.update_from_headers({"retry-after-ms": "500"})
+        assert rate_limiter.reserve() == pytest.approx(0.5)
+
+        rate_limiter = RateLimiter()
+        rate_limiter.update_from_headers({"retry-after": formatdate(clock.now + 30)})
+        assert rate_limiter.reserve() == pytest.approx(30)
+
+        # Errors without a response are ignored
+        rate_limiter = RateLimiter()
+        rate_limiter.update_from_error(ValueError())
+        rate_limiter.update_from_headers({"retry-after": "soon"})
+        assert rate_limiter.reserve() == 0
+
+    def test_get_rate_limiter(self):
+        rate_limiter = get_rate_limiter("test", "model-a")
+
+        assert get_rate_limiter("test", "model-a") is rate_limiter
+        assert get_rate_limiter("test", "model-b") is not rate_limiter
+        assert get_rate_limiter("other", "model-a") is not rate_limiter
+
+        # A budget given later applies to the shared limiter
+        get_rate_limiter("test", "model-a", rpm=30)
+        assert rate_limiter.requests.capacity == 30
@@ -0,0 +1,131 @@
+from elleelleaime.core.benchmarks.benchmark import Benchmark
+from elleelleaime.core.benchmarks.bug import RichBug
+from elleelleaime.core.utils.jsonl import stream_jsonl
+
+from pathlib import Path
+import generate_samples
+
+
+class FakeBenchmark(Benchmark):
+    def __init__(self):
+        super().__init__("fake", Path("."))
+
+    def initialize(self) -> None:
+        for i in range(3):
+            self.add_bug(
+                FakeRichBug(
+                    self,
+                    f"p{i}",
+                    f"--- a/p{i}.py\n+++ b/p{i}.py\n@@ -1 +1 @@\n-print({i})\n+print({i + 1})\n",
+                    {f"t{i}": f"expected to output:\n{i + 1}\nbut got {i}"},
+                )
+            )
+
+
+class FakeRichBug(RichBug):
+    checkouts = 0
+
+    def checkout(self, path: str, fixed: bool = False) -> bool:
+        FakeRichBug.checkouts += 1
+        Path(path).mkdir(parents=True, exist_ok=True)
+        index = int(self.get_identifier()[1:])
+        Path(path, f"{self.get_identifier()}.py").write_text(
+            f"print({index + 1 if fixed else index})\n"
+        )
+        return True
+
+    def compile(self, path: str):
+        pass
+
+    def test(self, path: str):
+        pass
+
+    def get_src_test_dir(self, path: str) -> str:
+        return path
+
+
+class TestGenerateSamples:
+    def test_multiple_strategies(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(
+            generate_samples, "get_benchmark", lambda _: FakeBenchmark()
+        )
+        FakeRichBug.checkouts = 0
+
+        generate_samples.entry_point(
+            "fake",
+            strategies=[
+                {"prompt_strategy": "instruct_python"},
+                {"prompt_strategy": "instruct_python", "variant": "b"},
+            ],
+            n_workers=2,
+            use_extraction_cache=False,
+        )
+
+        # Each bug is checked out once per version, whatever the number of variants
+        assert FakeRichBug.checkouts == 6
+        assert sorted(path.name for path in tmp_path.glob("*.jsonl")) == [
+            "samples_fake_instruct_python_.jsonl",
+            "samples_fake_instruct_python_variant_b.jsonl",
+        ]
+        samples = list(stream_jsonl("samples_fake_instruct_python_.jsonl"))
+        assert sorted(sample["identifier"] for sample in samples) == ["p0", "p1", "p2"]
+        assert all(sample["prompt"] is not None for sample in samples)
+        assert sorted(
+            stream_jsonl("samples_fake_instruct_python_variant_b.jsonl"),
+            key=lambda sample: sample["identifier"],
+        ) == sorted(samples, key=lambda sample: sample["identifier"])
+
+    def test_single_strategy(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(
+            generate_samples, "get_benchmark", lambda _: FakeBenchmark()
+        )
+
+        generate_samples.entry_point(
+            "fake", "instruct_python", extraction_cache_path=Path(tmp_path, "cache")
+        )
+
+        # Operational options are left out of the file name
+        samples = list(stream_jsonl("samples_fake_instruct_python_.jsonl"))
+        assert len(samples) == 3
+        assert len(list(Path(tmp_path, "cache", "fake").glob("*/*.json"))) == 3
+
+    def test_resume(self, tmp_path, monkeypatch):
+        monkeypatch.chdir(tmp_path)
+        monkeypatch.setattr(
+            generate_samples, "get_benchmark", lambda _: FakeBenchmark()
+        )
+        FakeRichBug.checkouts = 0
+
+        # An interrupted run left one sample and a partial line behind
+        filename = "samples_fake_instruct_python_.jsonl"
+        Path(filename).write_text(
+            '{"identifier": "p1", "prompt": "previous"}\n{"identifier": "p2", "pro'
+        )
+
+        generate_samples.entry_point(
+            "fake", "instruct_python", n_workers=2, use_extraction_cache=False
+        )
+
+        # Only the missing bugs are generated, and the file is in the order of the bugs
+        assert FakeRichBug.checkouts == 4
+        samples = list(stream_jsonl(filename))
+        assert [sample["identifier"] for sample in samples] == ["p0", "p1", "p2"]
+        assert samples[1]["prompt"] == "previous"
+
+        # Nothing is left to generate
+        generate_samples.entry_point(
+            "fake", "instruct_python", use_extraction_cache=False
+        )
+        assert FakeRichBug.checkouts == 4
+        assert list(stream_jsonl(filename)) == samples
+
+        # Unless the run does not resume
+        generate_samples.entry_point(
+            "fake", "instruct_python", resume=False, use_extraction_cache=False
+        )
+        assert FakeRichBug.checkouts == 10
+        samples = list(stream_jsonl(filename))
+        assert [sample["identifier"] for sample in samples] == ["p0", "p1", "p2"]
+        assert samples[1]["prompt"] != "previous"
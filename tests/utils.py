@@ -0,0 +1,47 @@
+# Benchmark is imported before Bug, which imports it in turn
+from elleelleaime.core.benchmarks.benchmark import Benchmark
+from elleelleaime.core.benchmarks.bug import Bug
+
+from pathlib import Path
+from typing import Dict, Optional
+
+
+class FakeBenchmark(Benchmark):
+    def __init__(self, lazy: bool = False):
+        super().__init__("fake", Path("."), lazy=lazy)
+
+    def initialize(self) -> None:
+        pass
+
+
+class FakeBug(Bug):
+    """
+    Bug whose checkouts write the given files, by path relative to the checkout, and are counted.
+    The fixed version has the files of the buggy version unless fixed_files is given.
+    """
+
+    def __init__(
+        self,
+        benchmark: Benchmark,
+        identifier: str,
+        ground_truth: str = "",
+        files: Optional[Dict[str, str]] = None,
+        fixed_files: Optional[Dict[str, str]] = None,
+    ):
+        super().__init__(benchmark, identifier, ground_truth)
+        self.files = files or {}
+        self.fixed_files = fixed_files if fixed_files is not None else self.files
+        self.checkouts = 0
+
+    def checkout(self, path: str, fixed: bool = False) -> bool:
+        self.checkouts += 1
+        for file_path, content in (self.fixed_files if fixed else self.files).items():
+            Path(path, file_path).parent.mkdir(parents=True, exist_ok=True)
+            Path(path, file_path).write_text(content)
+        return True
+
+    def compile(self, path: str):
+        pass
+
+    def test(self, path: str):
+        pass